@@ -0,0 +1,174 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import subprocess
+from dados_sinteticos import gerar_dados
+
+## ----- BENCHMARK DE ESCALA DO NEXUS -----
+
+## executa o Nexus completo sobre dados sintéticos (dados_sinteticos.py) em várias escalas (quantidade de
+## bilhetes) e compara o tempo, o CPU, o pico de memória e as linhas/s de cada etapa, a partir do
+## relatório da execução (instrumentacao.py).
+## cada escala roda em um diretório próprio (<diretório>/escala_<bilhetes>) com uma cópia do código, em um
+## processo separado e com o cache de ingestão desligado (leitura a frio). Os dados gerados são mantidos e
+## reaproveitados nas execuções seguintes com os mesmos parâmetros (a geração das planilhas grandes é demorada).
+##
+## uso: python benchmark_escala.py [escalas separadas por vírgula] [diretório]
+##      ex.: python benchmark_escala.py 100000,1000000,5000000 D:/benchmark_nexus
+
+caminho_base = os.path.dirname(os.path.abspath(__file__))
+
+ESCALAS_PADRAO = [100_000, 1_000_000, 5_000_000]
+
+## diretórios de saída esperados pelo nexus.py
+DIRETORIOS_SAIDA = [
+    'Relatorio Final/Data de Lancamento',
+    'Relatorio Final/Data de Projecao',
+    'Relatorio Final/Resumo de Valores',
+    'Relatorio Final/Relatorios de Cobranca/Data da Venda/Total',
+    'Relatorio Final/Relatorios de Cobranca/Data de Projecao/Total',
+    'Relatorio Final/Relatorios de Cobranca/Data da Venda/Periodo',
+    'Relatorio Final/Relatorios de Cobranca/Data de Projecao/Periodo',
+    'Resumo'
+]
+
+def preparar_escala(diretorio, bilhetes, parametros):
+
+    '''
+    Função para gerar os dados da escala (quando ainda não existem com os mesmos parâmetros) e
+    montar o diretório de execução com a cópia do código e os diretórios de saída limpos.
+    '''
+
+    caminho_parametros = os.path.join(diretorio, 'parametros_sinteticos.json')
+    gerados = None
+
+    if os.path.exists(caminho_parametros):
+        with open(caminho_parametros, 'r', encoding='utf-8') as arquivo:
+            gerados = json.load(arquivo)['parametros']
+
+    if gerados is None or gerados.get('bilhetes') != bilhetes or any(gerados.get(chave) != valor for chave, valor in parametros.items()):
+        for fonte in ('Totalbus', 'Embarca_Vendas', 'Embarca_Repasse'):
+            shutil.rmtree(os.path.join(diretorio, fonte), ignore_errors=True)
+        gerar_dados(diretorio, bilhetes=bilhetes, **parametros)
+    else:
+        print(f'SISTEMA: Reaproveitando os dados sintéticos de {bilhetes} bilhetes em {diretorio}')
+
+    ## código do Nexus (os caminhos de entrada e saída são relativos ao diretório do nexus.py)
+    for arquivo in glob.glob(os.path.join(caminho_base, '*.py')) + glob.glob(os.path.join(caminho_base, '*.json')):
+        shutil.copy2(arquivo, diretorio)
+
+    for saida in DIRETORIOS_SAIDA:
+        shutil.rmtree(os.path.join(diretorio, saida), ignore_errors=True)
+        os.makedirs(os.path.join(diretorio, saida), exist_ok=True)
+
+    shutil.rmtree(os.path.join(diretorio, '.execucoes_nexus'), ignore_errors=True)
+    shutil.rmtree(os.path.join(diretorio, '.checkpoints_nexus'), ignore_errors=True)
+
+def executar_escala(diretorio):
+
+    '''
+    Função para executar o Nexus no diretório da escala.
+
+    Retorna:
+    dict ou None: relatório da execução (instrumentacao.salvar_relatorio_execucao) ou None em caso de erro.
+    '''
+
+    ambiente = {
+        **os.environ,
+        'NEXUS_RELATORIO_EXECUCAO': '1',
+        'NEXUS_DIRETORIO_EXECUCOES': os.path.join(diretorio, '.execucoes_nexus'),
+        'NEXUS_DIRETORIO_RESUMO': os.path.join(diretorio, 'Resumo'),
+        'NEXUS_DIRETORIO_CHECKPOINT': os.path.join(diretorio, '.checkpoints_nexus'),
+        'NEXUS_CACHE_ATIVO': '0',
+        'NEXUS_MODO_INCREMENTAL': '0',
+        'NEXUS_ETAPA_INICIAL': '',
+        'NEXUS_ETAPA_FINAL': ''
+    }
+
+    inicio = time.perf_counter()
+
+    with open(os.path.join(diretorio, 'log_nexus.txt'), 'w', encoding='utf-8') as log:
+        execucao = subprocess.run([sys.executable, 'nexus.py'], cwd=diretorio, env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+
+    if execucao.returncode != 0:
+        print(f"AVISO: Erro na execução do Nexus em {diretorio} (detalhes em log_nexus.txt).")
+        return None
+
+    relatorios = sorted(glob.glob(os.path.join(diretorio, '.execucoes_nexus', 'execucao_*.json')))
+    if not relatorios:
+        print(f'AVISO: Relatório da execução não encontrado em {diretorio}.')
+        return None
+
+    with open(relatorios[-1], 'r', encoding='utf-8') as arquivo:
+        relatorio = json.load(arquivo)
+
+    relatorio['tempo_processo_s'] = round(time.perf_counter() - inicio, 3)
+
+    return relatorio
+
+def exibir_escala(bilhetes, relatorio):
+
+    print(f"\nSISTEMA: {bilhetes} bilhetes: {relatorio['tempo_total_s']:.1f} s, CPU {relatorio['cpu_total_s']:.1f} s")
+    print(f"{'Etapa':<34} {'Tempo (s)':>10} {'CPU (s)':>9} {'Pico RSS (MB)':>14} {'Entrada':>11} {'Saída':>11} {'Linhas/s':>11}")
+
+    for etapa in relatorio['etapas']:
+        print(f"{etapa['nome'][:34]:<34} {etapa['tempo_s']:>10.2f} {etapa['cpu_s']:>9.2f} {etapa['pico_rss_mb']:>14.1f} "
+              f"{etapa['linhas_entrada'] or 0:>11} {etapa['linhas_saida'] or 0:>11} {etapa['linhas_por_segundo'] or 0:>11}")
+
+def executar_benchmark(escalas=None, diretorio=None, **parametros):
+
+    '''
+    Função para executar o benchmark nas escalas informadas.
+
+    Parâmetros:
+    escalas: quantidades de bilhetes (None = ESCALAS_PADRAO).
+    diretorio: diretório dos dados e das execuções (None = benchmark_escala ao lado do código).
+    parametros: parâmetros do gerador (dados_sinteticos.PARAMETROS_PADRAO), iguais em todas as escalas.
+
+    Retorna:
+    dict: {bilhetes: relatório da execução}; também gravado em <diretório>/benchmark_escala.json.
+    '''
+
+    escalas = ESCALAS_PADRAO if escalas is None else escalas
+    diretorio = os.path.join(caminho_base, 'benchmark_escala') if diretorio is None else diretorio
+    resultados = {}
+
+    for bilhetes in escalas:
+        diretorio_escala = os.path.join(diretorio, f'escala_{bilhetes}')
+        os.makedirs(diretorio_escala, exist_ok=True)
+
+        preparar_escala(diretorio_escala, bilhetes, parametros)
+        relatorio = executar_escala(diretorio_escala)
+
+        if relatorio is None:
+            continue
+
+        resultados[bilhetes] = relatorio
+        exibir_escala(bilhetes, relatorio)
+
+    ## comparativo das etapas do orquestrador entre as escalas
+    if resultados:
+        print(f"\nSISTEMA: Tempo (s) / pico RSS (MB) das etapas por escala")
+        print(f"{'Etapa':<28}" + ''.join(f'{bilhetes:>22}' for bilhetes in resultados))
+
+        nomes = [etapa['nome'] for etapa in next(iter(resultados.values()))['etapas'] if etapa['nome'].startswith('etapa.')]
+        for nome in nomes:
+            colunas = []
+            for relatorio in resultados.values():
+                etapa = next((e for e in relatorio['etapas'] if e['nome'] == nome), None)
+                colunas.append(f"{etapa['tempo_s']:.2f} / {etapa['pico_rss_mb']:.0f}" if etapa else '-')
+            print(f'{nome:<28}' + ''.join(f'{coluna:>22}' for coluna in colunas))
+
+        with open(os.path.join(diretorio, 'benchmark_escala.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    return resultados
+
+if __name__ == '__main__':
+    escalas = [int(escala) for escala in sys.argv[1].split(',')] if len(sys.argv) > 1 else None
+    executar_benchmark(escalas, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,329 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import gc
+import copy
+import json
+import time
+import platform
+import statistics
+from contextlib import redirect_stdout
+
+## as medições de etapa (instrumentacao.py) não entram no tempo das funções
+os.environ.setdefault('NEXUS_RELATORIO_EXECUCAO', '0')
+
+import pandas as pd
+import totalbus
+import projecao
+import embarca_repasse
+import nexus
+from vigencias import montar_vigencias
+from dados_sinteticos import gerar_fontes
+
+## ----- MICROBENCHMARKS DAS FUNÇÕES CRÍTICAS -----
+
+## mede as funções mais pesadas do processamento, cada uma isolada, com as mesmas entradas que recebem
+## no Nexus: as fontes são geradas em memória (dados_sinteticos.gerar_fontes, semente fixa) e o fluxo é
+## executado uma vez por tamanho, guardando uma cópia dos argumentos da primeira chamada de cada função.
+## cada repetição recebe uma cópia nova dos argumentos (a cópia não entra no tempo).
+##
+## os resultados são comparados com a base local (benchmark_funcoes_base.json, fora do versionamento); no modo
+## "verificar" o script termina com erro quando alguma função fica mais lenta que a base além do limite. A base
+## depende da máquina: é gravada ("atualizar") na máquina em que a verificação roda e, quando foi medida em outro
+## ambiente (python, pandas, plataforma, processador ou CPUs), os tempos são exibidos mas não são verificados.
+##
+## uso: python benchmark_funcoes.py [medir|verificar|atualizar] [limite] [tamanhos separados por vírgula]
+##      ex.: python benchmark_funcoes.py verificar 0.25
+
+caminho_base = os.path.dirname(os.path.abspath(__file__))
+caminho_linha_base = os.path.join(caminho_base, 'benchmark_funcoes_base.json')
+
+## versão do formato da base (e das entradas): bases de outra versão não são comparadas
+VERSAO_BASE = 1
+
+## tamanhos (bilhetes sintéticos), repetições e semente
+TAMANHOS_PADRAO = [10_000, 50_000, 200_000]
+REPETICOES = 5
+SEMENTE = 0
+
+## regressão: tempo acima de base * (1 + limite) e, pelo menos, TOLERANCIA_S segundos mais lento
+## (a tolerância evita falsos alarmes nas funções de poucos milissegundos)
+LIMITE_PADRAO = 0.25
+TOLERANCIA_S = 0.005
+
+## funções medidas: {nome: (módulo, atributo)}; processando_projecao não é chamada pelo nexus.py e é
+## medida com o df_totalbus da conciliação das vendas
+FUNCOES = {
+    'apontamento_incosistencias': (totalbus, 'apontamento_incosistencias'),
+    'pre_processamento_embarca': (embarca_repasse, 'pre_processamento_embarca'),
+    'mesclagem_totalbus': (embarca_repasse, 'mesclagem_totalbus'),
+    'calculo_repasse': (embarca_repasse, 'calculo_repasse'),
+    'projecao_data_pagamento': (embarca_repasse, 'projecao_data_pagamento'),
+    'processando_projecao': (projecao, 'processando_projecao')
+}
+
+## ----- ENTRADAS DAS FUNÇÕES -----
+
+def gravador(funcao, entradas, nome):
+
+    '''
+    Retorna:
+    function: a função original, guardando em "entradas[nome]" uma cópia dos argumentos da primeira chamada.
+    '''
+
+    def funcao_gravada(*args, **kwargs):
+        if nome not in entradas:
+            entradas[nome] = copy.deepcopy((args, kwargs))
+        return funcao(*args, **kwargs)
+
+    return funcao_gravada
+
+def capturar_entradas(bilhetes, semente=SEMENTE):
+
+    '''
+    Função para executar o processamento das fontes sintéticas (mesmo fluxo das etapas do nexus.py) e
+    capturar os argumentos de cada função medida.
+
+    Retorna:
+    dict: {função: (args, kwargs)}.
+    '''
+
+    arquivos, tabela_tx = gerar_fontes(bilhetes=bilhetes, semente=semente)
+    taxa_conveniencia = montar_vigencias(tabela_tx['Planilha1'], '% Tx Conv')
+
+    entradas = {}
+    originais = {nome: getattr(modulo, atributo) for nome, (modulo, atributo) in FUNCOES.items()}
+
+    try:
+        for nome, (modulo, atributo) in FUNCOES.items():
+            setattr(modulo, atributo, gravador(originais[nome], entradas, nome))
+
+        with open(os.devnull, 'w', encoding='utf-8') as nulo, redirect_stdout(nulo):
+            df_totalbus, indice_vendas_totalbus = nexus.processar_totalbus(arquivos)
+            df_embarca_vendas = nexus.processar_embarca_vendas(arquivos)
+            lista_repasses = nexus.compactar_repasses(arquivos)
+
+            df_totalbus, indice_vendas_totalbus, df_embarca_vendas, indice_vendas, lista_repasses = nexus.conciliar_vendas(
+                df_totalbus, indice_vendas_totalbus, df_embarca_vendas, lista_repasses, taxa_conveniencia, None
+            )
+            entradas['processando_projecao'] = copy.deepcopy(((df_totalbus,), {}))
+
+            nexus.processar_repasses(df_embarca_vendas, indice_vendas_totalbus, lista_repasses, indice_vendas)
+
+    finally:
+        for nome, (modulo, atributo) in FUNCOES.items():
+            setattr(modulo, atributo, originais[nome])
+
+    faltantes = [nome for nome in FUNCOES if nome not in entradas]
+    if faltantes:
+        print(f'AVISO: Funções não chamadas no processamento de {bilhetes} bilhetes: {", ".join(faltantes)}')
+
+    return entradas
+
+## ----- MEDIÇÃO -----
+
+def medir_funcao(funcao, args, kwargs, repeticoes):
+
+    '''
+    Retorna:
+    dict: menor tempo e mediana (segundos) das repetições, após uma execução de aquecimento.
+    '''
+
+    tempos = []
+
+    with open(os.devnull, 'w', encoding='utf-8') as nulo, redirect_stdout(nulo):
+        for repeticao in range(repeticoes + 1):
+            args_copia, kwargs_copia = copy.deepcopy((args, kwargs))
+            gc.collect()
+
+            inicio = time.perf_counter()
+            funcao(*args_copia, **kwargs_copia)
+            tempo = time.perf_counter() - inicio
+
+            ## a primeira execução é o aquecimento
+            if repeticao > 0:
+                tempos.append(tempo)
+
+    return {'minimo_s': round(min(tempos), 5), 'mediana_s': round(statistics.median(tempos), 5)}
+
+def linhas_entrada(args):
+
+    ## linhas do primeiro DataFrame recebido
+    return next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), 0)
+
+def medir_funcoes(tamanhos=None, repeticoes=REPETICOES):
+
+    '''
+    Função para medir todas as funções em cada tamanho.
+
+    Retorna:
+    dict: {função: {bilhetes (texto): {'linhas', 'minimo_s', 'mediana_s'}}}.
+    '''
+
+    tamanhos = TAMANHOS_PADRAO if tamanhos is None else tamanhos
+    resultados = {nome: {} for nome in FUNCOES}
+
+    for bilhetes in tamanhos:
+        print(f'SISTEMA: Preparando as entradas de {bilhetes} bilhetes...')
+        entradas = capturar_entradas(bilhetes)
+
+        for nome, (modulo, atributo) in FUNCOES.items():
+            if nome not in entradas:
+                continue
+
+            args, kwargs = entradas[nome]
+            medicao = medir_funcao(getattr(modulo, atributo), args, kwargs, repeticoes)
+            resultados[nome][str(bilhetes)] = {'linhas': linhas_entrada(args), **medicao}
+
+            print(f"SISTEMA: {nome} ({bilhetes} bilhetes): {medicao['minimo_s']:.4f} s")
+
+        del entradas
+        gc.collect()
+
+    return resultados
+
+## ----- BASE DE COMPARAÇÃO -----
+
+def ambiente():
+
+    return {
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+def carregar_base(caminho=caminho_linha_base):
+
+    '''
+    Retorna:
+    dict ou None: base gravada (None quando não existe ou é de outra versão).
+    '''
+
+    if not os.path.exists(caminho):
+        print(f'AVISO: Base de comparação não encontrada ({caminho}).')
+        return None
+
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+
+    if base.get('versao') != VERSAO_BASE:
+        print(f"AVISO: Base de comparação na versão {base.get('versao')} (esperada {VERSAO_BASE}). Atualize a base.")
+        return None
+
+    return base
+
+def salvar_base(resultados, repeticoes, caminho=caminho_linha_base):
+
+    base = {
+        'versao': VERSAO_BASE,
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'ambiente': ambiente(),
+        'repeticoes': repeticoes,
+        'semente': SEMENTE,
+        'resultados': resultados
+    }
+
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(base, arquivo, indent=2, ensure_ascii=False)
+        arquivo.write('\n')
+
+    print(f'SISTEMA: Base de comparação salva em {caminho}')
+
+def comparar(resultados, base, limite=LIMITE_PADRAO):
+
+    '''
+    Função para comparar o menor tempo de cada função/tamanho com a base.
+
+    Retorna:
+    list: regressões encontradas (função, bilhetes, tempo da base, tempo atual).
+    '''
+
+    regressoes = []
+
+    print(f"\n{'Função':<28} {'Bilhetes':>9} {'Linhas':>9} {'Base (s)':>10} {'Atual (s)':>10} {'Variação':>9}  Situação")
+
+    for nome, tamanhos in resultados.items():
+        for bilhetes, medicao in tamanhos.items():
+            referencia = base['resultados'].get(nome, {}).get(bilhetes) if base else None
+            atual = medicao['minimo_s']
+
+            if referencia is None:
+                print(f"{nome:<28} {bilhetes:>9} {medicao['linhas']:>9} {'-':>10} {atual:>10.4f} {'-':>9}  sem base")
+                continue
+
+            anterior = referencia['minimo_s']
+            variacao = atual / anterior - 1 if anterior > 0 else 0.0
+
+            if atual > anterior * (1 + limite) and atual - anterior > TOLERANCIA_S:
+                situacao = 'REGRESSÃO'
+                regressoes.append((nome, bilhetes, anterior, atual))
+            elif variacao < -limite:
+                situacao = 'melhora'
+            else:
+                situacao = 'ok'
+
+            print(f"{nome:<28} {bilhetes:>9} {medicao['linhas']:>9} {anterior:>10.4f} {atual:>10.4f} {variacao:>+9.1%}  {situacao}")
+
+    return regressoes
+
+def executar_benchmark(modo='medir', limite=LIMITE_PADRAO, tamanhos=None, repeticoes=REPETICOES):
+
+    '''
+    Função para medir as funções e comparar (ou atualizar) a base.
+
+    Parâmetros:
+    modo: 'medir' (apenas compara), 'verificar' (retorna 1 quando há regressão) ou 'atualizar' (grava a base).
+    limite: aumento máximo do tempo em relação à base (0.25 = 25%).
+    tamanhos: quantidades de bilhetes (None = tamanhos da base ou TAMANHOS_PADRAO).
+    repeticoes: repetições de cada medição.
+
+    Retorna:
+    int: código de saída (0 ou 1).
+    '''
+
+    base = carregar_base() if modo != 'atualizar' else None
+
+    if tamanhos is None and base is not None:
+        tamanhos = sorted({int(bilhetes) for medicoes in base['resultados'].values() for bilhetes in medicoes})
+
+    resultados = medir_funcoes(tamanhos, repeticoes)
+
+    if modo == 'atualizar':
+        comparar(resultados, None, limite)
+        salvar_base(resultados, repeticoes)
+        return 0
+
+    regressoes = comparar(resultados, base, limite)
+
+    if base is None:
+        print('\nAVISO: Sem base de comparação válida (python benchmark_funcoes.py atualizar).')
+        return 1 if modo == 'verificar' else 0
+
+    ## tempos de outra máquina não são comparáveis: sem verificação das regressões
+    if base.get('ambiente') != ambiente():
+        print(f"\nAVISO: A base foi medida em outro ambiente ({base.get('ambiente')}, atual {ambiente()}); "
+              f"regressões não verificadas. Atualize a base nesta máquina (python benchmark_funcoes.py atualizar).")
+        return 0
+
+    if not regressoes:
+        print(f'\nSISTEMA: Nenhuma função ficou mais de {limite:.0%} mais lenta que a base.')
+        return 0
+
+    print(f'\nAVISO: {len(regressoes)} medição(ões) acima do limite de {limite:.0%}:')
+    for nome, bilhetes, anterior, atual in regressoes:
+        print(f'AVISO:   {nome} ({bilhetes} bilhetes): {anterior:.4f} s -> {atual:.4f} s')
+
+    return 1 if modo == 'verificar' else 0
+
+if __name__ == '__main__':
+    modo = sys.argv[1] if len(sys.argv) > 1 else 'medir'
+    if modo not in ('medir', 'verificar', 'atualizar'):
+        sys.exit(f'Modo inválido: {modo} (medir, verificar ou atualizar).')
+
+    limite = float(sys.argv[2]) if len(sys.argv) > 2 else LIMITE_PADRAO
+    tamanhos = [int(tamanho) for tamanho in sys.argv[3].split(',')] if len(sys.argv) > 3 else None
+
+    sys.exit(executar_benchmark(modo, limite, tamanhos))
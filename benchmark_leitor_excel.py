@@ -0,0 +1,127 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import json
+import time
+import subprocess
+from leitores_excel import LEITORES_EXCEL, calamine_disponivel
+
+## ----- COMPARATIVO DOS LEITORES DE EXCEL -----
+
+## compara o tempo de leitura e o pico de memória de cada leitor (leitores_excel.LEITORES_EXCEL) nos
+## arquivos reais do Nexus, com as mesmas colunas, abas e conversores usados na ingestão.
+## cada medição roda em um processo separado, para o pico de memória não ser contaminado pela anterior.
+##
+## uso: python benchmark_leitor_excel.py [repetições]
+
+caminho_base = os.path.dirname(os.path.abspath(__file__))
+
+## fonte: (diretório, aba)
+FONTES_BENCHMARK = {
+    'totalbus': ('Totalbus', 0),
+    'embarca_vendas': ('Embarca_Vendas', 'Base_Aprovados'),
+    'embarca_repasse': ('Embarca_Repasse', ['Base_Aprov', 'Base_Canc'])
+}
+
+def pico_memoria_mb():
+
+    '''
+    Retorna:
+    float: pico de memória do processo atual em MB (peak working set no Windows, maxrss nos demais).
+    '''
+
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+def medir(leitor, fonte, caminho):
+
+    '''
+    Função executada no processo filho: lê o arquivo com o leitor informado e imprime as medições em JSON.
+    '''
+
+    from esquemas import ESQUEMAS, conversores_esquema
+    from totalbus import COLUNAS_TOTALBUS
+    from embarca_vendas import COLUNAS_EMBARCA_VENDAS
+    from embarca_repasse import COLUNAS_EMBARCA_REPASSE
+
+    colunas = {
+        'totalbus': COLUNAS_TOTALBUS,
+        'embarca_vendas': COLUNAS_EMBARCA_VENDAS,
+        'embarca_repasse': COLUNAS_EMBARCA_REPASSE
+    }[fonte]
+
+    memoria_inicial = pico_memoria_mb()
+    inicio = time.perf_counter()
+
+    resultado = LEITORES_EXCEL[leitor](
+        caminho,
+        usecols=colunas,
+        sheet_name=FONTES_BENCHMARK[fonte][1],
+        converters=conversores_esquema(ESQUEMAS[fonte], colunas)
+    )
+
+    tempo = time.perf_counter() - inicio
+    linhas = sum(len(df) for df in resultado.values()) if isinstance(resultado, dict) else len(resultado)
+
+    print(json.dumps({
+        'tempo': tempo,
+        'memoria': pico_memoria_mb() - memoria_inicial,
+        'linhas': linhas
+    }))
+
+def executar_benchmark(repeticoes=3):
+
+    leitores = [l for l in LEITORES_EXCEL if l != 'calamine' or calamine_disponivel()]
+    if not calamine_disponivel():
+        print('SISTEMA: python-calamine não instalado, o leitor "calamine" não será medido.')
+
+    print(f"{'Fonte':<16} {'Arquivo':<28} {'Leitor':<10} {'Linhas':>8} {'Tempo (s)':>10} {'Pico (MB)':>10}")
+
+    totais = {leitor: [0.0, 0.0] for leitor in leitores}
+
+    for fonte, (diretorio, _) in FONTES_BENCHMARK.items():
+        diretorio = os.path.join(caminho_base, diretorio)
+        if not os.path.isdir(diretorio):
+            continue
+
+        for arquivo in sorted(f for f in os.listdir(diretorio) if f.endswith(('.xlsx', '.xls'))):
+            caminho = os.path.join(diretorio, arquivo)
+
+            for leitor in leitores:
+                medicoes = []
+                for _ in range(repeticoes):
+                    saida = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), '--medir', leitor, fonte, caminho],
+                        capture_output=True, text=True, cwd=caminho_base
+                    )
+                    if saida.returncode != 0:
+                        print(f'AVISO: Erro ao medir o leitor "{leitor}" no arquivo {arquivo}. ({saida.stderr.strip().splitlines()[-1]})')
+                        break
+                    medicoes.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+                if not medicoes:
+                    continue
+
+                ## considerando a melhor repetição de tempo e a maior de memória
+                tempo = min(m['tempo'] for m in medicoes)
+                memoria = max(m['memoria'] for m in medicoes)
+                totais[leitor][0] += tempo
+                totais[leitor][1] = max(totais[leitor][1], memoria)
+
+                print(f"{fonte:<16} {arquivo[:28]:<28} {leitor:<10} {medicoes[0]['linhas']:>8} {tempo:>10.3f} {memoria:>10.1f}")
+
+    print('\nSISTEMA: Total por leitor (tempo somado e maior pico de memória):')
+    for leitor, (tempo, memoria) in totais.items():
+        print(f'  {leitor:<10} {tempo:>8.3f} s {memoria:>8.1f} MB')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--medir':
+        medir(*sys.argv[2:5])
+    else:
+        executar_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,80 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from valores_parcelas import COLUNAS_ENTRADA, MOTORES_VALORES, calcular_valores, numba_disponivel
+
+## ----- COMPARATIVO DOS MOTORES DE CÁLCULO DOS VALORES -----
+
+## compara o tempo e o pico de memória alocada de cada motor (valores_parcelas.MOTORES_VALORES) no
+## cálculo dos valores da projeção, com bilhetes sintéticos, e confere se todos devolvem os mesmos valores.
+## a primeira chamada do numba (compilação) não entra na medição.
+##
+## uso: python benchmark_valores_parcelas.py [bilhetes] [repetições]
+
+def bilhetes_sinteticos(quantidade, semente=0):
+
+    '''
+    Retorna:
+    pd.DataFrame: bilhetes com as COLUNAS_ENTRADA e valores parecidos com os do Totalbus.
+    '''
+
+    gerador = np.random.default_rng(semente)
+
+    df = pd.DataFrame({coluna: np.round(gerador.uniform(-500, 500, quantidade), 2) for coluna in COLUNAS_ENTRADA})
+    df['% Tx Conv'] = gerador.choice([0.05, 0.07, 0.1, np.nan], quantidade)
+    df['PERCENTUAL_COMISSAO'] = gerador.choice([0, 0.03, 0.05], quantidade)
+    df['parcelas'] = gerador.integers(1, 13, quantidade).astype(float)
+
+    return df
+
+def medir(df, motor, repeticoes):
+
+    '''
+    Retorna:
+    tuple: (melhor tempo em segundos, pico de memória alocada em MB, matriz de valores).
+    '''
+
+    tempos = []
+
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        valores = calcular_valores(df, motor)
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    calcular_valores(df, motor)
+    pico = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+
+    return min(tempos), pico, valores
+
+def executar_benchmark(quantidade=1_000_000, repeticoes=5):
+
+    motores = [m for m in MOTORES_VALORES if m != 'numba' or numba_disponivel()]
+    if not numba_disponivel():
+        print('SISTEMA: numba não instalado, o motor "numba" não será medido.')
+    else:
+        ## compilando o kernel antes das medições
+        calcular_valores(bilhetes_sinteticos(10), 'numba')
+
+    df = bilhetes_sinteticos(quantidade)
+    print(f'SISTEMA: {quantidade} bilhetes, melhor de {repeticoes} repetições')
+    print(f"{'Motor':<10} {'Tempo (s)':>10} {'Pico (MB)':>10} {'x pandas':>9} {'Iguais':>7}")
+
+    referencia = None
+
+    for motor in ['pandas'] + [m for m in motores if m != 'pandas']:
+        tempo, pico, valores = medir(df, motor, repeticoes)
+
+        if referencia is None:
+            referencia = (tempo, valores)
+
+        iguais = np.array_equal(valores, referencia[1], equal_nan=True)
+        print(f'{motor:<10} {tempo:>10.4f} {pico:>10.1f} {referencia[0] / tempo:>9.2f} {"sim" if iguais else "NÃO":>7}')
+
+if __name__ == '__main__':
+    executar_benchmark(*(int(arg) for arg in sys.argv[1:3]))
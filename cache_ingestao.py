@@ -0,0 +1,267 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import json
+import hashlib
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+from configuracoes import CACHE_ATIVO, CACHE_DIRETORIO, CACHE_TAMANHO_MAXIMO_MB
+from leitores_excel import definir_leitor
+
+## versão do formato gravado (alterar invalida todo o cache)
+VERSAO_CACHE = 1
+
+## extensões lidas pelos leitores de Excel (leitores_excel.py)
+EXTENSOES_EXCEL = ('.xlsx', '.xlsm', '.xls')
+
+## ----- IDENTIFICAÇÃO DOS ARQUIVOS -----
+
+def gravar_json(caminho, conteudo):
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_temporario = f'{caminho}.{os.getpid()}.tmp'
+
+    with open(caminho_temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(conteudo, arquivo)
+
+    os.replace(caminho_temporario, caminho)
+
+def hash_conteudo(caminho, tamanho_bloco=1024 * 1024):
+
+    '''
+    Função para calcular o hash (blake2b) do conteúdo de um arquivo.
+    '''
+
+    hash_arquivo = hashlib.blake2b(digest_size=20)
+
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            hash_arquivo.update(bloco)
+
+    return hash_arquivo.hexdigest()
+
+def identificar_arquivo(caminho, diretorio_cache):
+
+    '''
+    Função para identificar um arquivo pelo caminho, tamanho, data de modificação e hash do conteúdo.
+
+    O hash só é recalculado quando o tamanho ou a data de modificação mudam desde a última leitura.
+
+    Retorna:
+    str: hash do conteúdo do arquivo.
+    '''
+
+    estado = os.stat(caminho)
+    caminho_absoluto = os.path.abspath(caminho)
+    chave_caminho = hashlib.blake2b(caminho_absoluto.encode('utf-8'), digest_size=16).hexdigest()
+    caminho_identificacao = os.path.join(diretorio_cache, 'arquivos', f'{chave_caminho}.json')
+
+    try:
+        with open(caminho_identificacao, 'r', encoding='utf-8') as arquivo:
+            identificacao = json.load(arquivo)
+        if identificacao['tamanho'] == estado.st_size and identificacao['modificacao'] == estado.st_mtime_ns:
+            return identificacao['hash']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    identificacao = {
+        'caminho': caminho_absoluto,
+        'tamanho': estado.st_size,
+        'modificacao': estado.st_mtime_ns,
+        'hash': hash_conteudo(caminho)
+    }
+    gravar_json(caminho_identificacao, identificacao)
+
+    return identificacao['hash']
+
+def chave_leitura(hash_arquivo, leitor, parametros, leitor_excel=None):
+
+    '''
+    Função para montar a chave de uma leitura: conteúdo do arquivo + leitor + parâmetros
+    (colunas, abas...) + leitor de Excel utilizado nas planilhas (calamine, openpyxl, pandas).
+    Qualquer mudança na lista de colunas ou no leitor de Excel gera uma nova chave.
+    '''
+
+    descricao = json.dumps({
+        'versao': VERSAO_CACHE,
+        'hash': hash_arquivo,
+        'leitor': getattr(leitor, '__name__', str(leitor)),
+        'leitor_excel': leitor_excel,
+        'parametros': parametros
+    }, sort_keys=True, default=str)
+
+    return hashlib.blake2b(descricao.encode('utf-8'), digest_size=20).hexdigest()
+
+## ----- GRAVAÇÃO E LEITURA DO CACHE -----
+
+def gravar_dataframe(df, caminho_base):
+
+    '''
+    Função para gravar um DataFrame em Arrow IPC. Colunas com tipos misturados (ex.: números e textos
+    na mesma coluna) não são aceitas pelo Arrow; nesses casos o DataFrame é gravado em pickle.
+
+    Retorna:
+    str: nome do arquivo gravado.
+    '''
+
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=True)
+        caminho = f'{caminho_base}.arrow'
+        caminho_temporario = f'{caminho}.{os.getpid()}.tmp'
+        with pa.OSFile(caminho_temporario, 'wb') as arquivo:
+            with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        caminho = f'{caminho_base}.pkl'
+        caminho_temporario = f'{caminho}.{os.getpid()}.tmp'
+        df.to_pickle(caminho_temporario)
+
+    os.replace(caminho_temporario, caminho)
+
+    return os.path.basename(caminho)
+
+def carregar_dataframe(caminho):
+
+    '''
+    Função para carregar um DataFrame do cache (Arrow IPC mapeado em memória ou pickle).
+    '''
+
+    if caminho.endswith('.pkl'):
+        return pd.read_pickle(caminho)
+
+    with pa.memory_map(caminho, 'r') as fonte:
+        df = pa.ipc.open_file(fonte).read_all().to_pandas()
+
+    ## o Arrow devolve None nos textos vazios; o pd.read_excel/read_csv devolve NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].mask(df[col].isna(), np.nan)
+
+    return df
+
+def gravar_no_cache(chave, resultado, diretorio_cache):
+
+    diretorio_dados = os.path.join(diretorio_cache, 'dados')
+    os.makedirs(diretorio_dados, exist_ok=True)
+
+    if isinstance(resultado, dict):
+        abas = list(resultado.keys())
+        dataframes = list(resultado.values())
+    else:
+        abas = None
+        dataframes = [resultado]
+
+    arquivos = [
+        gravar_dataframe(df, os.path.join(diretorio_dados, f'{chave}-{i}')) for i, df in enumerate(dataframes)
+    ]
+
+    gravar_json(os.path.join(diretorio_dados, f'{chave}.json'), {'abas': abas, 'arquivos': arquivos})
+
+def carregar_do_cache(chave, diretorio_cache):
+
+    '''
+    Retorna:
+    O DataFrame (ou dicionário de DataFrames, quando lido com várias abas) ou None caso não esteja no cache.
+    '''
+
+    diretorio_dados = os.path.join(diretorio_cache, 'dados')
+    caminho_manifesto = os.path.join(diretorio_dados, f'{chave}.json')
+
+    try:
+        with open(caminho_manifesto, 'r', encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+        dataframes = [carregar_dataframe(os.path.join(diretorio_dados, a)) for a in manifesto['arquivos']]
+    except (OSError, ValueError, KeyError, pa.ArrowInvalid):
+        return None
+
+    ## atualizando a data de acesso (utilizada na remoção dos itens mais antigos)
+    try:
+        os.utime(caminho_manifesto)
+    except OSError:
+        pass
+
+    if manifesto['abas'] is None:
+        return dataframes[0]
+
+    return dict(zip(manifesto['abas'], dataframes))
+
+## ----- LIMPEZA DO CACHE -----
+
+def limpar_cache(diretorio_cache=CACHE_DIRETORIO, tamanho_maximo_mb=CACHE_TAMANHO_MAXIMO_MB):
+
+    '''
+    Função para remover as leituras menos utilizadas até o cache ficar abaixo do tamanho máximo.
+    '''
+
+    diretorio_dados = os.path.join(diretorio_cache, 'dados')
+    if not os.path.isdir(diretorio_dados):
+        return
+
+    ## agrupando os arquivos de cada leitura pela chave (o manifesto é "<chave>.json" e os dados "<chave>-<n>.*")
+    arquivos_por_chave = {}
+    for nome in os.listdir(diretorio_dados):
+        chave = nome.split('-')[0].split('.')[0]
+        arquivos_por_chave.setdefault(chave, []).append(os.path.join(diretorio_dados, nome))
+
+    itens = []
+    for chave, arquivos in arquivos_por_chave.items():
+        caminho_manifesto = os.path.join(diretorio_dados, f'{chave}.json')
+        ultimo_acesso = os.path.getmtime(caminho_manifesto) if os.path.exists(caminho_manifesto) else 0
+        tamanho = sum(os.path.getsize(a) for a in arquivos)
+        itens.append((ultimo_acesso, tamanho, arquivos))
+
+    tamanho_total = sum(item[1] for item in itens)
+    tamanho_maximo = tamanho_maximo_mb * 1024 * 1024
+
+    ## removendo do mais antigo para o mais recente
+    for _, tamanho, arquivos in sorted(itens, key=lambda item: item[0]):
+        if tamanho_total <= tamanho_maximo:
+            break
+        for arquivo in arquivos:
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+        tamanho_total -= tamanho
+
+## ----- LEITURA COM CACHE -----
+
+def ler_com_cache(leitor, caminho, **parametros):
+
+    '''
+    Função para ler um arquivo através do cache. Na primeira leitura o resultado do leitor é
+    gravado em Arrow IPC; nas próximas, enquanto o conteúdo do arquivo e os parâmetros forem os
+    mesmos, o resultado é carregado direto do cache.
+
+    Parâmetros:
+    leitor: função de leitura (pd.read_excel, pd.read_csv...).
+    caminho: caminho do arquivo.
+    parametros: parâmetros repassados ao leitor (colunas, abas...), que também compõem a chave.
+
+    Retorna:
+    O mesmo retorno do leitor.
+    '''
+
+    if not CACHE_ATIVO:
+        return leitor(caminho, **parametros)
+
+    try:
+        ## planilhas: o leitor de Excel em uso (NEXUS_LEITOR_EXCEL, já resolvido) também compõe a chave
+        leitor_excel = definir_leitor() if caminho.lower().endswith(EXTENSOES_EXCEL) else None
+        chave = chave_leitura(identificar_arquivo(caminho, CACHE_DIRETORIO), leitor, parametros, leitor_excel)
+        resultado = carregar_do_cache(chave, CACHE_DIRETORIO)
+    except OSError as e:
+        print(f'AVISO: Cache indisponível para o arquivo "{os.path.basename(caminho)}". ({e})')
+        return leitor(caminho, **parametros)
+
+    if resultado is not None:
+        return resultado
+
+    resultado = leitor(caminho, **parametros)
+
+    try:
+        gravar_no_cache(chave, resultado, CACHE_DIRETORIO)
+    except OSError as e:
+        print(f'AVISO: Erro ao gravar o arquivo "{os.path.basename(caminho)}" no cache. ({e})')
+
+    return resultado
@@ -0,0 +1,138 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+from datetime import date, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from configuracoes import CONSIDERAR_FERIADOS, FERIADOS_REGIONAIS
+
+## ----- CALENDÁRIO DE DIAS ÚTEIS -----
+
+## as datas projetadas de pagamento (Totalbus e Embarca) caem no próximo dia útil bancário:
+## sábados, domingos, feriados nacionais e feriados regionais configurados (NEXUS_FERIADOS_REGIONAIS)
+## são empurrados para o primeiro dia útil seguinte, mantendo o horário
+
+## feriados nacionais de data fixa (mês, dia)
+FERIADOS_FIXOS = [
+    (1, 1),     ## confraternização universal
+    (4, 21),    ## tiradentes
+    (5, 1),     ## dia do trabalho
+    (9, 7),     ## independência
+    (10, 12),   ## nossa senhora aparecida
+    (11, 2),    ## finados
+    (11, 15),   ## proclamação da república
+    (12, 25)    ## natal
+]
+
+## feriados (e dias sem expediente bancário) relativos à páscoa, em dias
+FERIADOS_PASCOA = [
+    -48,    ## segunda-feira de carnaval
+    -47,    ## terça-feira de carnaval
+    -2,     ## sexta-feira santa
+    60      ## corpus christi
+]
+
+def data_pascoa(ano):
+
+    '''
+    Retorna:
+    date: domingo de páscoa do ano (algoritmo de Meeus/Jones/Butcher, calendário gregoriano).
+    '''
+
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+
+    return date(ano, mes, dia + 1)
+
+def ler_feriados_regionais(texto=FERIADOS_REGIONAIS):
+
+    '''
+    Função para interpretar os feriados regionais configurados, separados por vírgula:
+    'MM-DD' (todo ano) ou 'AAAA-MM-DD' (data específica).
+
+    Retorna:
+    tuple: (lista de (mês, dia) anuais, lista de datas específicas).
+    '''
+
+    anuais, especificos = [], []
+
+    for item in filter(None, (parte.strip() for parte in texto.split(','))):
+        try:
+            if len(item) == 5:
+                mes, dia = map(int, item.split('-'))
+                date(2000, mes, dia)
+                anuais.append((mes, dia))
+            else:
+                especificos.append(date.fromisoformat(item))
+        except ValueError:
+            print(f'AVISO: Feriado regional inválido em NEXUS_FERIADOS_REGIONAIS ("{item}"). Ignorando.')
+
+    return anuais, especificos
+
+@lru_cache(maxsize=None)
+def feriados(ano_inicio, ano_fim):
+
+    '''
+    Retorna:
+    np.ndarray: feriados (datetime64[D]) nacionais e regionais entre os anos informados (inclusive).
+    '''
+
+    anuais, especificos = ler_feriados_regionais()
+    datas = [d for d in especificos if ano_inicio <= d.year <= ano_fim]
+
+    for ano in range(ano_inicio, ano_fim + 1):
+
+        ## 29/02 regional só existe nos anos bissextos
+        for mes, dia in FERIADOS_FIXOS + anuais:
+            try:
+                datas.append(date(ano, mes, dia))
+            except ValueError:
+                continue
+
+        ## consciência negra: feriado nacional a partir de 2024
+        if ano >= 2024:
+            datas.append(date(ano, 11, 20))
+
+        pascoa = data_pascoa(ano)
+        datas.extend(pascoa + timedelta(days=dias) for dias in FERIADOS_PASCOA)
+
+    return np.array(sorted(set(datas)), dtype='datetime64[D]')
+
+def proximo_dia_util(datas):
+
+    '''
+    Função para levar cada data ao próximo dia útil (ela mesma, quando já é dia útil), em uma única
+    chamada vetorizada do np.busday_offset. O horário das datas é mantido e datas vazias continuam vazias.
+
+    Parâmetros:
+    datas: Series de datas (datetime64).
+
+    Retorna:
+    pd.Series: datas ajustadas, com o mesmo índice e tipo.
+    '''
+
+    valores = datas.to_numpy()
+    dias = valores.astype('datetime64[D]')
+    horario = valores - dias.astype(valores.dtype)
+
+    validos = ~np.isnat(dias)
+    if not validos.any():
+        return datas
+
+    feriados_periodo = np.array([], dtype='datetime64[D]')
+    if CONSIDERAR_FERIADOS:
+        anos = dias[validos].astype('datetime64[Y]').astype(int) + 1970
+        ## o ano seguinte cobre datas empurradas para além do último ano (ex.: 31/12 em um sábado)
+        feriados_periodo = feriados(int(anos.min()), int(anos.max()) + 1)
+
+    ajustados = np.busday_offset(dias, 0, roll='forward', holidays=feriados_periodo)
+
+    return pd.Series(ajustados.astype(valores.dtype) + horario, index=datas.index, name=datas.name)
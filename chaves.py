@@ -0,0 +1,102 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import pandas as pd
+import numpy as np
+
+## ----- CODIFICAÇÃO DAS CHAVES -----
+
+## coluna com o código inteiro (int64) da chave (empresa, ID da transação), compartilhado pelas três fontes
+COLUNA_CHAVE = 'Chave'
+
+def codificar_colunas(colunas_por_quadro, descartar_vazios=False, vazios_iniciais=None):
+
+    '''
+    Função para codificar chaves compostas (várias colunas) em um único inteiro por linha.
+    Os códigos são compartilhados entre todos os DataFrames informados: a mesma chave recebe
+    o mesmo código em qualquer um deles.
+
+    Parâmetros:
+    colunas_por_quadro: lista (uma por DataFrame) de listas de Series, todas com as mesmas colunas.
+    descartar_vazios: quando True, linhas com algum valor vazio recebem o código -1 (como o dropna
+                      do groupby). Quando False, o vazio é tratado como valor (como nos merges do pandas).
+    vazios_iniciais: máscara opcional de linhas já consideradas vazias (ex.: código anterior -1).
+
+    Retorna:
+    list: np.ndarray int64 com os códigos de cada DataFrame.
+    '''
+
+    tamanhos = [len(colunas[0]) for colunas in colunas_por_quadro]
+    codigo = np.zeros(sum(tamanhos), dtype=np.int64)
+    vazio = np.zeros(sum(tamanhos), dtype=bool) if vazios_iniciais is None else np.asarray(vazios_iniciais, dtype=bool).copy()
+
+    for i in range(len(colunas_por_quadro[0])):
+        valores = pd.concat([colunas[i].reset_index(drop=True) for colunas in colunas_por_quadro], ignore_index=True)
+        codigos_coluna, unicos = pd.factorize(valores, use_na_sentinel=False)
+        vazio |= valores.isna().to_numpy()
+
+        ## combinando com as colunas anteriores e recompactando (os códigos nunca passam do número de linhas)
+        codigo, _ = pd.factorize(codigo * max(len(unicos), 1) + codigos_coluna)
+        codigo = codigo.astype(np.int64)
+
+    if descartar_vazios:
+        codigo[vazio] = -1
+
+    return np.split(codigo, np.cumsum(tamanhos)[:-1])
+
+def atribuir_chave_transacao(quadros):
+
+    '''
+    Função para incluir a coluna COLUNA_CHAVE em cada DataFrame, codificando (empresa, ID da transação)
+    uma única vez para todas as fontes. O ID é comparado como texto, assim como nos merges anteriores.
+
+    Parâmetros:
+    quadros: lista de tuplas (DataFrame, coluna da empresa, coluna do ID).
+    '''
+
+    codigos = codificar_colunas([[df[coluna_empresa], df[coluna_id].astype(str)] for df, coluna_empresa, coluna_id in quadros])
+
+    for (df, _, _), codigo in zip(quadros, codigos):
+        df[COLUNA_CHAVE] = codigo
+
+## ----- AGRUPAMENTOS PELOS CÓDIGOS -----
+
+def codigos_grupo(df, colunas, codigo_base=None):
+
+    '''
+    Retorna:
+    np.ndarray: código inteiro da chave composta por "colunas" em cada linha (-1 quando algum valor é vazio).
+                Com "codigo_base", as colunas são acrescentadas a um código já calculado.
+    '''
+
+    series = [df[coluna] for coluna in colunas]
+    vazios_iniciais = None
+
+    if codigo_base is not None:
+        series.insert(0, pd.Series(codigo_base, index=df.index))
+        vazios_iniciais = np.asarray(codigo_base) < 0
+
+    return codificar_colunas([series], descartar_vazios=True, vazios_iniciais=vazios_iniciais)[0]
+
+def contagem_por_grupo(codigos, indice):
+
+    '''
+    Função equivalente ao groupby(colunas).cumcount() a partir dos códigos (NaN nas linhas com chave vazia).
+    '''
+
+    serie = pd.Series(codigos, index=indice)
+    contagem = serie.groupby(codigos).cumcount()
+
+    if (serie < 0).any():
+        contagem = contagem.where(serie >= 0)
+
+    return contagem
+
+def soma_por_grupo(valores, codigos):
+
+    '''
+    Função equivalente ao groupby(colunas)[valor].sum() devolvido em cada linha (NaN nas linhas com chave vazia).
+    '''
+
+    soma = valores.groupby(codigos).transform('sum')
+
+    return soma.where(codigos >= 0)
@@ -0,0 +1,162 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+
+## ----- FUNÇÕES AUXILIARES -----
+
+def ler_configuracao(nome, padrao, tipo=str):
+
+    '''
+    Função para ler uma configuração do Nexus a partir das variáveis de ambiente.
+
+    Parâmetros:
+    nome: nome da configuração (será lida como NEXUS_<nome>).
+    padrao: valor utilizado quando a variável não estiver definida.
+    tipo: função de conversão do valor lido (str, int, float...).
+
+    Retorna:
+    O valor convertido da configuração ou o valor padrão.
+    '''
+
+    valor = os.environ.get(f'NEXUS_{nome}')
+
+    if valor is None or valor == '':
+        return padrao
+
+    try:
+        return tipo(valor)
+    except ValueError:
+        print(f'AVISO: Valor inválido para a configuração NEXUS_{nome} ("{valor}"). Utilizando o padrão ({padrao}).')
+        return padrao
+
+## ----- INGESTÃO DOS ARQUIVOS -----
+
+## quantidade de processos utilizados na leitura dos arquivos (1 = leitura sequencial)
+NUMERO_PROCESSOS = ler_configuracao('NUMERO_PROCESSOS', max(1, (os.cpu_count() or 1) - 1), int)
+
+## ----- CACHE DE INGESTÃO -----
+
+## cache colunar (Arrow IPC) dos arquivos já lidos, para não reprocessar exportações que não mudaram
+CACHE_ATIVO = ler_configuracao('CACHE_ATIVO', 1, int) == 1
+CACHE_DIRETORIO = ler_configuracao('CACHE_DIRETORIO', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_nexus'))
+CACHE_TAMANHO_MAXIMO_MB = ler_configuracao('CACHE_TAMANHO_MAXIMO_MB', 2048, float)
+
+## ----- EXECUÇÃO INCREMENTAL -----
+
+## reprocessa apenas as transações tocadas pelos arquivos alterados desde a última execução
+MODO_INCREMENTAL = ler_configuracao('MODO_INCREMENTAL', 0, int) == 1
+DIRETORIO_ESTADO = ler_configuracao('DIRETORIO_ESTADO', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.estado_nexus'))
+
+## ----- MEMÓRIA -----
+
+## converte textos repetidos em category/string[pyarrow] e reduz os tipos numéricos de cada etapa
+COMPACTAR_MEMORIA = ler_configuracao('COMPACTAR_MEMORIA', 1, int) == 1
+
+## ----- LEITURA DE EXCEL -----
+
+## leitor das planilhas: 'auto' (calamine quando instalado, senão openpyxl), 'calamine', 'openpyxl' ou 'pandas'
+LEITOR_EXCEL = ler_configuracao('LEITOR_EXCEL', 'auto')
+
+## ----- RELATÓRIOS -----
+
+## quantidade de threads utilizadas na gravação dos CSVs mensais (1 = gravação sequencial)
+THREADS_RELATORIOS = ler_configuracao('THREADS_RELATORIOS', min(4, os.cpu_count() or 1), int)
+
+## grava também uma cópia dos relatórios em Parquet, particionada por empresa e mês (Relatorio Final/Parquet)
+SAIDA_PARQUET = ler_configuracao('SAIDA_PARQUET', 0, int) == 1
+
+## diretório do resumo de valores por empresa + mês de lançamento e gravação em planilha única (uma aba por resumo)
+DIRETORIO_RESUMO = ler_configuracao('DIRETORIO_RESUMO', 'H:/Downloads')
+RESUMO_PLANILHA = ler_configuracao('RESUMO_PLANILHA', 0, int) == 1
+
+## cálculo do resumo: 'vetorizado' (um único groupby) ou 'grupos' (cálculo original, um groupby por empresa + mês)
+CALCULO_RESUMO = ler_configuracao('CALCULO_RESUMO', 'vetorizado')
+
+## ----- CALENDÁRIO -----
+
+## considera os feriados (além de sábados e domingos) ao levar as datas projetadas para o próximo dia útil
+CONSIDERAR_FERIADOS = ler_configuracao('CONSIDERAR_FERIADOS', 1, int) == 1
+
+## feriados regionais, separados por vírgula: 'MM-DD' (todo ano) ou 'AAAA-MM-DD' (data específica)
+FERIADOS_REGIONAIS = ler_configuracao('FERIADOS_REGIONAIS', '')
+
+## ----- REGRAS DE NEGÓCIO -----
+
+## arquivo com as tabelas de decisão das projeções (data base, parcelas e comissão)
+ARQUIVO_REGRAS = ler_configuracao('ARQUIVO_REGRAS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regras_projecao.json'))
+
+## origem das regras das projeções: 'arquivo' (tabelas de decisão do ARQUIVO_REGRAS) ou 'fixas' (condições
+## originais do código, com a data base de 2024-10-01; usadas como referência na verificação de equivalência)
+REGRAS_PROJECAO = ler_configuracao('REGRAS_PROJECAO', 'arquivo')
+
+## ----- CONCILIAÇÃO -----
+
+## pareamento por chave e data mais próxima: 'indice' (pareamento.py, searchsorted sobre o índice) ou
+## 'merge_asof' (pd.merge_asof original, ordenando os dois lados a cada cruzamento)
+PAREAMENTO = ler_configuracao('PAREAMENTO', 'indice')
+
+## consulta das vendas do Totalbus por bilhete: 'indice' (totalbus.indexar_vendas, índice montado uma vez) ou
+## 'merge' (pd.merge "left" original com as vendas)
+CONSULTA_VENDAS = ler_configuracao('CONSULTA_VENDAS', 'indice')
+
+## conversão das datas: 'valores' (cada valor distinto convertido uma vez, meses por número) ou 'linhas'
+## (pd.to_datetime original em todas as linhas, meses pelo pd.Period)
+CONVERSAO_DATAS = ler_configuracao('CONVERSAO_DATAS', 'valores')
+
+## ----- PROJEÇÃO E SALDOS -----
+
+## montagem da projeção: 'compacta' (tabelas de bilhetes e de parcelas, materializadas no final) ou 'expandida'
+## (original: todas as colunas do bilhete repetidas por parcela com index.repeat e parcela atual pelo cumcount)
+PROJECAO = ler_configuracao('PROJECAO', 'compacta')
+
+## saldos: 'indice' (somas pelos códigos das chaves e cobrança consultada no razão) ou 'merge' (original:
+## groupby + merge dos saldos no df_agrupado e cobrança filtrada pelas colunas de saldo)
+CALCULO_SALDOS = ler_configuracao('CALCULO_SALDOS', 'indice')
+
+## ----- VALORES MONETÁRIOS -----
+
+## calcula os valores em centavos inteiros: parcelas que somam exatamente o total do bilhete e saldos exatos
+MODO_CENTAVOS = ler_configuracao('MODO_CENTAVOS', 0, int) == 1
+
+## motor do cálculo dos valores da projeção: 'auto' (numba quando instalado, senão numpy), 'numba', 'numpy', 'pandas'
+## ou 'colunas' (cálculo original, coluna a coluna sobre as colunas da projeção)
+CALCULO_VALORES = ler_configuracao('CALCULO_VALORES', 'auto')
+
+## ----- ETAPAS DA EXECUÇÃO -----
+
+## grava a saída de cada etapa (Arrow IPC) e carrega as anteriores à etapa inicial do checkpoint. Desligado por padrão
+## (em produção as saídas intermediárias ocupam alguns GB): ligar na execução que será retomada e na retomada
+CHECKPOINT_ETAPAS = ler_configuracao('CHECKPOINT_ETAPAS', 0, int) == 1
+DIRETORIO_CHECKPOINT = ler_configuracao('DIRETORIO_CHECKPOINT', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.checkpoints_nexus'))
+
+## etapa a partir da qual a execução é refeita (as anteriores são carregadas do checkpoint, com NEXUS_CHECKPOINT_ETAPAS=1)
+## e última etapa executada ('' = todas). Etapas: taxa_conveniencia, ingestao, totalbus, embarca_vendas, embarca_repasse, escopo,
+## conciliacao_vendas, projecao, repasses, agrupamento, saldos, relatorios, resumo
+ETAPA_INICIAL = ler_configuracao('ETAPA_INICIAL', '')
+ETAPA_FINAL = ler_configuracao('ETAPA_FINAL', '')
+
+## quantidade de etapas independentes executadas ao mesmo tempo (1 = execução sequencial)
+THREADS_ETAPAS = ler_configuracao('THREADS_ETAPAS', 2, int)
+
+## ----- INSTRUMENTAÇÃO -----
+
+## grava um relatório (JSON) por execução com tempo, CPU, pico de memória e linhas/s de cada etapa
+RELATORIO_EXECUCAO = ler_configuracao('RELATORIO_EXECUCAO', 1, int) == 1
+DIRETORIO_EXECUCOES = ler_configuracao('DIRETORIO_EXECUCOES', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.execucoes_nexus'))
+
+## grava também o perfil (cProfile, .prof) de cada etapa no diretório da execução
+PERFIL_ETAPAS = ler_configuracao('PERFIL_ETAPAS', 0, int) == 1
+
+## ----- VERIFICAÇÃO DE EQUIVALÊNCIA -----
+
+## configurações (NOME=valor, separadas por vírgula) da implementação de referência e da otimizada comparadas
+## pelo equivalencia.py; a otimizada parte das configurações atuais
+EQUIVALENCIA_REFERENCIA = ler_configuracao('EQUIVALENCIA_REFERENCIA', 'COMPACTAR_MEMORIA=0,MODO_CENTAVOS=0,CALCULO_VALORES=colunas,LEITOR_EXCEL=pandas,NUMERO_PROCESSOS=1,THREADS_ETAPAS=1,'
+                                                                      'PAREAMENTO=merge_asof,CALCULO_RESUMO=grupos,REGRAS_PROJECAO=fixas,'
+                                                                      'CONSULTA_VENDAS=merge,CONVERSAO_DATAS=linhas,PROJECAO=expandida,CALCULO_SALDOS=merge')
+EQUIVALENCIA_OTIMIZADA = ler_configuracao('EQUIVALENCIA_OTIMIZADA', '')
+DIRETORIO_EQUIVALENCIA = ler_configuracao('DIRETORIO_EQUIVALENCIA', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.equivalencia_nexus'))
+
+## diferença aceita entre os valores numéricos: |referência - otimizada| <= absoluta + relativa * |referência|
+TOLERANCIA_ABSOLUTA = ler_configuracao('TOLERANCIA_ABSOLUTA', 1e-9, float)
+TOLERANCIA_RELATIVA = ler_configuracao('TOLERANCIA_RELATIVA', 0.0, float)
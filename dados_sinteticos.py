@@ -0,0 +1,501 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from totalbus import COLUNAS_TOTALBUS, DEFINICAO_EMPRESAS
+from embarca_vendas import COLUNAS_EMBARCA_VENDAS
+from embarca_repasse import COLUNAS_EMBARCA_REPASSE, tratar_abas_repasse
+from esquemas import ESQUEMAS, conversores_esquema, aplicar_datas
+from datas import mes_ordinal, periodos_mes
+
+## ----- GERADOR DE DADOS SINTÉTICOS -----
+
+## gera as exportações das três fontes e a tabela de taxa de conveniência nos mesmos layouts lidos pelo
+## Nexus, sem dados reais de passageiros, para reproduzir problemas de desempenho e medir o sistema em escala:
+##   Totalbus/totalbus_AAAAMM.csv (ou .xlsx)      as 16 colunas do processamento_totalbus, uma exportação por mês
+##   Embarca_Vendas/vendas_embarca_NN.xlsx        aba Base_Aprovados
+##   Embarca_Repasse/AAAAMM_repasse.xlsx          abas Base_Aprov e Base_Canc, uma planilha por mês de repasse
+##   Tabela Tx Conv.xlsx                          % da taxa de conveniência por dia (Planilha1) e operadoras (Planilha2)
+## os volumes, a distribuição de parcelas, as proporções de cancelamento e as taxas de inconsistência são
+## parâmetros (PARAMETROS_PADRAO); a mesma semente gera sempre os mesmos arquivos.
+##
+## uso: python dados_sinteticos.py <diretório> [bilhetes] [semente]
+
+PARAMETROS_PADRAO = {
+    'bilhetes': 10_000,
+    'semente': 0,
+    'inicio': '2024-08-01',
+    'meses': 12,
+
+    ## peso de cada empresa (código do Totalbus) nas vendas
+    'empresas': {1: 0.45, 3: 0.25, 6: 0.2, 17: 0.1},
+
+    ## meio de pagamento e quantidade de parcelas das vendas no cartão (PIX é sempre à vista)
+    'proporcao_pix': 0.35,
+    'parcelas': {1: 0.45, 2: 0.15, 3: 0.15, 4: 0.05, 6: 0.1, 10: 0.05, 12: 0.05},
+
+    ## canal de venda (agência do Totalbus) e comissão da Embarca em cada canal
+    'canais': {'999-50': 0.6, '999-51': 0.3, '999-52': 0.1},
+    'comissao_canais': {'999-50': 0.03, '999-51': 0.03, '999-52': 0.05},
+    'taxa_conveniencia': 3.0,
+
+    ## cancelamentos: proporção dos bilhetes, parte cancelada no mesmo mês da venda e multa (% da tarifa)
+    'proporcao_cancelados': 0.12,
+    'proporcao_cancelados_mesmo_mes': 0.4,
+    'percentual_multa': 0.05,
+
+    ## inconsistências das exportações (proporção das linhas)
+    'inconsistencias': {
+        'cancelado_sem_agencia': 0.05,      ## cancelamento do Totalbus sem AGENCIA ORIGINAL
+        'fora_embarca_vendas': 0.05,        ## bilhete ausente do relatório de vendas da Embarca
+        'sem_repasse': 0.03,                ## bilhete ausente dos repasses
+        'repasse_sem_canal': 0.01,          ## repasse sem Canal
+        'repasse_sem_parcela': 0.01,        ## repasse sem 'parcelas pagas'
+        'ajustes': 0.005                    ## repasses de ajuste (order_id = 'AJUSTE')
+    },
+
+    ## formato das exportações do Totalbus ('csv' ou 'xlsx') e limite de linhas por planilha do Excel
+    'formato_totalbus': 'csv',
+    'linhas_por_planilha': 1_000_000,
+
+    ## processos utilizados na gravação das planilhas
+    'processos': max(1, (os.cpu_count() or 1) - 1)
+}
+
+## nome de cada canal (Canal dos repasses da Embarca)
+NOMES_CANAIS = {'999-50': 'Web', '999-51': 'App', '999-52': 'Whatsapp'}
+
+def sortear(gerador, pesos, quantidade):
+
+    '''
+    Retorna:
+    np.ndarray: valores sorteados conforme o dicionário {valor: peso}.
+    '''
+
+    valores = np.array(list(pesos))
+    probabilidades = np.array(list(pesos.values()), dtype=float)
+
+    return valores[gerador.choice(len(valores), quantidade, p=probabilidades / probabilidades.sum())]
+
+## ----- BILHETES -----
+
+def gerar_bilhetes(parametros):
+
+    '''
+    Função para sortear os bilhetes vendidos (uma linha por bilhete), base de todas as fontes.
+
+    Retorna:
+    pd.DataFrame: empresa, bilhete, transação, datas, valores, pagamento, canal e cancelamento de cada bilhete.
+    '''
+
+    gerador = np.random.default_rng(parametros['semente'])
+    n = parametros['bilhetes']
+    inconsistencias = parametros['inconsistencias']
+
+    inicio = pd.Timestamp(parametros['inicio'])
+    fim = inicio + pd.DateOffset(months=parametros['meses'])
+    minutos = int((fim - inicio) / pd.Timedelta(minutes=1))
+
+    bilhetes = pd.DataFrame({'EMPRESA': sortear(gerador, parametros['empresas'], n)})
+
+    ## numeração sequencial por empresa e transações distintas
+    bilhetes['NUMERO BILHETE'] = bilhetes.groupby('EMPRESA').cumcount().to_numpy() + 100_000
+    bilhetes['ID TRANSACAO ORIGINAL'] = gerador.choice(9 * 10**11, n, replace=False) + 10**11
+
+    ## vendas em ordem cronológica, com os minutos sorteados no período
+    bilhetes['DATA HORA VENDA'] = inicio + pd.to_timedelta(np.sort(gerador.integers(0, minutos, n)), unit='min')
+    bilhetes['DATA HORA VIAGEM'] = bilhetes['DATA HORA VENDA'] + pd.to_timedelta(gerador.integers(60, 45 * 24 * 60, n), unit='min')
+
+    ## valores em centavos inteiros (tarifa com distribuição assimétrica, como nas passagens rodoviárias)
+    tarifa = np.clip(np.rint(gerador.lognormal(np.log(12_000), 0.5, n)), 2_000, 80_000)
+    pedagio = gerador.choice([0, 0, 250, 480, 730], n)
+    taxa_emb = gerador.choice([0, 450, 600, 900], n)
+    bilhetes['TARIFA'] = tarifa / 100
+    bilhetes['PEDAGIO'] = pedagio / 100
+    bilhetes['TAXA_EMB'] = taxa_emb / 100
+    bilhetes['TOTAL DO BILHETE'] = (tarifa + pedagio + taxa_emb) / 100
+
+    ## pagamento e parcelas
+    pix = gerador.random(n) < parametros['proporcao_pix']
+    bilhetes['FORMA PAGAMENTO 1'] = np.where(pix, 'PIX', 'CRÉDITO')
+    bilhetes['Metodo de pagamento'] = np.where(pix, 'PIX', 'CREDIT_CARD')
+    bilhetes['parcelas'] = np.where(pix, 1, sortear(gerador, parametros['parcelas'], n))
+
+    bilhetes['AGENCIA ORIGINAL'] = sortear(gerador, parametros['canais'], n)
+    bilhetes['NOME PASSAGEIRO'] = 'PASSAGEIRO ' + pd.Series(np.arange(n)).astype(str).str.zfill(8)
+
+    ## cancelamentos: no mesmo mês da venda (até o fim do mês) ou nos meses seguintes
+    cancelado = gerador.random(n) < parametros['proporcao_cancelados']
+    mesmo_mes = gerador.random(n) < parametros['proporcao_cancelados_mesmo_mes']
+    venda = bilhetes['DATA HORA VENDA'].to_numpy('datetime64[m]')
+    fim_mes = ((venda.astype('datetime64[M]') + 1).astype('datetime64[m]') - venda).astype(np.int64) - 1
+    atraso_mesmo_mes = (gerador.random(n) * fim_mes).astype(np.int64)
+    atraso_outro_mes = fim_mes + gerador.integers(1, 90 * 24 * 60, n)
+    atraso = np.where(mesmo_mes, atraso_mesmo_mes, atraso_outro_mes)
+    bilhetes['DATA CANCELAMENTO'] = (bilhetes['DATA HORA VENDA'] + pd.to_timedelta(atraso, unit='min')).where(cancelado)
+    bilhetes['VALOR MULTA'] = np.where(cancelado, np.round(bilhetes['TARIFA'] * parametros['percentual_multa'], 2), np.nan)
+
+    ## inconsistências sorteadas por bilhete
+    bilhetes['cancelado_sem_agencia'] = cancelado & (gerador.random(n) < inconsistencias['cancelado_sem_agencia'])
+    bilhetes['fora_embarca_vendas'] = gerador.random(n) < inconsistencias['fora_embarca_vendas']
+    bilhetes['sem_repasse'] = gerador.random(n) < inconsistencias['sem_repasse']
+
+    return bilhetes
+
+## ----- FONTES -----
+
+def gerar_totalbus(bilhetes):
+
+    '''
+    Retorna:
+    pd.DataFrame: exportação do Totalbus (COLUNAS_TOTALBUS): uma venda por bilhete e uma linha 'C' por cancelamento.
+    '''
+
+    vendas = bilhetes.assign(**{
+        'STATUS BILHETE': 'V',
+        'AGENCIA EMISSORA': bilhetes['AGENCIA ORIGINAL'],
+        'VALOR MULTA': np.nan,
+        'DATA HORA VENDA PARA CANC.': pd.NaT
+    })
+
+    cancelados = bilhetes[bilhetes['DATA CANCELAMENTO'].notna()]
+    cancelamentos = cancelados.assign(**{
+        'STATUS BILHETE': 'C',
+        'AGENCIA EMISSORA': cancelados['AGENCIA ORIGINAL'],
+        'AGENCIA ORIGINAL': cancelados['AGENCIA ORIGINAL'].where(~cancelados['cancelado_sem_agencia']),
+        'DATA HORA VENDA PARA CANC.': cancelados['DATA HORA VENDA'],
+        'DATA HORA VENDA': cancelados['DATA CANCELAMENTO']
+    })
+
+    totalbus = pd.concat([vendas[COLUNAS_TOTALBUS], cancelamentos[COLUNAS_TOTALBUS]], ignore_index=True)
+
+    return totalbus.sort_values('DATA HORA VENDA', kind='stable', ignore_index=True)
+
+def gerar_embarca_vendas(bilhetes):
+
+    '''
+    Retorna:
+    pd.DataFrame: relatório de vendas da Embarca (COLUNAS_EMBARCA_VENDAS), sem os bilhetes "fora_embarca_vendas".
+    '''
+
+    vendas = bilhetes[~bilhetes['fora_embarca_vendas']]
+
+    return pd.DataFrame({
+        'Operadora': vendas['EMPRESA'].map(DEFINICAO_EMPRESAS).to_numpy(),
+        'ID do Bilhete': vendas['ID TRANSACAO ORIGINAL'].to_numpy(),
+        'Metodo de pagamento': vendas['Metodo de pagamento'].to_numpy(),
+        'parcelas': vendas['parcelas'].to_numpy(),
+        'Data da Compra': vendas['DATA HORA VENDA'].to_numpy()
+    })[COLUNAS_EMBARCA_VENDAS]
+
+def gerar_repasses(bilhetes, parametros):
+
+    '''
+    Função para montar os repasses da Embarca: uma linha aprovada por parcela, no mês em que é repassada,
+    e uma linha cancelada por bilhete cancelado, no mês do cancelamento.
+
+    Retorna:
+    dict: {AAAAMM: {'Base_Aprov': DataFrame, 'Base_Canc': DataFrame}} com as COLUNAS_EMBARCA_REPASSE.
+    '''
+
+    gerador = np.random.default_rng(parametros['semente'] + 1)
+    inconsistencias = parametros['inconsistencias']
+
+    repassados = bilhetes[~bilhetes['sem_repasse']].reset_index(drop=True)
+    parcelas = repassados['parcelas'].to_numpy()
+
+    ## valores por parcela, com a taxa de conveniência e a comissão do canal
+    total = repassados['TOTAL DO BILHETE'].to_numpy()
+    conveniencia = np.round(total * parametros['taxa_conveniencia'] / 100, 2)
+    comissao = np.round((total + conveniencia) * repassados['AGENCIA ORIGINAL'].map(parametros['comissao_canais']).to_numpy(), 2)
+
+    def por_parcela(valores):
+        return np.round(valores / parcelas, 2)
+
+    ## data da compra na Embarca: alguns minutos de diferença do Totalbus (pareada pela data mais próxima)
+    compra = repassados['DATA HORA VENDA'] + pd.to_timedelta(gerador.integers(-180, 180, len(repassados)), unit='min')
+
+    base = pd.DataFrame({
+        'Operadora': repassados['EMPRESA'].map(DEFINICAO_EMPRESAS).to_numpy(),
+        'order_id': 'O' + repassados['ID TRANSACAO ORIGINAL'].astype(str).to_numpy(),
+        'ID do Bilhete': repassados['ID TRANSACAO ORIGINAL'].to_numpy(),
+        'Nº do Sistema': repassados['NUMERO BILHETE'].to_numpy(),
+        'Forma de pagamento': repassados['Metodo de pagamento'].to_numpy(),
+        'id_adiquirente': 'A' + repassados['ID TRANSACAO ORIGINAL'].astype(str).to_numpy(),
+        'Canal': repassados['AGENCIA ORIGINAL'].map(NOMES_CANAIS).to_numpy(),
+        'Nome do passageiro': repassados['NOME PASSAGEIRO'].str.title().to_numpy(),
+        'Status': 'Aprovado',
+        'Data da Compra': compra.to_numpy(),
+        'Data do Cancelamento': pd.NaT,
+        'Tarifa': por_parcela(repassados['TARIFA'].to_numpy()),
+        'Taxas': por_parcela((repassados['PEDAGIO'] + repassados['TAXA_EMB']).to_numpy()),
+        'Valor Total': por_parcela(total),
+        'Parcelas': parcelas,
+        'Taxa de conveniência': por_parcela(conveniencia),
+        'Valor do Cupom (R$)': 0.0,
+        'Promoção': 0.0,
+        'Descontos vindos da API': 0.0,
+        'Comissão': por_parcela(comissao),
+        'Repasse': por_parcela(total + conveniencia - comissao),
+        'Multa': 0.0,
+        'Marketing Digital': np.nan,
+        'parcelas pagas': None,
+        'URL do BPe': 'https://bpe.exemplo/' + repassados['ID TRANSACAO ORIGINAL'].astype(str).to_numpy(),
+        'URL do Bilhete': 'https://bilhete.exemplo/' + repassados['ID TRANSACAO ORIGINAL'].astype(str).to_numpy(),
+        'Seguro': 0.0,
+        'Repasse Seguro': 0.0,
+        'Repasse Seguro Parcela': 0.0,
+        'Obs': np.nan
+    })
+
+    ## parcelas aprovadas: parcela k repassada k meses após a compra
+    posicao = np.repeat(np.arange(len(base)), parcelas)
+    numero_parcela = np.arange(len(posicao)) - np.repeat(np.cumsum(parcelas) - parcelas, parcelas) + 1
+    aprovados = base.take(posicao).reset_index(drop=True)
+    aprovados['parcelas pagas'] = pd.Series(numero_parcela).astype(str) + '/' + pd.Series(parcelas[posicao]).astype(str)
+    mes_aprovados = periodos_mes(mes_ordinal(aprovados['Data da Compra']) + numero_parcela).strftime('%Y%m')
+
+    ## cancelamentos: valores do bilhete inteiro e multa, no mês do cancelamento
+    cancelado = repassados['DATA CANCELAMENTO'].notna().to_numpy()
+    cancelados = base[cancelado].reset_index(drop=True)
+    cancelados['Status'] = 'Cancelado'
+    cancelados['Data do Cancelamento'] = repassados.loc[cancelado, 'DATA CANCELAMENTO'].to_numpy()
+    cancelados['Multa'] = repassados.loc[cancelado, 'VALOR MULTA'].to_numpy()
+    cancelados['parcelas pagas'] = '1/' + cancelados['Parcelas'].astype(str)
+    mes_cancelados = periodos_mes(mes_ordinal(cancelados['Data do Cancelamento'])).strftime('%Y%m')
+
+    ## inconsistências dos repasses
+    for df in (aprovados, cancelados):
+        df.loc[gerador.random(len(df)) < inconsistencias['repasse_sem_canal'], 'Canal'] = None
+        df.loc[gerador.random(len(df)) < inconsistencias['repasse_sem_parcela'], 'parcelas pagas'] = None
+        df.loc[gerador.random(len(df)) < inconsistencias['ajustes'], 'order_id'] = 'AJUSTE'
+
+    repasses = {}
+
+    for aba, df, meses in (('Base_Aprov', aprovados, mes_aprovados), ('Base_Canc', cancelados, mes_cancelados)):
+        for mes, posicoes in pd.Series(np.arange(len(df))).groupby(np.asarray(meses)):
+            repasses.setdefault(mes, {})[aba] = df.take(posicoes.to_numpy())
+
+    for abas in repasses.values():
+        for aba in ('Base_Aprov', 'Base_Canc'):
+            abas.setdefault(aba, base.iloc[:0])
+
+    return repasses
+
+def gerar_taxa_conveniencia(parametros):
+
+    '''
+    Retorna:
+    dict: abas da "Tabela Tx Conv.xlsx" (% por dia no período das vendas e código de cada operadora).
+    '''
+
+    inicio = pd.Timestamp(parametros['inicio']) - pd.DateOffset(months=1)
+    fim = pd.Timestamp(parametros['inicio']) + pd.DateOffset(months=parametros['meses'] + 1)
+
+    return {
+        'Planilha1': pd.DataFrame({'Data': pd.date_range(inicio, fim, freq='D'), '% Tx Conv': parametros['taxa_conveniencia']}),
+        'Planilha2': pd.DataFrame({'Código': list(DEFINICAO_EMPRESAS), 'Operadora': list(DEFINICAO_EMPRESAS.values())})
+    }
+
+## ----- FONTES EM MEMÓRIA -----
+
+def como_lido(df, fonte, nome_arquivo=None):
+
+    '''
+    Função para converter um DataFrame gerado nos tipos em que o arquivo gravado seria lido pelo Nexus
+    (conversores e datas do esquema da fonte), sem passar pelos arquivos.
+
+    Parâmetros:
+    df: DataFrame gerado (gerar_totalbus, gerar_embarca_vendas ou uma aba de gerar_repasses).
+    fonte: fonte do esquema (esquemas.ESQUEMAS).
+    nome_arquivo: quando informado, preenche a coluna 'Origem' (como em funcoes.ler_arquivo).
+    '''
+
+    esquema = ESQUEMAS[fonte]
+    df = df.reset_index(drop=True)
+
+    ## os vazios dos textos são lidos como NaN (exceto nos identificadores)
+    for coluna in df.columns[df.dtypes == object]:
+        if esquema['colunas'].get(coluna) != 'id':
+            df[coluna] = df[coluna].mask(df[coluna].isna(), np.nan)
+
+    for coluna, conversor in conversores_esquema(esquema, df.columns).items():
+        df[coluna] = df[coluna].astype(object).map(conversor)
+
+    ## tipos inferidos pelos leitores (ex.: números com vazios viram float)
+    df = aplicar_datas(df.infer_objects(), esquema)
+
+    if nome_arquivo is not None:
+        df['Origem'] = nome_arquivo
+
+    return df
+
+def gerar_fontes(**parametros):
+
+    '''
+    Função para gerar as três fontes já lidas, sem gravar os arquivos (ex.: microbenchmarks das funções).
+
+    Parâmetros:
+    parametros: valores que substituem os de PARAMETROS_PADRAO (ex.: bilhetes=50_000).
+
+    Retorna:
+    tuple: ({fonte: lista de DataFrames}, no formato de ingestao.ingestao_paralela,
+            abas da tabela de taxa de conveniência).
+    '''
+
+    parametros = {**PARAMETROS_PADRAO, **parametros}
+    parametros['inconsistencias'] = {**PARAMETROS_PADRAO['inconsistencias'], **parametros['inconsistencias']}
+
+    bilhetes = gerar_bilhetes(parametros)
+    totalbus = gerar_totalbus(bilhetes)
+    embarca_vendas = gerar_embarca_vendas(bilhetes)
+    repasses = gerar_repasses(bilhetes, parametros)
+    del bilhetes
+
+    ## Totalbus: uma exportação por mês da venda, como em gerar_dados
+    meses_totalbus = totalbus['DATA HORA VENDA'].dt.strftime('%Y%m')
+    lista_totalbus = [
+        como_lido(df_mes, 'totalbus', f'totalbus_{mes}.csv') for mes, df_mes in totalbus.groupby(meses_totalbus.to_numpy())
+    ]
+
+    lista_repasses = []
+    for mes, abas in sorted(repasses.items()):
+        nome_arquivo = f'{mes}_repasse.xlsx'
+        lista_repasses += tratar_abas_repasse(
+            como_lido(abas['Base_Aprov'], 'embarca_repasse'), como_lido(abas['Base_Canc'], 'embarca_repasse'), nome_arquivo
+        )
+
+    arquivos = {
+        'totalbus': lista_totalbus,
+        'embarca_vendas': [como_lido(embarca_vendas, 'embarca_vendas', 'vendas_embarca_01.xlsx')],
+        'embarca_repasse': lista_repasses
+    }
+
+    return arquivos, gerar_taxa_conveniencia(parametros)
+
+## ----- GRAVAÇÃO -----
+
+def gravar_planilha(caminho, abas):
+
+    '''
+    Função para gravar uma planilha (openpyxl em modo de escrita sequencial, bem mais rápido que o
+    to_excel para volumes grandes). Executada nos processos de gravação.
+
+    Parâmetros:
+    caminho: caminho do .xlsx.
+    abas: dicionário {nome da aba: DataFrame}.
+    '''
+
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+
+    for nome_aba, df in abas.items():
+        aba = planilha.create_sheet(nome_aba)
+        aba.append(list(df.columns))
+
+        ## vazios (NaN/NaT/None) viram células vazias
+        valores = df.astype(object).where(df.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            aba.append(linha)
+
+    planilha.save(caminho)
+
+    return caminho
+
+def gravar_csv_totalbus(caminho, df):
+
+    ## mesmo layout das exportações do Totalbus: ';', latin-1, vírgula decimal e datas dd/mm/aaaa hh:mm
+    df.to_csv(caminho, sep=';', decimal=',', encoding='latin-1', index=False, float_format='%.2f', date_format='%d/%m/%Y %H:%M')
+
+    return caminho
+
+def gerar_dados(destino, **parametros):
+
+    '''
+    Função para gerar e gravar o conjunto completo de arquivos sintéticos em um diretório.
+
+    Parâmetros:
+    destino: diretório de saída (recebe Totalbus, Embarca_Vendas, Embarca_Repasse e Tabela Tx Conv.xlsx).
+    parametros: valores que substituem os de PARAMETROS_PADRAO (ex.: bilhetes=1_000_000).
+
+    Retorna:
+    dict: parâmetros utilizados, quantidade de linhas de cada fonte e tempo de geração.
+    '''
+
+    parametros = {**PARAMETROS_PADRAO, **parametros}
+    parametros['inconsistencias'] = {**PARAMETROS_PADRAO['inconsistencias'], **parametros['inconsistencias']}
+    inicio = time.perf_counter()
+
+    for diretorio in ('Totalbus', 'Embarca_Vendas', 'Embarca_Repasse'):
+        os.makedirs(os.path.join(destino, diretorio), exist_ok=True)
+
+    print(f"SISTEMA: Gerando {parametros['bilhetes']} bilhetes sintéticos em {destino}...")
+
+    bilhetes = gerar_bilhetes(parametros)
+    totalbus = gerar_totalbus(bilhetes)
+    embarca_vendas = gerar_embarca_vendas(bilhetes)
+    repasses = gerar_repasses(bilhetes, parametros)
+    del bilhetes
+
+    limite = parametros['linhas_por_planilha']
+    planilhas = []
+
+    with ProcessPoolExecutor(max_workers=max(1, parametros['processos'])) as executor:
+        tarefas = []
+
+        ## Totalbus: uma exportação por mês da venda (em mais de uma planilha quando passa do limite de linhas)
+        meses_totalbus = totalbus['DATA HORA VENDA'].dt.strftime('%Y%m')
+        for mes, df_mes in totalbus.groupby(meses_totalbus.to_numpy()):
+            if parametros['formato_totalbus'] == 'csv':
+                tarefas.append(executor.submit(gravar_csv_totalbus, os.path.join(destino, 'Totalbus', f'totalbus_{mes}.csv'), df_mes))
+                continue
+            for parte, i in enumerate(range(0, len(df_mes), limite), start=1):
+                sufixo = f'_{parte:02d}' if len(df_mes) > limite else ''
+                planilhas.append((os.path.join(destino, 'Totalbus', f'totalbus_{mes}{sufixo}.xlsx'), {'Sheet1': df_mes.iloc[i:i + limite]}))
+
+        ## vendas da Embarca: planilhas de até "linhas_por_planilha" linhas
+        for parte, i in enumerate(range(0, max(len(embarca_vendas), 1), limite), start=1):
+            planilhas.append((os.path.join(destino, 'Embarca_Vendas', f'vendas_embarca_{parte:02d}.xlsx'), {'Base_Aprovados': embarca_vendas.iloc[i:i + limite]}))
+
+        ## repasses: uma planilha por mês (AAAAMM no início do nome, usado na data de recebimento)
+        for mes, abas in sorted(repasses.items()):
+            planilhas.append((os.path.join(destino, 'Embarca_Repasse', f'{mes}_repasse.xlsx'), abas))
+
+        planilhas.append((os.path.join(destino, 'Tabela Tx Conv.xlsx'), gerar_taxa_conveniencia(parametros)))
+
+        ## as maiores planilhas primeiro, para equilibrar os processos
+        planilhas.sort(key=lambda planilha: -sum(len(df) for df in planilha[1].values()))
+        tarefas += [executor.submit(gravar_planilha, caminho, abas) for caminho, abas in planilhas]
+
+        for tarefa in tarefas:
+            print(f'SISTEMA: Gravado {os.path.relpath(tarefa.result(), destino)}')
+
+    resumo = {
+        'parametros': {chave: valor for chave, valor in parametros.items() if chave != 'processos'},
+        'linhas': {
+            'totalbus': len(totalbus),
+            'embarca_vendas': len(embarca_vendas),
+            'embarca_repasse': sum(len(df) for abas in repasses.values() for df in abas.values())
+        },
+        'tempo_s': round(time.perf_counter() - inicio, 1)
+    }
+
+    with open(os.path.join(destino, 'parametros_sinteticos.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(resumo, arquivo, indent=2, ensure_ascii=False, default=str)
+
+    print(f"SISTEMA: Dados sintéticos gerados em {resumo['tempo_s']} s: {resumo['linhas']}")
+
+    return resumo
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('uso: python dados_sinteticos.py <diretório> [bilhetes] [semente]')
+        sys.exit(1)
+
+    gerar_dados(sys.argv[1], **dict(zip(['bilhetes', 'semente'], (int(arg) for arg in sys.argv[2:4]))))
@@ -0,0 +1,108 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import numpy as np
+import pandas as pd
+from configuracoes import CONVERSAO_DATAS
+
+## ----- CONVERSÃO DE DATAS -----
+
+## conversão única de datas para todas as etapas:
+##   - colunas já em datetime não são convertidas novamente (apenas fuso/normalização, quando pedidos)
+##   - textos são convertidos apenas uma vez por valor distinto (os relatórios repetem as mesmas poucas
+##     centenas de datas em milhares de linhas) e o resultado é propagado às linhas pelo código do valor
+##   - datas com fuso horário perdem o fuso em um único ponto (mantendo o horário local, como o tz_localize(None))
+## a lógica de mês usa o número do mês (meses desde 1970-01, o mesmo ordinal do pd.Period mensal), sem
+## formatar textos ou montar Periods linha a linha
+## com NEXUS_CONVERSAO_DATAS=linhas (referência da verificação de equivalência) as datas são convertidas pelo
+## pd.to_datetime em todas as linhas e o número do mês vem do pd.Period mensal, como no código original
+
+## número do mês das datas vazias (o mesmo valor do NaT)
+MES_VAZIO = np.iinfo(np.int64).min
+
+def remover_fuso(serie):
+
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        return serie.dt.tz_localize(None)
+
+    return serie
+
+def interpretar_datas(serie, formato=None, dayfirst=False, normalizar=False):
+
+    '''
+    Função para converter uma coluna em datas, interpretando cada valor distinto uma única vez.
+
+    Parâmetros:
+    serie: Series com as datas (texto, datetime ou objetos de data).
+    formato: formato explícito das datas (None = inferido, como no pd.to_datetime).
+    dayfirst: na inferência, considera o dia antes do mês.
+    normalizar: remove o horário (meia-noite).
+
+    Retorna:
+    pd.Series: datas (datetime64, sem fuso), com o mesmo índice e nome; valores inválidos viram NaT.
+    '''
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = remover_fuso(serie)
+    elif CONVERSAO_DATAS == 'linhas':
+        datas = remover_fuso(pd.to_datetime(serie, format=formato, dayfirst=dayfirst, errors='coerce'))
+    else:
+        codigos, unicos = pd.factorize(serie)
+        convertidos = pd.to_datetime(pd.Series(unicos, dtype=object), format=formato, dayfirst=dayfirst, errors='coerce')
+        convertidos = remover_fuso(convertidos).to_numpy()
+
+        ## o código -1 (valores vazios) aponta para o NaT incluído no final
+        valores = np.append(convertidos, np.array(['NaT'], dtype=convertidos.dtype))[codigos]
+        datas = pd.Series(valores, index=serie.index, name=serie.name)
+
+    return datas.dt.normalize() if normalizar else datas
+
+## ----- MESES -----
+
+def mes_ordinal(datas):
+
+    '''
+    Retorna:
+    np.ndarray: número do mês (int64, meses desde 1970-01) de cada data; MES_VAZIO nas datas vazias.
+    '''
+
+    if CONVERSAO_DATAS == 'linhas':
+        return pd.Series(datas).dt.to_period('M').array.asi8
+
+    return pd.Series(datas).to_numpy('datetime64[M]').astype(np.int64)
+
+def mesmo_mes(datas_a, datas_b):
+
+    '''
+    Retorna:
+    np.ndarray: máscara das linhas em que as duas datas estão no mesmo mês (False quando alguma é vazia).
+    '''
+
+    meses_a = mes_ordinal(datas_a)
+
+    return (meses_a == mes_ordinal(datas_b)) & (meses_a != MES_VAZIO)
+
+def periodos_mes(ordinais):
+
+    '''
+    Retorna:
+    pd.PeriodIndex: meses (pd.Period mensal) dos números de mês informados (NaT para MES_VAZIO).
+    '''
+
+    return pd.PeriodIndex.from_ordinals(np.asarray(ordinais, dtype=np.int64), freq='M')
+
+def fatorar_meses(datas):
+
+    '''
+    Função para separar as datas por mês.
+
+    Retorna:
+    tuple: (código do mês de cada linha, -1 nas datas vazias; meses em ordem crescente como pd.PeriodIndex).
+    '''
+
+    unicos, codigos = np.unique(mes_ordinal(datas), return_inverse=True)
+
+    if len(unicos) and unicos[0] == MES_VAZIO:
+        unicos = unicos[1:]
+        codigos = codigos - 1
+
+    return codigos, periodos_mes(unicos)
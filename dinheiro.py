@@ -0,0 +1,68 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import numpy as np
+import pandas as pd
+from configuracoes import MODO_CENTAVOS
+
+## ----- VALORES EM CENTAVOS -----
+
+## no modo centavos (NEXUS_MODO_CENTAVOS=1) os cálculos monetários são feitos em inteiros (int64, centavos):
+##   - os valores lidos são arredondados para centavos antes das contas
+##   - a divisão em parcelas distribui o resto (centavos) nas primeiras parcelas, então a soma das parcelas
+##     é exatamente o total do bilhete
+##   - as somas de saldo e do resumo são exatas e o saldo zerado é comparado com == 0
+## as colunas continuam sendo gravadas em reais (centavos / 100) nos relatórios
+
+def para_centavos(valores):
+
+    '''
+    Retorna:
+    pd.Series: valores em centavos (Int64, vazios continuam vazios), arredondados para o centavo mais próximo.
+    '''
+
+    valores = pd.Series(valores)
+
+    return pd.Series(np.rint(valores.to_numpy(dtype=float) * 100), index=valores.index).astype('Int64')
+
+def de_centavos(centavos):
+
+    '''
+    Retorna:
+    pd.Series: valores em reais (float64, vazios como NaN).
+    '''
+
+    centavos = pd.Series(centavos)
+
+    return centavos.astype('Float64').div(100).astype(float)
+
+def arredondar_centavos(valores):
+
+    '''
+    Função para arredondar valores em reais para o centavo (resultado em reais).
+    '''
+
+    return de_centavos(para_centavos(valores))
+
+def dividir_em_parcelas(total_centavos, quantidade_parcelas, numero_parcela):
+
+    '''
+    Função para dividir um total (centavos) em parcelas inteiras cuja soma é exatamente o total.
+    O resto da divisão é distribuído, um centavo por parcela, a partir da primeira.
+
+    Parâmetros:
+    total_centavos: total de cada linha, em centavos.
+    quantidade_parcelas: quantidade de parcelas de cada linha.
+    numero_parcela: posição da parcela dentro do total (0 = primeira).
+
+    Retorna:
+    pd.Series: valor da parcela, em centavos (Int64).
+    '''
+
+    total_centavos = pd.Series(total_centavos).astype('Int64')
+    quantidade_parcelas = pd.Series(quantidade_parcelas, index=total_centavos.index).astype('Int64')
+    numero_parcela = pd.Series(numero_parcela, index=total_centavos.index).astype('Int64')
+
+    base = total_centavos // quantidade_parcelas
+    resto = total_centavos - base * quantidade_parcelas
+
+    return base + (numero_parcela < resto).astype('Int64')
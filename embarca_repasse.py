@@ -4,6 +4,32 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import timedelta
+from cache_ingestao import ler_com_cache
+from esquemas import ESQUEMAS, ler_excel_esquema
+from chaves import COLUNA_CHAVE, codigos_grupo, contagem_por_grupo
+from pareamento import indexar_pareamento, mesclar_mais_proximo
+from calendario import proximo_dia_util
+from regras import tabela_decisao, avaliar_tabela, valores_por_regra, resultado_regras
+from configuracoes import MODO_CENTAVOS, REGRAS_PROJECAO
+from dinheiro import arredondar_centavos
+from datas import interpretar_datas, mesmo_mes
+from instrumentacao import instrumentar
+
+## ----- DEFININDO COLUNAS -----
+
+COLUNAS_EMBARCA_REPASSE = ['Operadora', 'order_id', 'ID do Bilhete', 'Nº do Sistema', 'Forma de pagamento',
+                           'id_adiquirente', 'Canal', 'Nome do passageiro', 'Status', 'Data da Compra',
+                           'Data do Cancelamento', 'Tarifa', 'Taxas', 'Valor Total', 'Parcelas',
+                           'Taxa de conveniência', 'Valor do Cupom (R$)', 'Promoção', 'Descontos vindos da API',
+                           'Comissão', 'Repasse', 'Multa', 'Marketing Digital', 'parcelas pagas', 'URL do BPe',
+                           'URL do Bilhete', 'Seguro', 'Repasse Seguro', 'Repasse Seguro Parcela', 'Obs']
+
+## política de tipos dos arquivos de repasse lidos (memoria.compactar_lista): as URLs não vão para o
+## relatório final e viram string[pyarrow]; o 'order_id' continua texto comum por ser comparado com 'AJUSTE'
+POLITICA_MEMORIA_EMBARCA_REPASSE = {
+    'categorias': ['Origem', 'Forma de pagamento', 'Canal', 'Status', 'parcelas pagas', 'Obs'],
+    'textos': ['URL do BPe', 'URL do Bilhete']
+}
 
 ## ----- FUNÇÃO DE PROCESSAMENTO DOS REPASSES DA EMBARCA -----
 
@@ -25,22 +51,28 @@ def ler_arquivo_repasse(caminho_repasse, colunas_repasse):
 
     ## carregando o arquivo
     try:
-        df_geral = pd.read_excel(caminho_repasse, sheet_name=['Base_Aprov', 'Base_Canc'], usecols=colunas_repasse)
+        df_geral = ler_com_cache(ler_excel_esquema, caminho_repasse, colunas=colunas_repasse, esquema=ESQUEMAS['embarca_repasse'], sheet=['Base_Aprov', 'Base_Canc'])
         df_aprov, df_canc = df_geral['Base_Aprov'], df_geral['Base_Canc']
     except Exception as e:
         print(f'SISTEMA: Erro ao processar o arquivo "{nome_arquivo}". ({e})')
 
+    return tratar_abas_repasse(df_aprov, df_canc, nome_arquivo)
+
+def tratar_abas_repasse(df_aprov, df_canc, nome_arquivo):
+
+    '''
+    Função para tratar as abas lidas de um arquivo de repasses (datas, sinal dos cancelados e origem).
+
+    Retorna:
+        list: [df_aprov, df_canc] tratados.
+    '''
+
     ## definindo as datas de cada dataframe
 
-    if 'Data da Compra' in df_aprov.columns:
-        df_aprov['Data da Compra'] = pd.to_datetime(df_aprov['Data da Compra'], errors='coerce').dt.tz_localize(None).dt.normalize()
-    if 'Data do Cancelamento' in df_aprov.columns:
-        df_aprov['Data do Cancelamento'] = pd.to_datetime(df_aprov['Data do Cancelamento'], errors='coerce').dt.tz_localize(None).dt.normalize()           
-    
-    if 'Data da Compra' in df_canc.columns:
-        df_canc['Data da Compra'] = pd.to_datetime(df_canc['Data da Compra'], errors='coerce').dt.tz_localize(None).dt.normalize()
-    if 'Data do Cancelamento' in df_canc.columns:
-        df_canc['Data do Cancelamento'] = pd.to_datetime(df_canc['Data do Cancelamento'], errors='coerce').dt.tz_localize(None).dt.normalize() 
+    for df_base in [df_aprov, df_canc]:
+        for col in ['Data da Compra', 'Data do Cancelamento']:
+            if col in df_base.columns:
+                df_base[col] = interpretar_datas(df_base[col], normalizar=True)
 
     ## ajustando o valor negativo dos cancelados
     colunas_valor_cancelado = ['Tarifa', 'Taxas', 'Valor Total', 'Taxa de conveniência','Repasse', 'Seguro', 'Repasse Seguro', 'Repasse Seguro Parcela']
@@ -56,7 +88,7 @@ def ler_arquivo_repasse(caminho_repasse, colunas_repasse):
 
 ## ----- AGRUPANDO/CONSOLIDANDO RELATÓRIOS -----
 
-def consolidar_arquivos_repasses(diretorio_repasse, colunas):
+def consolidar_arquivos_repasses(diretorio_repasse, colunas, lista=None):
 
     '''
     Função para LER/CARREGAR os arquivos de repasses e agrupar todos os dados recebiso em um único data frame.
@@ -64,29 +96,32 @@ def consolidar_arquivos_repasses(diretorio_repasse, colunas):
     Parametros:
         caminho_repasse: diretório da pasta.
         colunas_repasse: definição das colunas que serão consideradas nos dataframes.
+        lista: lista de DataFrames já lidos (ingestão paralela). Caso seja None, os arquivos são lidos um a um.
 
     Retorna:
         pd.DataFrame: Um DataFrame consolidado com os dados processados.
     '''
 
-    ## criando lista vazia
-    lista = []
+    if lista is None:
 
-    ## definindo os arquivos dentro do diretório/repasse
-    caminhos_arquivos = [
-        os.path.join(diretorio_repasse, f) for f in os.listdir(diretorio_repasse) if f.endswith(('.xlsx', '.xls'))
-    ]
+        ## criando lista vazia
+        lista = []
 
-    ## percorrendo cada arquivo e lendo
-    for caminho in caminhos_arquivos:
-        try:
-            df_aprov, df_canc = ler_arquivo_repasse(caminho, colunas)
-            if df_aprov is not None:
-                lista.append(df_aprov)
-            if df_canc is not None:
-                lista.append(df_canc)
-        except Exception as e:
-            print(f'AVISO: Erro ao processar os arquivos de repasse da Embarca. ({e})')
+        ## definindo os arquivos dentro do diretório/repasse
+        caminhos_arquivos = [
+            os.path.join(diretorio_repasse, f) for f in os.listdir(diretorio_repasse) if f.endswith(('.xlsx', '.xls'))
+        ]
+
+        ## percorrendo cada arquivo e lendo
+        for caminho in caminhos_arquivos:
+            try:
+                df_aprov, df_canc = ler_arquivo_repasse(caminho, colunas)
+                if df_aprov is not None:
+                    lista.append(df_aprov)
+                if df_canc is not None:
+                    lista.append(df_canc)
+            except Exception as e:
+                print(f'AVISO: Erro ao processar os arquivos de repasse da Embarca. ({e})')
 
     ## concatenando/agrupando os arquivos
     if lista:
@@ -120,15 +155,9 @@ def pre_processamento_embarca(df):
     ## incluindo colunas
     df['Data de Recebimento'] = df['Origem'].str[:4] + '-' + df['Origem'].str[4:6] + '-01'
     df['Parcela_Atual'] = df['parcelas pagas'].astype(str).str.split('/').str[0].replace('nan', None)
-    df['Nº do Sistema'] = df['Nº do Sistema'].astype(str).str.split('.').str[0].replace('nan', None)
-    df['ID Transacao'] = df['ID Transacao'].astype(str).str.split('.').str[0].replace('nan', None)
 
-    df['MesAno_Venda'] = df['Data da Compra'].dt.strftime('%Y-%m')
-    df['MesAno_Cancelado'] = df['Data do Cancelamento'].dt.strftime('%Y-%m')
-
-    condicional_mes_cancelamento = [df['MesAno_Venda'] == df['MesAno_Cancelado']]
-    resultado_mes_cancelamento = [1]
-    df['Cancelamento_Mesmo_Mes'] = np.select(condicional_mes_cancelamento, resultado_mes_cancelamento, 0)
+    ## cancelamento no mesmo mês da compra (comparação pelo número do mês)
+    df['Cancelamento_Mesmo_Mes'] = mesmo_mes(df['Data da Compra'], df['Data do Cancelamento']).astype(int)
 
     df = df.sort_values('Data de Recebimento')
 
@@ -136,51 +165,40 @@ def pre_processamento_embarca(df):
 
 ## ----- AGRUPANDO A PLANILHA DO CLIENTE COM O TOTALBUS PARA TRAZER A DATA BPE
 
-def mesclagem_totalbus(df_embarca, df_totalbus):
+def mesclagem_totalbus(df_embarca, indice_vendas_totalbus):
 
     '''
     Função para mesclar os arquivos processados da EMBARCA com o do TOTALBUS/VENDAS, cujo a finalidade é trazer a DATA BPE.
 
     Parametros:
         df_embarca: Data frame da EMBARCA.
-        df_totalbus: Data frame do TOTALBUS.
+        indice_vendas_totalbus: índice das vendas do TOTALBUS (totalbus.indexar_vendas), com a chave atribuída.
 
     Retorna:
         pd.DataFrame: Data frame da Embarca com a coluna DATA BPE preenchida, ou com a emissão do bilhete, ou com a própria data da compra.
     '''
 
-    ## pré processamento do data frame totalbus
-    df_totalbus_conciliador = df_totalbus.copy()
-
-    df_totalbus_conciliador.rename(columns={'DATA HORA VENDA PARA CANC.': 'Data BPE'}, inplace=True)
+    ## vendas do totalbus já separadas no índice das vendas (o pareamento por transação é montado uma única vez)
+    df_totalbus_conciliador = indice_vendas_totalbus['vendas'][['NOME_EMPRESA', 'Data BPE', 'ID TRANSACAO ORIGINAL', COLUNA_CHAVE]]
 
-    df_totalbus_conciliador['Data BPE'] = pd.to_datetime(df_totalbus_conciliador['Data BPE'], errors='coerce')
-    df_totalbus_conciliador['ID TRANSACAO ORIGINAL'] = df_totalbus_conciliador['ID TRANSACAO ORIGINAL'].astype(str)
+    if indice_vendas_totalbus['pareamento'] is None:
+        indice_vendas_totalbus['pareamento'] = indexar_pareamento(df_totalbus_conciliador[COLUNA_CHAVE], df_totalbus_conciliador['Data BPE'])
 
-    ## filtrando os dados necessários e ordenando
-    df_totalbus_conciliador = df_totalbus_conciliador[df_totalbus_conciliador['STATUS BILHETE'] == 'V']
-    df_totalbus_conciliador = df_totalbus_conciliador[['NOME_EMPRESA', 'Data BPE', 'ID TRANSACAO ORIGINAL']]
-    df_totalbus_conciliador = df_totalbus_conciliador.sort_values(by='Data BPE')
-
-    ## pré processamento do data frame principal
-    df_embarca['Data da Compra'] = pd.to_datetime(df_embarca['Data da Compra'], errors='coerce')
+    ## pré processamento do data frame principal (a ordem pela data da compra define a ordem das linhas)
+    df_embarca['Data da Compra'] = interpretar_datas(df_embarca['Data da Compra'])
     df_embarca['ID Transacao'] = df_embarca['ID Transacao'].astype(str)
     df_embarca = df_embarca.sort_values(by='Data da Compra')
 
-    ## realizando o agrupamento pelo merge_asoft (permite tolerância entre datas)
-    try:
-        df_agrupado = pd.merge_asof(
-            df_embarca,
-            df_totalbus_conciliador,
-            left_on= 'Data da Compra',
-            right_on= 'Data BPE',
-            left_by= ['Nome da Empresa', 'ID Transacao'],
-            right_by= ['NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'],
-            direction= 'nearest',
-            tolerance= pd.Timedelta('1 day')
-        )
-    except ValueError as e:
-        print(f'SISTEMA: Erro de mesclagem, verifique os dados. Erro: {e}')
+    ## pareando pela chave e pela data mais próxima (tolerância de 1 dia)
+    df_agrupado = mesclar_mais_proximo(
+        df_embarca,
+        df_totalbus_conciliador,
+        'Data da Compra',
+        'Data BPE',
+        pd.Timedelta('1 day'),
+        indice=indice_vendas_totalbus['pareamento'],
+        descricao='Embarca repasse x Totalbus (Data BPE)'
+    )
 
     ## tratamento final coluna Data BPE (dados vazios) 
     df_agrupado['Data BPE'] = df_agrupado['Data BPE'].fillna(df_agrupado['Data da Compra'])
@@ -191,35 +209,16 @@ def mesclagem_totalbus(df_embarca, df_totalbus):
 
 ## ----- FUNÇÃO DE PROJEÇÃO DE DATA DE PAGAMENTO -----
 
-def projecao_data_pagamento(df):
+def data_projecao_regras_fixas(df):
 
     '''
-    Função para PROJETAR a data de pagamento dos dados da EMBARCA. Com essa data, identificaremos onde (data) esse valor realmente deverá ser considerado.
-    
-    Parametros:
-        df: Data frame da EMBARCA.
+    Função com as condições originais da projeção de pagamento (data base de 2024-10-01), usadas no lugar da
+    tabela de decisão quando NEXUS_REGRAS_PROJECAO=fixas (referência da verificação de equivalência).
 
     Retorna:
-        pd.DataFrame: Data frame da EMBARCA com as projeções de pagamento e parcela referente.
+    pd.Series: data de projeção de cada linha (sem o ajuste de dia útil).
     '''
 
-    ## ----- AJUSTANDO SEQUENCIAL DAS TRANSAÇÕES (SERÁ UTILIZADO PARA CÁLCULAR A DATA DE PROJEÇÃO CORRETA) ----- 
-
-    ## definindo a coluna tipo: automatico/manual
-    df['Tipo'] = 'Automatico'
-
-    filtro_tipo = df['order_id'] == 'AJUSTE'
-    df.loc[filtro_tipo, 'Tipo'] = 'Manual'
-
-    ## definindo um sequencial
-    df['Sequencial'] = df.groupby(['Nome da Empresa', 'ID Transacao', 'Data de Lancamento', 'Status', 'Tipo']).cumcount() + 1
-
-    ## definindo uma coluna de parcela referente, considerando parcela atual ou sequencial
-    df['Parcela Referente'] = np.minimum(df['Sequencial'], df['Parcelas da Venda']).astype(int)
-    df.loc[filtro_tipo, 'Parcela Referente'] = df['Parcela_Atual']
-
-    ## ----- PROJETANDO A DATA DE PAGAMENTO -----
-
     data_base = '2024-10-01'
 
     ## inclusão da condição, critério e resultado, através do np.select
@@ -231,7 +230,7 @@ def projecao_data_pagamento(df):
         (df['Status'].isin(['CANCELADO', 'CANCELADO Q'])) & (df['Metodo de Pagamento_V'] == 'CREDIT_CARD') & (df['Cancelamento_Mesmo_Mes'] == 1) & (df['Data de Lancamento'] >= data_base),
         (df['Status'].isin(['CANCELADO', 'CANCELADO Q'])) & (df['Metodo de Pagamento_V'] == 'CREDIT_CARD') & (df['Cancelamento_Mesmo_Mes'] == 0) & (df['Data de Lancamento'] >= data_base)
     ]
-    
+
     ## resultados para projeção de datas
     resultado_projecao_pos_data_base = [
         df['Data BPE'] + timedelta(days=1),
@@ -266,18 +265,60 @@ def projecao_data_pagamento(df):
     ## juntando as condições e resultados
     condicoes_completas = condicional_projecao_pos_data_base + condicional_projecao_pre_data_base
     resultados_completos = resultado_projecao_pos_data_base + resultado_projecao_pre_data_base
+
+    data_projecao = pd.Series(np.select(condicoes_completas, resultados_completos, pd.NaT), index=df.index)
+
+    return pd.to_datetime(data_projecao).dt.normalize()
+
+def projecao_data_pagamento(df):
+
+    '''
+    Função para PROJETAR a data de pagamento dos dados da EMBARCA. Com essa data, identificaremos onde (data) esse valor realmente deverá ser considerado.
     
-    ## definindo data_projecao
-    df['Data_Projecao'] = np.select(condicoes_completas, resultados_completos, pd.NaT)
+    Parametros:
+        df: Data frame da EMBARCA.
+
+    Retorna:
+        pd.DataFrame: Data frame da EMBARCA com as projeções de pagamento e parcela referente.
+    '''
+
+    ## ----- AJUSTANDO SEQUENCIAL DAS TRANSAÇÕES (SERÁ UTILIZADO PARA CÁLCULAR A DATA DE PROJEÇÃO CORRETA) ----- 
+
+    ## definindo a coluna tipo: automatico/manual
+    df['Tipo'] = 'Automatico'
+
+    filtro_tipo = df['order_id'] == 'AJUSTE'
+    df.loc[filtro_tipo, 'Tipo'] = 'Manual'
+
+    ## definindo um sequencial
+    codigo_sequencial = codigos_grupo(df, ['Nome da Empresa', 'ID Transacao', 'Data de Lancamento', 'Status', 'Tipo'])
+    df['Sequencial'] = contagem_por_grupo(codigo_sequencial, df.index) + 1
 
-    df['Data_Projecao'] = pd.to_datetime(df['Data_Projecao']).dt.normalize()
+    ## definindo uma coluna de parcela referente, considerando parcela atual ou sequencial
+    df['Parcela Referente'] = np.minimum(df['Sequencial'], df['Parcelas da Venda']).astype(int)
+    df.loc[filtro_tipo, 'Parcela Referente'] = df['Parcela_Atual']
 
-    ## ajustando data útil
-    data_sabado = df['Data_Projecao'].dt.dayofweek == 5
-    data_domingo = df['Data_Projecao'].dt.dayofweek == 6
+    ## ----- PROJETANDO A DATA DE PAGAMENTO -----
 
-    df.loc[data_sabado, 'Data_Projecao'] += timedelta(days=2)
-    df.loc[data_domingo, 'Data_Projecao'] += timedelta(days=1)
+    if REGRAS_PROJECAO == 'fixas':
+        df['Data_Projecao'] = data_projecao_regras_fixas(df)
+    else:
+        ## a regra de cada linha (status, método, cancelamento no mesmo mês e data base) vem da tabela de decisão
+        tabela = tabela_decisao('embarca_repasse_data_projecao')
+        regra = avaliar_tabela(df, tabela)
+
+        df['Data de Lancamento'] = interpretar_datas(df['Data de Lancamento'])
+
+        ## data da regra + 30 dias por parcela (quando a regra usa parcela) + 1 dia
+        data_regra = pd.to_datetime(valores_por_regra(df, tabela, regra, 'data'))
+        parcela_regra = pd.to_numeric(valores_por_regra(df, tabela, regra, 'parcela'))
+        dias_parcela = np.where(pd.notna(resultado_regras(tabela, regra, 'parcela')), parcela_regra * 30, 0)
+
+        data_projecao = data_regra + timedelta(days=1) + pd.to_timedelta(dias_parcela, unit='D')
+        df['Data_Projecao'] = data_projecao.dt.normalize().set_axis(df.index)
+
+    ## ajustando data útil (fins de semana e feriados)
+    df['Data_Projecao'] = proximo_dia_util(df['Data_Projecao'])
 
     return df
 
@@ -297,6 +338,11 @@ def calculo_repasse(df):
 
     ## ----- CRIANDO COLUNA DE REPASSE -----
 
+    ## modo centavos: valores arredondados para o centavo antes das somas (resultados exatos em centavos)
+    if MODO_CENTAVOS:
+        for col in ['Repasse', 'Multa', 'Comissão', 'Repasse Seguro Parcela']:
+            df[col] = arredondar_centavos(df[col])
+
     ## inclusão da condição
     condicional_repasse = [
         (df['Status'] == 'CANCELADO'),
@@ -328,6 +374,10 @@ def calculo_repasse(df):
 
     df['Repasse_liquido_com_seguro_inv'] = -df['Repasse_liquido_com_seguro']
 
+    if MODO_CENTAVOS:
+        for col in ['Repasse_liquido', 'Repasse_liquido_inv', 'Repasse_liquido_com_seguro', 'Repasse_liquido_com_seguro_inv']:
+            df[col] = arredondar_centavos(df[col])
+
     return df
 
 def ajuste_tipo(df):
@@ -392,7 +442,8 @@ def apontamento_inconsistencias(df_embarca_repasse):
 
 ## ----- PROCESSANDO OS REPASSES DA EMBARCA -----
 
-def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_totalbus):
+@instrumentar('repasses', entrada='lista_repasses', saida=0)
+def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, indice_vendas_totalbus, lista_repasses=None, indice_vendas=None):
 
     '''
     Função para PROCESSAR os arquivos da EMBARCA (Centralizador de todo o processo).
@@ -400,7 +451,10 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
     Parametros:
         diretorio_embarca_repasse: diretório da pasta onde estão salvos os arquivos da EMBARCA.
         df_embarca_vendas: Data frame das vendas da EMBARCA.
-        df_totalbus: Data frame das vendas do TOTALBUS.
+        indice_vendas_totalbus: índice das vendas do TOTALBUS (totalbus.indexar_vendas), com a chave atribuída.
+        lista_repasses: lista de DataFrames já lidos (ingestão paralela). Caso seja None, os arquivos são lidos um a um.
+        indice_vendas: índice de pareamento das vendas (pareamento.indexar_pareamento), reaproveitado quando
+                       as datas de venda não precisam de ajuste. Caso seja None, é montado no pareamento.
 
     Retorna:
         pd.DataFrame: Um DataFrame consolidado com os dados processados da EMBARCA.
@@ -408,21 +462,13 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
 
     ## ----- IMPORTAÇÃO DE PLANILHAS -----
 
-    ## definindo as colunas do data frame
-    colunas_embarca = ['Operadora', 'order_id', 'ID do Bilhete', 'Nº do Sistema', 'Forma de pagamento',
-                        'id_adiquirente', 'Canal', 'Nome do passageiro', 'Status', 'Data da Compra',
-                        'Data do Cancelamento', 'Tarifa', 'Taxas', 'Valor Total', 'Parcelas',
-                        'Taxa de conveniência', 'Valor do Cupom (R$)', 'Promoção', 'Descontos vindos da API',
-                        'Comissão', 'Repasse', 'Multa', 'Marketing Digital', 'parcelas pagas', 'URL do BPe',
-                        'URL do Bilhete', 'Seguro', 'Repasse Seguro', 'Repasse Seguro Parcela', 'Obs']
-    
     ## carregando todos os arquivos em um data frame
-    embarca = consolidar_arquivos_repasses(diretorio_embarca_repasse, colunas_embarca)
+    embarca = consolidar_arquivos_repasses(diretorio_embarca_repasse, COLUNAS_EMBARCA_REPASSE, lista_repasses)
 
     ## ----- IDENTIFICANDO E APONTANDO INFORMAÇÕES FALTANTES NOS RELATÓRIOS -----
 
     df_apontamentos = apontamento_inconsistencias(embarca)
-    if df_apontamentos.empty:
+    if embarca.empty:
         df_vazio = pd.DataFrame()
         return df_vazio, df_apontamentos
 
@@ -432,18 +478,15 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
 
     ## ----- AGRUPANDO A PLANILHA DO CLIENTE COM O TOTALBUS PARA TRAZER A DATA BPE
 
-    embarca = mesclagem_totalbus(embarca, df_totalbus)
+    embarca = mesclagem_totalbus(embarca, indice_vendas_totalbus)
 
     ## ----- AJUSTANDO A FORMA DE PAGAMENTO CONFORME A VENDA
 
-    ## copiando a planilha de vendas da embarca
-    df_embarca_vendas2 = df_embarca_vendas.copy()
-    df_embarca_vendas2.drop(columns=['Status'], inplace=True)
+    ## colunas das vendas da embarca utilizadas (empresa e ID já estão no código da chave)
+    df_embarca_vendas2 = df_embarca_vendas.drop(columns=['Status', 'Operadora', 'ID do Bilhete'])
 
     ## renomeando colunas
     df_embarca_vendas2.rename(columns={
-        'Operadora': 'Nome da Empresa',
-        'ID do Bilhete': 'ID Transacao',
         'Metodo de pagamento': 'Metodo de Pagamento_V',
         'parcelas': 'Parcelas da Venda'
     }, inplace=True)
@@ -452,31 +495,25 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
     embarca['Nome da Empresa'] = embarca['Nome da Empresa'].astype(str)
 
     ## tratando colunas de data
-    df_embarca_vendas2['Data da Venda'] = pd.to_datetime(df_embarca_vendas2['Data da Venda'], errors='coerce')
-    if df_embarca_vendas2['Data da Venda'].dt.tz is not None:
-        df_embarca_vendas2['Data da Venda'] = df_embarca_vendas2['Data da Venda'].dt.tz_localize(None)
-    df_embarca_vendas2['Data da Venda'] = df_embarca_vendas2['Data da Venda'].dt.normalize()
+    df_embarca_vendas2['Data da Venda'] = interpretar_datas(df_embarca_vendas2['Data da Venda'], normalizar=True)
 
-    df_embarca_vendas2['Nome da Empresa'] = df_embarca_vendas2['Nome da Empresa'].astype(str)
+    ## o índice das vendas só é reaproveitado quando as datas não mudaram com o ajuste acima
+    if indice_vendas is not None and not df_embarca_vendas2['Data da Venda'].equals(df_embarca_vendas['Data da Venda']):
+        indice_vendas = None
 
-    ## ordenando colunas pela data
+    ## ordenando pela data da compra (define a ordem das linhas)
     embarca = embarca.sort_values('Data da Compra')
-    df_embarca_vendas2 = df_embarca_vendas2.sort_values('Data da Venda')
 
-    ## agrupando as duas planilhas (embarca repasses e embarca vendas) pelo merge_asoft
-    try:
-        embarca = pd.merge_asof(
-            embarca,
-            df_embarca_vendas2,
-            left_on= 'Data da Compra',
-            right_on= 'Data da Venda',
-            left_by= ['Nome da Empresa', 'ID Transacao'],
-            right_by= ['Nome da Empresa', 'ID Transacao'],
-            direction= 'nearest',
-            tolerance= pd.Timedelta('1 day')
-        )
-    except ValueError as e:
-        print(f'SISTEMA: Erro de mesclagem, verifique os dados. Erro: {e}')
+    ## pareando as duas planilhas (embarca repasses e embarca vendas) pela chave e data mais próxima
+    embarca = mesclar_mais_proximo(
+        embarca,
+        df_embarca_vendas2,
+        'Data da Compra',
+        'Data da Venda',
+        pd.Timedelta('1 day'),
+        indice=indice_vendas,
+        descricao='Embarca repasse x Embarca vendas'
+    )
 
     ## tratando dados
     embarca['Metodo de Pagamento_V'] = embarca['Metodo de Pagamento_V'].fillna(embarca['Forma de pagamento'])
@@ -516,7 +553,7 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
     ]
 
     embarca['Data de Lancamento'] = np.select(condicional_dt_lancamento, resultado_dt_lancamento, pd.NaT)
-    embarca['Data de Lancamento'] = pd.to_datetime(embarca['Data de Lancamento'], errors='coerce')
+    embarca['Data de Lancamento'] = interpretar_datas(embarca['Data de Lancamento'])
 
     ## ----- PROJETANDO AS DATAS DE PAGAMENTO -----
 
@@ -525,7 +562,7 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
     ## ----- TRATATIVAS FINAIS DO RELATÓRIO -----
 
     ## dropando colunas desnecessárias
-    embarca.drop(columns=['MesAno_Venda', 'MesAno_Cancelado', 'Cancelamento_Mesmo_Mes', 'NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'], inplace=True)
+    embarca.drop(columns=['Cancelamento_Mesmo_Mes', 'NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'], inplace=True)
 
     ## definindo o tipo das colunas
     embarca = ajuste_tipo(embarca)
@@ -534,6 +571,6 @@ def processamento_repasses(diretorio_embarca_repasse, df_embarca_vendas, df_tota
     colunas_data = ['Data da Compra', 'Data do Cancelamento', 'Data de Lancamento', 'Data_Projecao', 'Data BPE', 'Data de Recebimento']
 
     for col in colunas_data:
-        embarca[col] = pd.to_datetime(embarca[col], errors='coerce').dt.normalize()
+        embarca[col] = interpretar_datas(embarca[col], normalizar=True)
 
     return embarca, df_apontamentos
\ No newline at end of file
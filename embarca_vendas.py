@@ -4,6 +4,20 @@ import pandas as pd
 import os
 from datetime import datetime
 from funcoes import ler_arquivo
+from esquemas import ESQUEMAS
+from datas import interpretar_datas
+from instrumentacao import instrumentar
+
+## ----- DEFININDO COLUNAS -----
+
+COLUNAS_EMBARCA_VENDAS = ['Operadora', 'ID do Bilhete', 'Metodo de pagamento', 'parcelas', 'Data da Compra']
+
+## política de tipos das vendas da Embarca (memoria.compactar_memoria): 'Metodo de pagamento' é completado
+## com a forma de pagamento do Totalbus na projeção, por isso não vira category
+POLITICA_MEMORIA_EMBARCA_VENDAS = {
+    'categorias': ['Status'],
+    'decimais': ['parcelas']
+}
 
 ## ----- LOCALIZANDO INCONSISTÊNCIAS NO RELATÓRIO DE VENDAS DA EMBARCA -----
 
@@ -21,7 +35,8 @@ def apontamento_inconsistencias(df_embarca_vendas):
 
 ## ----- PROCESSAMENTO DAS VENDAS -----
 
-def processamento_embarca_vendas(caminho_embarca_vendas):
+@instrumentar('embarca_vendas', entrada='lista_embarca_vendas', saida=0)
+def processamento_embarca_vendas(caminho_embarca_vendas, lista_embarca_vendas=None):
 
     '''
     Processa arquivos de vendas da EMBARCA de um diretório, concatenando-os
@@ -31,30 +46,32 @@ def processamento_embarca_vendas(caminho_embarca_vendas):
     Parâmetros:
     caminho_embarca_vendas (str): O caminho do diretório contendo os arquivos
                                   de vendas da Embarca (CSV ou Excel).
+    lista_embarca_vendas (list): lista de DataFrames já lidos (ingestão paralela). Caso seja
+                                 None, os arquivos do diretório são lidos um a um.
     
     Retorna:
     pd.DataFrame: Um DataFrame consolidado com os dados processados.
     '''
 
-    ## definindo colunas
-    colunas_embarca = ['Operadora', 'ID do Bilhete', 'Metodo de pagamento', 'parcelas', 'Data da Compra']
-
-    ## criando lista vazia
-    lista_embarca_vendas = []
-
-    ## carregando todos os diretórios 
-    caminhos_arquivo = [
-        os.path.join(caminho_embarca_vendas, f) for f in os.listdir(caminho_embarca_vendas) if f.endswith(('.csv', '.xlsx', '.xls'))
-    ]
-
-    ## looping dos arquivos
-    for caminho in caminhos_arquivo:
-        try:
-            df_temp = ler_arquivo(caminho, colunas_embarca, 'Base_Aprovados')
-            if df_temp is not None:
-                lista_embarca_vendas.append(df_temp)
-        except Exception as e:
-            print(f'SISTEMA: Erro ao processar o arquivo {os.path.basename(caminho)}. ({e})')
+    ## lendo os arquivos do diretório (caso ainda não tenham sido carregados pela ingestão paralela)
+    if lista_embarca_vendas is None:
+
+        ## criando lista vazia
+        lista_embarca_vendas = []
+
+        ## carregando todos os diretórios 
+        caminhos_arquivo = [
+            os.path.join(caminho_embarca_vendas, f) for f in os.listdir(caminho_embarca_vendas) if f.endswith(('.csv', '.xlsx', '.xls'))
+        ]
+
+        ## looping dos arquivos
+        for caminho in caminhos_arquivo:
+            try:
+                df_temp = ler_arquivo(caminho, COLUNAS_EMBARCA_VENDAS, 'Base_Aprovados', ESQUEMAS['embarca_vendas'])
+                if df_temp is not None:
+                    lista_embarca_vendas.append(df_temp)
+            except Exception as e:
+                print(f'SISTEMA: Erro ao processar o arquivo {os.path.basename(caminho)}. ({e})')
     
     ## concatenando/agrupando todos os dataframes processados
     try:
@@ -67,10 +84,7 @@ def processamento_embarca_vendas(caminho_embarca_vendas):
         print(f'Aviso: erro ao consolidar os arquivos de vendas da Embarca ({e})')
 
     ## definindo datas
-    df_embarca_vendas['Data da Compra'] = pd.to_datetime(df_embarca_vendas['Data da Compra'], errors='coerce').dt.floor('D')
-
-    ## tratando colunas
-    df_embarca_vendas['ID do Bilhete'] = df_embarca_vendas['ID do Bilhete'].astype(str).str.split('.').str[0].replace('nan', None)
+    df_embarca_vendas['Data da Compra'] = interpretar_datas(df_embarca_vendas['Data da Compra'], normalizar=True)
 
     ## identificando informações faltantes
     diferencas = apontamento_inconsistencias(df_embarca_vendas)
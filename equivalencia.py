@@ -0,0 +1,623 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import glob
+import time
+import shutil
+import subprocess
+import numpy as np
+import pandas as pd
+from configuracoes import EQUIVALENCIA_REFERENCIA, EQUIVALENCIA_OTIMIZADA, DIRETORIO_EQUIVALENCIA
+from configuracoes import TOLERANCIA_ABSOLUTA, TOLERANCIA_RELATIVA, DIRETORIO_CHECKPOINT
+from cache_ingestao import gravar_json
+from chaves import codificar_colunas
+from etapas import carregar_checkpoint
+from razao_saldos import linhas_em_cobranca
+
+## ----- VERIFICAÇÃO DE EQUIVALÊNCIA ENTRE IMPLEMENTAÇÕES -----
+
+## executa o Nexus duas vezes sobre as mesmas entradas, com as configurações da implementação de referência
+## (NEXUS_EQUIVALENCIA_REFERENCIA) e da otimizada (NEXUS_EQUIVALENCIA_OTIMIZADA), cada uma em um processo e em
+## um diretório próprio. A referência liga o código original de cada caminho otimizado que tem configuração:
+##   COMPACTAR_MEMORIA=0, MODO_CENTAVOS=0   sem compactação dos tipos e valores em float
+##   LEITOR_EXCEL=pandas, NUMERO_PROCESSOS=1, THREADS_ETAPAS=1   leitura pelo pandas, sem paralelismo
+##   PAREAMENTO=merge_asof                  pd.merge_asof no lugar do pareamento por índice
+##   CONSULTA_VENDAS=merge                  pd.merge no lugar do índice das vendas do Totalbus
+##   CONVERSAO_DATAS=linhas                 pd.to_datetime em todas as linhas e meses pelo pd.Period
+##   PROJECAO=expandida                     index.repeat + cumcount no lugar das tabelas de bilhetes e parcelas
+##   CALCULO_VALORES=colunas                valores coluna a coluna sobre a projeção
+##   REGRAS_PROJECAO=fixas                  condições originais no lugar das tabelas de decisão
+##   CALCULO_SALDOS=merge                   groupby + merge dos saldos e cobrança pelas colunas de saldo
+##   CALCULO_RESUMO=grupos                  um groupby por empresa + mês no resumo
+## caminhos sem versão original e que rodam o mesmo código nas duas execuções (não verificados por aqui):
+## leitura tipada das fontes (esquemas.py), taxa de conveniência por vigência (vigencias.py), dias úteis com
+## feriados (calendario.py), Sequencial do repasse pelos códigos das chaves (chaves.contagem_por_grupo),
+## 'DATA HORA VENDA PARA CANC.' das vendas sem apply (nexus.conciliar_vendas), ordem das linhas
+## (incremental.ordenar_conciliacao) e orquestração das etapas (etapas.py). Compara linha a linha:
+##   df_agrupado                        saída da etapa "saldos" (checkpoint)
+##   cobranca_total / cobranca_periodo  linhas dos relatórios de cobrança (razao_saldos.linhas_em_cobranca)
+##   resumo                             CSVs do resumo de valores
+## as execuções param na etapa "resumo": os relatórios do diretório "Relatorio Final" não são regravados.
+##
+## comparação em duas fases, para volumes de milhões de linhas:
+##   1. hash de cada linha (valores normalizados: categorias e textos como texto, números como float
+##      arredondado conforme a tolerância, datas como inteiros); os hashes ordenados das duas saídas
+##      apontam as chaves (empresa + transação) com alguma linha sem par
+##   2. apenas nessas chaves, as linhas são alinhadas (chave + ordem dentro da chave) e comparadas coluna a
+##      coluna com a tolerância: |referência - otimizada| <= absoluta + relativa * |referência|
+## diferenças de tipo (ex.: category x object) são informadas, mas não tornam as saídas diferentes.
+##
+## uso: python equivalencia.py                                   executa as duas implementações e compara
+##      python equivalencia.py comparar <referência> <otimizada>  compara duas execuções já feitas
+## termina com erro (código 1) quando alguma saída é diferente.
+
+caminho_base = os.path.dirname(os.path.abspath(__file__))
+
+## saídas comparadas e colunas da chave de cada uma
+CHAVE_TRANSACAO = ['Nome da Empresa', 'ID Transacao']
+SAIDAS_COMPARADAS = {
+    'df_agrupado': CHAVE_TRANSACAO,
+    'cobranca_total': CHAVE_TRANSACAO,
+    'cobranca_periodo': CHAVE_TRANSACAO,
+    'resumo': ['Arquivo']
+}
+
+## quantidade máxima de exemplos de diferença guardados por saída e de colunas exibidas no resumo
+EXEMPLOS = 10
+MAXIMO_EXIBIDO = 6
+
+## situação da ordem das chaves no resumo
+ORDEM_EXIBIDA = {True: 'igual', False: 'diferente', None: 'não comparada (quantidades de linhas diferentes)'}
+
+## valor vazio de cada tipo normalizado (float, int64 das datas e texto)
+VAZIOS = {'f': np.nan, 'i': np.iinfo(np.int64).min, 'O': None}
+
+## multiplicador na combinação dos hashes das colunas
+PRIMO_HASH = np.uint64(1_000_003)
+
+## ----- NORMALIZAÇÃO E HASH DAS LINHAS -----
+
+def normalizar_coluna(serie):
+
+    '''
+    Função para converter uma coluna em uma representação comparável entre implementações que usam
+    tipos diferentes para o mesmo valor (category, string[pyarrow], int8, float32...).
+
+    Retorna:
+    np.ndarray: float64 (números e booleanos, NaN nos vazios), int64 (datas, em ns) ou object
+                (textos, None nos vazios).
+    '''
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        ## + 0.0 troca o -0.0 por 0.0
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+
+    codigos, unicos = normalizar_unicos(serie)
+
+    return unicos[codigos]
+
+def normalizar_unicos(serie):
+
+    '''
+    Função para normalizar uma coluna de categorias ou textos, convertendo cada valor distinto uma única vez.
+    Números guardados como objeto ou em categorias são normalizados como números.
+
+    Retorna:
+    tuple: (código de cada linha, -1 nos vazios; valores distintos normalizados, seguidos do vazio, que o código -1 pega).
+    '''
+
+    codigos, unicos = pd.factorize(serie)
+    valores_unicos = pd.Series(np.asarray(unicos, dtype=object)).infer_objects()
+
+    if valores_unicos.dtype == object:
+        normalizados = np.array([str(valor) for valor in valores_unicos], dtype=object)
+    else:
+        normalizados = normalizar_coluna(valores_unicos)
+
+    return codigos, np.append(normalizados, VAZIOS[normalizados.dtype.kind])
+
+def texto_ou_categoria(serie):
+
+    return not (pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie))
+
+def casas_tolerancia(tolerancia):
+
+    '''
+    Retorna:
+    int ou None: casas decimais do arredondamento dos números no hash (None = sem arredondamento).
+    '''
+
+    if tolerancia <= 0:
+        return None
+
+    ## o intervalo do arredondamento (10^-casas) não pode passar da tolerância: hashes iguais garantem valores
+    ## a no máximo "tolerancia" de distância; valores próximos em intervalos diferentes seguem para a fase 2
+    return max(0, int(np.ceil(-np.log10(tolerancia))))
+
+def hash_valores(valores, casas):
+
+    ## números arredondados conforme a tolerância
+    if valores.dtype == np.float64 and casas is not None:
+        valores = np.round(valores, casas) + 0.0
+
+    return pd.util.hash_array(valores)
+
+def hash_coluna(serie, casas):
+
+    '''
+    Retorna:
+    np.ndarray: hash (uint64) do valor normalizado de cada linha da coluna.
+    '''
+
+    ## categorias e textos: hash de cada valor distinto uma única vez
+    if texto_ou_categoria(serie):
+        codigos, unicos = normalizar_unicos(serie)
+        return hash_valores(unicos, casas)[codigos]
+
+    return hash_valores(normalizar_coluna(serie), casas)
+
+def hash_linhas(df, colunas, casas_colunas):
+
+    '''
+    Função para calcular o hash de cada linha, coluna a coluna (sem montar uma cópia normalizada do DataFrame).
+
+    Retorna:
+    np.ndarray: hash (uint64) de cada linha.
+    '''
+
+    hashes = np.zeros(len(df), dtype=np.uint64)
+
+    for coluna in colunas:
+        hashes = hashes * PRIMO_HASH ^ hash_coluna(df[coluna], casas_colunas[coluna])
+
+    return hashes
+
+def hashes_sem_par(hashes, hashes_outra):
+
+    '''
+    Retorna:
+    np.ndarray: hashes que aparecem uma quantidade de vezes diferente em "hashes_outra" (multiconjunto).
+    '''
+
+    unicos, contagens = np.unique(hashes, return_counts=True)
+    unicos_outra, contagens_outra = np.unique(hashes_outra, return_counts=True)
+
+    posicoes = np.minimum(np.searchsorted(unicos_outra, unicos), max(len(unicos_outra) - 1, 0))
+    encontrados = unicos_outra[posicoes] == unicos if len(unicos_outra) else np.zeros(len(unicos), dtype=bool)
+    contagens_na_outra = np.where(encontrados, contagens_outra[posicoes] if len(unicos_outra) else 0, 0)
+
+    return unicos[contagens != contagens_na_outra]
+
+## ----- COMPARAÇÃO DETALHADA -----
+
+def diferencas_coluna(valores_referencia, valores_otimizada, tolerancia_absoluta, tolerancia_relativa):
+
+    '''
+    Retorna:
+    tuple: (máscara das linhas diferentes, maior diferença absoluta ou None quando a coluna não é numérica).
+    '''
+
+    if valores_referencia.dtype == np.float64 and valores_otimizada.dtype == np.float64:
+        vazios_referencia, vazios_otimizada = np.isnan(valores_referencia), np.isnan(valores_otimizada)
+        diferenca = np.abs(valores_referencia - valores_otimizada)
+
+        diferentes = (vazios_referencia != vazios_otimizada) | (
+            ~vazios_referencia & ~vazios_otimizada & (diferenca > tolerancia_absoluta + tolerancia_relativa * np.abs(valores_referencia))
+        )
+        maior = float(np.nanmax(np.where(diferentes, diferenca, np.nan))) if diferentes.any() and not np.isnan(diferenca[diferentes]).all() else None
+
+        return diferentes, maior
+
+    ## tipos normalizados diferentes (ex.: número x texto) são comparados como texto
+    if valores_referencia.dtype != valores_otimizada.dtype:
+        valores_referencia = normalizar_coluna(pd.Series(valores_referencia).astype(object))
+        valores_otimizada = normalizar_coluna(pd.Series(valores_otimizada).astype(object))
+
+    return np.asarray(valores_referencia != valores_otimizada, dtype=bool), None
+
+def comparar_linhas(df_referencia, df_otimizada, codigos_referencia, codigos_otimizada, sem_par_referencia, sem_par_otimizada,
+                    colunas, colunas_chave, tolerancia_absoluta, tolerancia_relativa, tolerancias_colunas, exemplos):
+
+    '''
+    Função para comparar, coluna a coluna, as linhas sem par no hash. As linhas são alinhadas pela chave
+    e pela ordem dentro da chave (entre as linhas sem par: as linhas iguais já foram pareadas pelo hash).
+
+    Retorna:
+    dict: linhas diferentes, linhas sem par, chaves diferentes, diferenças por coluna e exemplos.
+    '''
+
+    def linhas_chaves(codigos, sem_par):
+        posicoes = np.flatnonzero(sem_par)
+        return pd.DataFrame({
+            'codigo': codigos[posicoes],
+            'ordem': pd.Series(codigos[posicoes]).groupby(codigos[posicoes]).cumcount().to_numpy(),
+            'posicao': posicoes
+        })
+
+    pares = linhas_chaves(codigos_referencia, sem_par_referencia).merge(
+        linhas_chaves(codigos_otimizada, sem_par_otimizada), on=['codigo', 'ordem'], how='outer', suffixes=('_referencia', '_otimizada')
+    )
+
+    somente_referencia = pares['posicao_otimizada'].isna().to_numpy()
+    somente_otimizada = pares['posicao_referencia'].isna().to_numpy()
+    pares_completos = pares[~somente_referencia & ~somente_otimizada]
+
+    posicoes_referencia = pares_completos['posicao_referencia'].to_numpy(dtype=np.int64)
+    posicoes_otimizada = pares_completos['posicao_otimizada'].to_numpy(dtype=np.int64)
+
+    linhas_diferentes = np.zeros(len(pares_completos), dtype=bool)
+    diferencas = {}
+    lista_exemplos = []
+
+    for coluna in colunas:
+        absoluta, relativa = tolerancias_colunas.get(coluna, (tolerancia_absoluta, tolerancia_relativa))
+
+        diferentes, maior = diferencas_coluna(
+            normalizar_coluna(df_referencia[coluna].iloc[posicoes_referencia]),
+            normalizar_coluna(df_otimizada[coluna].iloc[posicoes_otimizada]),
+            absoluta,
+            relativa
+        )
+
+        if not diferentes.any():
+            continue
+
+        linhas_diferentes |= diferentes
+        diferencas[coluna] = {'linhas': int(diferentes.sum()), 'maior_diferenca': maior}
+
+        for i in np.flatnonzero(diferentes)[:max(0, exemplos - len(lista_exemplos))]:
+            lista_exemplos.append({
+                'chave': [str(df_referencia[c].iloc[posicoes_referencia[i]]) for c in colunas_chave],
+                'ordem': int(pares_completos['ordem'].iloc[i]),
+                'coluna': coluna,
+                'referencia': str(df_referencia[coluna].iloc[posicoes_referencia[i]]),
+                'otimizada': str(df_otimizada[coluna].iloc[posicoes_otimizada[i]])
+            })
+
+    ## chaves com alguma linha diferente ou sem par
+    codigos_diferentes = np.union1d(
+        pares_completos['codigo'].to_numpy()[linhas_diferentes],
+        pares['codigo'].to_numpy()[somente_referencia | somente_otimizada]
+    )
+
+    return {
+        'chaves_diferentes': int(len(codigos_diferentes)),
+        'linhas_diferentes': int(linhas_diferentes.sum()),
+        'linhas_somente_referencia': int(somente_referencia.sum()),
+        'linhas_somente_otimizada': int(somente_otimizada.sum()),
+        'colunas_diferentes': diferencas,
+        'exemplos': lista_exemplos
+    }
+
+def comparar_quadros(nome, df_referencia, df_otimizada, colunas_chave, tolerancia_absoluta=TOLERANCIA_ABSOLUTA,
+                     tolerancia_relativa=TOLERANCIA_RELATIVA, tolerancias_colunas=None, exigir_mesma_ordem=True, exemplos=EXEMPLOS):
+
+    '''
+    Função para comparar a mesma saída de duas implementações.
+
+    Parâmetros:
+    nome: nome da saída (exibido no resumo).
+    df_referencia, df_otimizada: saídas da implementação de referência e da otimizada.
+    colunas_chave: colunas que identificam a transação (agrupamento das linhas na comparação).
+    tolerancia_absoluta, tolerancia_relativa: diferença aceita entre os valores numéricos.
+    tolerancias_colunas: tolerâncias próprias de algumas colunas {coluna: (absoluta, relativa)}.
+    exigir_mesma_ordem: quando True, linhas iguais em outra ordem também tornam as saídas diferentes.
+    exemplos: quantidade máxima de exemplos de diferença.
+
+    Retorna:
+    dict: resumo da comparação ('equivalente' indica o resultado).
+    '''
+
+    tolerancias_colunas = tolerancias_colunas or {}
+    colunas = [coluna for coluna in df_referencia.columns if coluna in df_otimizada.columns]
+
+    resultado = {
+        'saida': nome,
+        'linhas': [len(df_referencia), len(df_otimizada)],
+        'colunas': [df_referencia.shape[1], df_otimizada.shape[1]],
+        'colunas_somente_referencia': [c for c in df_referencia.columns if c not in df_otimizada.columns],
+        'colunas_somente_otimizada': [c for c in df_otimizada.columns if c not in df_referencia.columns],
+        'tipos_diferentes': {
+            c: [str(df_referencia[c].dtype), str(df_otimizada[c].dtype)] for c in colunas if df_referencia[c].dtype != df_otimizada[c].dtype
+        },
+        'chaves': 0,
+        'chaves_somente_referencia': 0,
+        'chaves_somente_otimizada': 0,
+        'chaves_diferentes': 0,
+        'linhas_diferentes': 0,
+        'linhas_somente_referencia': 0,
+        'linhas_somente_otimizada': 0,
+        'colunas_diferentes': {},
+        'exemplos': [],
+        'mesma_ordem': True
+    }
+
+    faltantes = [c for c in colunas_chave if c not in colunas]
+    if faltantes:
+        raise ValueError(f'Colunas da chave ausentes em "{nome}": {", ".join(faltantes)}.')
+
+    ## ----- FASE 1: HASH DAS LINHAS -----
+
+    casas_colunas = {
+        coluna: casas_tolerancia(tolerancias_colunas.get(coluna, (tolerancia_absoluta, tolerancia_relativa))[0]) for coluna in colunas
+    }
+    hashes_referencia = hash_linhas(df_referencia, colunas, casas_colunas)
+    hashes_otimizada = hash_linhas(df_otimizada, colunas, casas_colunas)
+
+    codigos_referencia, codigos_otimizada = codificar_colunas([
+        [pd.Series(normalizar_coluna(df_referencia[c])) for c in colunas_chave],
+        [pd.Series(normalizar_coluna(df_otimizada[c])) for c in colunas_chave]
+    ])
+
+    unicos_referencia, unicos_otimizada = np.unique(codigos_referencia), np.unique(codigos_otimizada)
+    resultado['chaves'] = int(len(np.union1d(unicos_referencia, unicos_otimizada)))
+    resultado['chaves_somente_referencia'] = int(len(np.setdiff1d(unicos_referencia, unicos_otimizada)))
+    resultado['chaves_somente_otimizada'] = int(len(np.setdiff1d(unicos_otimizada, unicos_referencia)))
+
+    ## ordem das chaves linha a linha (None quando as quantidades de linhas são diferentes)
+    if len(df_referencia) == len(df_otimizada):
+        resultado['mesma_ordem'] = bool(np.array_equal(codigos_referencia, codigos_otimizada))
+    else:
+        resultado['mesma_ordem'] = None
+
+    ## mesmas linhas, na mesma ordem
+    if len(df_referencia) == len(df_otimizada) and np.array_equal(hashes_referencia, hashes_otimizada):
+        sem_par_referencia = sem_par_otimizada = np.zeros(0, dtype=bool)
+    else:
+        sem_par_referencia = np.isin(hashes_referencia, hashes_sem_par(hashes_referencia, hashes_otimizada))
+        sem_par_otimizada = np.isin(hashes_otimizada, hashes_sem_par(hashes_otimizada, hashes_referencia))
+
+    ## ----- FASE 2: COMPARAÇÃO DETALHADA DAS LINHAS SEM PAR -----
+
+    if sem_par_referencia.any() or sem_par_otimizada.any():
+        resultado.update(comparar_linhas(
+            df_referencia, df_otimizada, codigos_referencia, codigos_otimizada, sem_par_referencia, sem_par_otimizada,
+            colunas, colunas_chave, tolerancia_absoluta, tolerancia_relativa, tolerancias_colunas, exemplos
+        ))
+
+    resultado['equivalente'] = (
+        not resultado['colunas_somente_referencia'] and not resultado['colunas_somente_otimizada'] and
+        resultado['chaves_diferentes'] == 0 and (resultado['mesma_ordem'] is not False or not exigir_mesma_ordem)
+    )
+
+    return resultado
+
+def exibir_comparacao(resultado):
+
+    '''
+    Função para exibir o resumo compacto de uma comparação.
+    '''
+
+    situacao = 'EQUIVALENTE' if resultado['equivalente'] else 'DIFERENTE'
+    linhas, colunas = resultado['linhas'], resultado['colunas']
+    print(f"SISTEMA: {resultado['saida']}: {situacao} (referência {linhas[0]} x {colunas[0]}, otimizada {linhas[1]} x {colunas[1]})")
+
+    if resultado['colunas_somente_referencia'] or resultado['colunas_somente_otimizada']:
+        print(f"    colunas somente na referência: {resultado['colunas_somente_referencia']}; "
+              f"somente na otimizada: {resultado['colunas_somente_otimizada']}")
+
+    if resultado['chaves_diferentes'] or resultado['mesma_ordem'] is not True:
+        print(f"    chaves: {resultado['chaves']}, {resultado['chaves_diferentes']} diferentes "
+              f"({resultado['chaves_somente_referencia']} somente na referência, {resultado['chaves_somente_otimizada']} somente na otimizada)")
+        print(f"    linhas: {resultado['linhas_diferentes']} diferentes além da tolerância, "
+              f"{resultado['linhas_somente_referencia']} somente na referência, {resultado['linhas_somente_otimizada']} somente na otimizada; "
+              f"ordem das chaves {ORDEM_EXIBIDA[resultado['mesma_ordem']]}")
+
+    if resultado['colunas_diferentes']:
+        colunas = sorted(resultado['colunas_diferentes'].items(), key=lambda item: -item[1]['linhas'])
+        print('    colunas: ' + ', '.join(
+            f"{coluna} ({dados['linhas']}" + (f", maior diferença {dados['maior_diferenca']:.6g})" if dados['maior_diferenca'] is not None else ')')
+            for coluna, dados in colunas[:MAXIMO_EXIBIDO]
+        ) + (f' e mais {len(colunas) - MAXIMO_EXIBIDO}' if len(colunas) > MAXIMO_EXIBIDO else ''))
+
+    for exemplo in resultado['exemplos'][:5]:
+        print(f"    ex.: {' | '.join(exemplo['chave'])} [{exemplo['ordem']}] {exemplo['coluna']}: {exemplo['referencia']} x {exemplo['otimizada']}")
+
+    if resultado['tipos_diferentes']:
+        tipos = list(resultado['tipos_diferentes'].items())
+        print(f'    tipos de {len(tipos)} colunas (não alteram o resultado): ' + ', '.join(
+            f'{coluna} ({tipo_referencia} x {tipo_otimizada})' for coluna, (tipo_referencia, tipo_otimizada) in tipos[:MAXIMO_EXIBIDO]
+        ) + (f' e mais {len(tipos) - MAXIMO_EXIBIDO}' if len(tipos) > MAXIMO_EXIBIDO else ''))
+
+## ----- SAÍDAS DE CADA IMPLEMENTAÇÃO -----
+
+def etapa_saldos():
+
+    from nexus import ETAPAS_NEXUS
+
+    return next(etapa for etapa in ETAPAS_NEXUS if etapa['nome'] == 'saldos')
+
+def executar_lado(diretorio_lado):
+
+    '''
+    Função executada no processo de cada implementação (com as configurações dela): executa o Nexus até o
+    resumo e grava as linhas em cobrança calculadas com as regras da implementação.
+    '''
+
+    from nexus import executar_nexus
+
+    executar_nexus(etapa_inicial='', etapa_final='resumo')
+
+    saidas = carregar_checkpoint(DIRETORIO_CHECKPOINT, etapa_saldos())
+    cobranca_total, cobranca_periodo = linhas_em_cobranca(saidas['razao'], saidas['df_agrupado'])
+    np.savez(os.path.join(diretorio_lado, 'cobranca.npz'), total=cobranca_total, periodo=cobranca_periodo)
+
+def interpretar_configuracoes(texto):
+
+    '''
+    Retorna:
+    dict: variáveis de ambiente de um texto "NOME=valor,NOME=valor" (com ou sem o prefixo NEXUS_).
+    '''
+
+    configuracoes = {}
+
+    for item in filter(None, (parte.strip() for parte in texto.split(','))):
+        nome, _, valor = item.partition('=')
+        nome = nome.strip()
+        configuracoes[nome if nome.startswith('NEXUS_') else f'NEXUS_{nome}'] = valor.strip()
+
+    return configuracoes
+
+def executar_implementacao(nome, configuracoes, diretorio):
+
+    '''
+    Função para executar o Nexus com as configurações de uma implementação, em um processo separado.
+
+    Retorna:
+    float ou None: tempo da execução (segundos) ou None em caso de erro.
+    '''
+
+    diretorio_lado = os.path.join(diretorio, nome)
+    shutil.rmtree(diretorio_lado, ignore_errors=True)
+    os.makedirs(os.path.join(diretorio_lado, 'resumo'))
+
+    ambiente = {
+        **os.environ,
+        **interpretar_configuracoes(configuracoes),
+        'NEXUS_CHECKPOINT_ETAPAS': '1',
+        'NEXUS_DIRETORIO_CHECKPOINT': os.path.join(diretorio_lado, 'checkpoints'),
+        'NEXUS_DIRETORIO_RESUMO': os.path.join(diretorio_lado, 'resumo'),
+        'NEXUS_DIRETORIO_EXECUCOES': os.path.join(diretorio_lado, 'execucoes'),
+        'NEXUS_RESUMO_PLANILHA': '0',
+        'NEXUS_MODO_INCREMENTAL': '0',
+        'NEXUS_CACHE_ATIVO': '0'
+    }
+
+    print(f'SISTEMA: Executando a implementação "{nome}" ({configuracoes or "configurações atuais"})...')
+    inicio = time.perf_counter()
+
+    with open(os.path.join(diretorio_lado, 'log_nexus.txt'), 'w', encoding='utf-8') as log:
+        execucao = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'lado', diretorio_lado], cwd=caminho_base, env=ambiente, stdout=log, stderr=subprocess.STDOUT
+        )
+
+    if execucao.returncode != 0:
+        print(f'AVISO: Erro na execução da implementação "{nome}" (detalhes em {os.path.join(diretorio_lado, "log_nexus.txt")}).')
+        return None
+
+    return round(time.perf_counter() - inicio, 3)
+
+def ler_resumo(diretorio_resumo):
+
+    '''
+    Retorna:
+    pd.DataFrame: CSVs do resumo de valores empilhados, com o nome do arquivo na coluna 'Arquivo'.
+    '''
+
+    quadros = [
+        pd.read_csv(caminho, sep=';', decimal=',', encoding='latin-1').assign(Arquivo=os.path.basename(caminho))
+        for caminho in sorted(glob.glob(os.path.join(diretorio_resumo, '*.csv')))
+    ]
+
+    if not quadros:
+        return pd.DataFrame({'Arquivo': pd.Series(dtype=object)})
+
+    df = pd.concat(quadros, ignore_index=True)
+
+    return df[['Arquivo'] + [c for c in df.columns if c != 'Arquivo']]
+
+def carregar_saidas(diretorio_lado):
+
+    '''
+    Retorna:
+    dict: {saída: DataFrame} das SAIDAS_COMPARADAS de uma implementação já executada.
+    '''
+
+    saidas = carregar_checkpoint(os.path.join(diretorio_lado, 'checkpoints'), etapa_saldos())
+    if saidas is None:
+        raise FileNotFoundError(f'Checkpoint da etapa "saldos" não encontrado em {diretorio_lado}.')
+
+    df_agrupado = saidas['df_agrupado']
+    cobranca = np.load(os.path.join(diretorio_lado, 'cobranca.npz'))
+
+    return {
+        'df_agrupado': df_agrupado,
+        'cobranca_total': df_agrupado[cobranca['total']],
+        'cobranca_periodo': df_agrupado[cobranca['periodo']],
+        'resumo': ler_resumo(os.path.join(diretorio_lado, 'resumo'))
+    }
+
+## ----- VERIFICAÇÃO -----
+
+def comparar_implementacoes(diretorio_referencia, diretorio_otimizada, **opcoes):
+
+    '''
+    Função para comparar as saídas de duas implementações já executadas.
+
+    Parâmetros:
+    diretorio_referencia, diretorio_otimizada: diretórios das execuções (executar_implementacao).
+    opcoes: tolerâncias e demais parâmetros de comparar_quadros.
+
+    Retorna:
+    list: resultados de comparar_quadros, um por saída.
+    '''
+
+    saidas_referencia = carregar_saidas(diretorio_referencia)
+    saidas_otimizada = carregar_saidas(diretorio_otimizada)
+    resultados = []
+
+    for nome, colunas_chave in SAIDAS_COMPARADAS.items():
+        inicio = time.perf_counter()
+        resultado = comparar_quadros(nome, saidas_referencia[nome], saidas_otimizada[nome], colunas_chave, **opcoes)
+        resultado['tempo_comparacao_s'] = round(time.perf_counter() - inicio, 3)
+
+        exibir_comparacao(resultado)
+        resultados.append(resultado)
+
+    return resultados
+
+def verificar_equivalencia(diretorio=None, referencia=None, otimizada=None, **opcoes):
+
+    '''
+    Função para executar a implementação de referência e a otimizada e comparar as suas saídas.
+
+    Parâmetros:
+    diretorio: diretório das execuções (None = NEXUS_DIRETORIO_EQUIVALENCIA).
+    referencia, otimizada: configurações "NOME=valor,..." (None = NEXUS_EQUIVALENCIA_REFERENCIA / _OTIMIZADA).
+    opcoes: tolerâncias e demais parâmetros de comparar_quadros.
+
+    Retorna:
+    bool: True quando todas as saídas são equivalentes.
+    '''
+
+    diretorio = DIRETORIO_EQUIVALENCIA if diretorio is None else diretorio
+    referencia = EQUIVALENCIA_REFERENCIA if referencia is None else referencia
+    otimizada = EQUIVALENCIA_OTIMIZADA if otimizada is None else otimizada
+
+    tempos = {}
+    for nome, configuracoes in (('referencia', referencia), ('otimizada', otimizada)):
+        tempos[nome] = executar_implementacao(nome, configuracoes, diretorio)
+        if tempos[nome] is None:
+            return False
+
+    print(f"SISTEMA: Tempo da referência {tempos['referencia']:.1f} s, da otimizada {tempos['otimizada']:.1f} s")
+
+    resultados = comparar_implementacoes(os.path.join(diretorio, 'referencia'), os.path.join(diretorio, 'otimizada'), **opcoes)
+    equivalentes = all(resultado['equivalente'] for resultado in resultados)
+
+    gravar_json(os.path.join(diretorio, 'equivalencia.json'), {
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'configuracoes': {'referencia': referencia, 'otimizada': otimizada},
+        'tolerancias': {'absoluta': opcoes.get('tolerancia_absoluta', TOLERANCIA_ABSOLUTA), 'relativa': opcoes.get('tolerancia_relativa', TOLERANCIA_RELATIVA)},
+        'tempos_s': tempos,
+        'equivalentes': equivalentes,
+        'saidas': resultados
+    })
+
+    print(f"SISTEMA: Implementações {'equivalentes' if equivalentes else 'DIFERENTES'} (detalhes em {os.path.join(diretorio, 'equivalencia.json')})")
+
+    return equivalentes
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'verificar'
+
+    if comando == 'lado':
+        executar_lado(sys.argv[2])
+    elif comando == 'comparar':
+        sys.exit(0 if all(resultado['equivalente'] for resultado in comparar_implementacoes(sys.argv[2], sys.argv[3])) else 1)
+    else:
+        sys.exit(0 if verificar_equivalencia() else 1)
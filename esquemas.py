@@ -0,0 +1,239 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import pandas as pd
+import numpy as np
+from leitores_excel import ler_excel
+from datas import interpretar_datas
+
+## ----- ESQUEMAS DAS FONTES -----
+
+## tipos aceitos nas colunas:
+##   'decimal': número com separador decimal/milhar da fonte, convertido direto para float
+##   'id': identificador (bilhete, transação) mantido como texto, sem o ".0" e sem perda de precisão
+##   'data': data/hora, lida com o formato informado em 'formatos_data' (ou inferida quando não informado)
+## as colunas que não aparecem no esquema mantêm o tipo inferido na leitura
+
+ESQUEMAS = {
+    'totalbus': {
+        'decimal': ',',
+        'milhar': '.',
+        'colunas': {
+            'TARIFA': 'decimal',
+            'PEDAGIO': 'decimal',
+            'TAXA_EMB': 'decimal',
+            'TOTAL DO BILHETE': 'decimal',
+            'VALOR MULTA': 'decimal',
+            'ID TRANSACAO ORIGINAL': 'id',
+            'DATA HORA VENDA': 'data',
+            'DATA HORA VENDA PARA CANC.': 'data'
+        },
+        'formatos_data': {
+            'DATA HORA VENDA': '%d/%m/%Y %H:%M',
+            'DATA HORA VENDA PARA CANC.': '%d/%m/%Y %H:%M'
+        }
+    },
+    'embarca_vendas': {
+        'decimal': ',',
+        'milhar': '.',
+        'colunas': {
+            'ID do Bilhete': 'id',
+            'Data da Compra': 'data'
+        },
+        'formatos_data': {}
+    },
+    'embarca_repasse': {
+        'decimal': ',',
+        'milhar': '.',
+        'colunas': {
+            'ID do Bilhete': 'id',
+            'Nº do Sistema': 'id',
+            'Tarifa': 'decimal',
+            'Taxas': 'decimal',
+            'Valor Total': 'decimal',
+            'Taxa de conveniência': 'decimal',
+            'Comissão': 'decimal',
+            'Repasse': 'decimal',
+            'Multa': 'decimal',
+            'Seguro': 'decimal',
+            'Repasse Seguro': 'decimal',
+            'Repasse Seguro Parcela': 'decimal'
+        },
+        'formatos_data': {}
+    }
+}
+
+## ----- CONVERSORES POR CÉLULA -----
+
+def criar_conversor_decimal(decimal, milhar):
+
+    '''
+    Função para criar o conversor de valores monetários de uma fonte.
+
+    Números já numéricos (células do Excel) são mantidos. Textos com o separador decimal da fonte
+    ("1.234,56") têm o separador de milhar removido; textos sem ele ("12.34") são lidos como estão,
+    assim como na conversão anterior (str.replace(',', '.')).
+    '''
+
+    def converter_decimal(valor):
+        if valor is None or isinstance(valor, (int, float, np.number)):
+            return np.nan if valor is None else float(valor)
+
+        texto = str(valor).strip()
+        if texto == '':
+            return np.nan
+
+        if decimal in texto:
+            texto = texto.replace(milhar, '').replace(decimal, '.')
+
+        return float(texto)
+
+    return converter_decimal
+
+def converter_id(valor):
+
+    '''
+    Função para converter um identificador em texto. Valores lidos como float ("123.0")
+    perdem a parte decimal e os vazios viram None.
+    '''
+
+    if valor is None or valor == '':
+        return None
+
+    if isinstance(valor, (float, np.floating)):
+        if np.isnan(valor):
+            return None
+        if valor.is_integer():
+            return str(int(valor))
+
+    if isinstance(valor, (int, np.integer)):
+        return str(valor)
+
+    return str(valor).strip().split('.')[0]
+
+def conversores_esquema(esquema, colunas=None):
+
+    '''
+    Retorna:
+    dict: {coluna: conversor} das colunas decimais e de identificação do esquema
+          (apenas as presentes em "colunas", quando informado).
+    '''
+
+    converter_decimal = criar_conversor_decimal(esquema['decimal'], esquema['milhar'])
+    conversores = {}
+
+    for coluna, tipo in esquema['colunas'].items():
+        if colunas is not None and coluna not in colunas:
+            continue
+        if tipo == 'decimal':
+            conversores[coluna] = converter_decimal
+        elif tipo == 'id':
+            conversores[coluna] = converter_id
+
+    return conversores
+
+## ----- DATAS -----
+
+def converter_datas(serie, formato=None, nome_coluna=''):
+
+    '''
+    Função para converter uma coluna de datas com o formato explícito da fonte.
+    Caso o formato não reconheça valores preenchidos, a coluna é convertida por inferência (dayfirst).
+    '''
+
+    if pd.api.types.is_datetime64_any_dtype(serie) or formato is None:
+        return interpretar_datas(serie)
+
+    convertida = interpretar_datas(serie, formato)
+
+    if convertida.isna().sum() > serie.isna().sum():
+        print(f'AVISO: A coluna "{nome_coluna}" possui datas fora do formato {formato}. Convertendo por inferência.')
+        convertida = interpretar_datas(serie, dayfirst=True)
+
+    return convertida
+
+def aplicar_datas(df, esquema):
+
+    '''
+    Função para converter, no DataFrame lido, todas as colunas de data do esquema.
+    '''
+
+    for coluna, tipo in esquema['colunas'].items():
+        if tipo == 'data' and coluna in df.columns:
+            df[coluna] = converter_datas(df[coluna], esquema['formatos_data'].get(coluna), coluna)
+
+    return df
+
+## ----- LEITURA DE CSV -----
+
+def ler_csv_esquema(caminho, colunas, esquema):
+
+    '''
+    Função para ler um CSV já nos tipos finais do esquema. Utiliza o leitor de CSV do pyarrow e,
+    caso algum valor não seja aceito por ele (ex.: separador de milhar), o leitor do pandas com os conversores.
+    '''
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        tipos_arrow = {}
+        formatos = []
+        for coluna, tipo in esquema['colunas'].items():
+            if coluna not in colunas:
+                continue
+            if tipo == 'decimal':
+                tipos_arrow[coluna] = pa.float64()
+            elif tipo == 'id':
+                tipos_arrow[coluna] = pa.string()
+            elif tipo == 'data' and coluna in esquema['formatos_data']:
+                tipos_arrow[coluna] = pa.timestamp('ns')
+                formatos.append(esquema['formatos_data'][coluna])
+
+        tabela = pa_csv.read_csv(
+            caminho,
+            read_options=pa_csv.ReadOptions(encoding='latin-1'),
+            parse_options=pa_csv.ParseOptions(delimiter=';'),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=colunas,
+                column_types=tipos_arrow,
+                decimal_point=esquema['decimal'],
+                timestamp_parsers=sorted(set(formatos)),
+                strings_can_be_null=True
+            )
+        )
+        df = tabela.to_pandas()
+
+        ## o pyarrow devolve None nos textos vazios; o pandas devolve NaN (exceto nos identificadores)
+        for coluna in df.columns[df.dtypes == object]:
+            if esquema['colunas'].get(coluna) != 'id':
+                df[coluna] = df[coluna].mask(df[coluna].isna(), np.nan)
+
+    except (ImportError, ValueError) as e:
+        print(f'SISTEMA: Leitura do CSV pelo pyarrow indisponível, utilizando o leitor do pandas. ({e})')
+        df = pd.read_csv(caminho, usecols=colunas, encoding='latin-1', sep=';', converters=conversores_esquema(esquema, colunas))
+
+    return aplicar_datas(df, esquema)
+
+## ----- LEITURA DE EXCEL -----
+
+def ler_excel_esquema(caminho, colunas, esquema, sheet=None):
+
+    '''
+    Função para ler uma planilha (ou várias abas) já nos tipos finais do esquema: os valores e
+    identificadores são convertidos célula a célula durante a leitura e as datas com o formato da fonte.
+    A planilha é lida pelo leitor configurado em NEXUS_LEITOR_EXCEL (leitores_excel.ler_excel).
+
+    Retorna:
+    pd.DataFrame ou dict de DataFrames (quando "sheet" é uma lista de abas).
+    '''
+
+    parametros = {'usecols': colunas, 'converters': conversores_esquema(esquema, colunas)}
+    if sheet is not None:
+        parametros['sheet_name'] = sheet
+
+    resultado = ler_excel(caminho, **parametros)
+
+    if isinstance(resultado, dict):
+        return {aba: aplicar_datas(df, esquema) for aba, df in resultado.items()}
+
+    return aplicar_datas(resultado, esquema)
@@ -0,0 +1,413 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from cache_ingestao import gravar_json
+from instrumentacao import medir, contar_linhas
+
+## ----- ORQUESTRAÇÃO DAS ETAPAS -----
+
+## a execução é dividida em etapas nomeadas, cada uma com entradas e saídas declaradas:
+##   {'nome': ..., 'funcao': ..., 'entradas': [...], 'saidas': [...], 'checkpoint': True}
+## a função recebe as entradas (pelo nome) e devolve as saídas (um valor, ou uma tupla na ordem de 'saidas').
+## a ordem da lista define de qual etapa vem cada valor (a última anterior que o produz); uma etapa começa
+## assim que as etapas das quais depende terminam, então etapas independentes rodam ao mesmo tempo (threads).
+##
+## a saída de cada etapa é gravada como checkpoint (DataFrames em Arrow IPC, que pode ser mapeado em memória,
+## e o restante em pickle). Com uma etapa inicial, as anteriores são carregadas do último checkpoint em vez
+## de executadas (ex.: refazer apenas a projeção e o que vem depois dela após mudar uma regra).
+## o checkpoint guarda a impressão das entradas e configurações das quais a etapa depende (direta ou
+## indiretamente, pela chave opcional 'depende_de'); quando ela mudou, o checkpoint é recusado e a etapa executada.
+## valores que nenhuma etapa pendente utiliza são liberados da memória ao longo da execução.
+
+## valor de saída que interrompe a execução (ex.: nenhum arquivo alterado na execução incremental)
+SAIDA_ENCERRAR = 'encerrar'
+
+## ----- CHECKPOINTS -----
+
+def resumir(valor):
+
+    '''
+    Retorna:
+    str: hash do valor serializado em JSON (chaves ordenadas).
+    '''
+
+    texto = json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+def impressoes_etapas(etapas, dados, impressao):
+
+    '''
+    Função para calcular a impressão de cada etapa: os componentes da impressão da execução dos quais ela
+    depende ('depende_de', todos quando ausente) e as impressões das etapas que produzem as suas entradas.
+
+    Retorna:
+    dict: {etapa: {'hash': ..., 'componentes': {componente ou etapa anterior: hash}}}.
+    '''
+
+    impressoes = {}
+
+    for etapa in etapas:
+        nomes = etapa.get('depende_de')
+        componentes = {nome: resumir(impressao[nome]) for nome in (impressao if nomes is None else nomes)}
+        componentes.update({f'etapa:{anterior}': impressoes[anterior]['hash'] for anterior in dados[etapa['nome']]})
+        impressoes[etapa['nome']] = {'hash': resumir(componentes), 'componentes': componentes}
+
+    return impressoes
+
+def nulos_objeto(serie):
+
+    '''
+    Retorna:
+    str ou None: como os vazios de uma coluna object são representados ('nan', 'none', 'sem' vazios)
+                 ou None quando há NaN e None misturados (não reconstruível a partir do Arrow).
+    '''
+
+    vazios = serie[serie.isna()]
+    if vazios.empty:
+        return 'sem'
+
+    nones = sum(valor is None for valor in vazios)
+
+    if nones == 0:
+        return 'nan'
+    if nones == len(vazios):
+        return 'none'
+
+    return None
+
+def gravar_quadro(df, caminho_base):
+
+    '''
+    Função para gravar um DataFrame do checkpoint em Arrow IPC (ou em pickle quando o Arrow não
+    reproduz o DataFrame: tipos misturados em uma coluna ou vazios NaN e None na mesma coluna).
+
+    Retorna:
+    dict: arquivo gravado e a representação dos vazios das colunas object.
+    '''
+
+    nulos = {str(coluna): nulos_objeto(df[coluna]) for coluna in df.columns[df.dtypes == object]}
+
+    if None not in nulos.values() and df.columns.is_unique and all(isinstance(coluna, str) for coluna in df.columns):
+        try:
+            tabela = pa.Table.from_pandas(df, preserve_index=True)
+
+            ## colunas object que o Arrow não guardaria como texto (ex.: datas ou números em object) não voltariam iguais
+            if any(not (pa.types.is_string(tabela.schema.field(coluna).type) or pa.types.is_null(tabela.schema.field(coluna).type))
+                   for coluna in nulos):
+                raise pa.ArrowTypeError('coluna object sem texto')
+
+            caminho = f'{caminho_base}.arrow'
+            with pa.OSFile(caminho, 'wb') as arquivo:
+                with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                    escritor.write_table(tabela)
+            return {'arquivo': os.path.basename(caminho), 'nulos': nulos}
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+
+    caminho = f'{caminho_base}.pkl'
+    df.to_pickle(caminho)
+
+    return {'arquivo': os.path.basename(caminho), 'nulos': {}}
+
+def carregar_quadro(diretorio, descricao):
+
+    caminho = os.path.join(diretorio, descricao['arquivo'])
+
+    if caminho.endswith('.pkl'):
+        return pd.read_pickle(caminho)
+
+    with pa.memory_map(caminho, 'r') as fonte:
+        df = pa.ipc.open_file(fonte).read_all().to_pandas()
+
+    ## o Arrow devolve None nos vazios das colunas object: voltando para NaN onde era NaN
+    for coluna, nulos in descricao['nulos'].items():
+        if nulos == 'nan':
+            df[coluna] = df[coluna].mask(df[coluna].isna(), np.nan)
+
+    return df
+
+def separar_quadros(valor, quadros):
+
+    '''
+    Função para trocar os DataFrames (também dentro de dicionários, listas e tuplas) por marcadores,
+    guardando-os em "quadros" para serem gravados em Arrow.
+    '''
+
+    if isinstance(valor, pd.DataFrame):
+        quadros.append(valor)
+        return {'__quadro__': len(quadros) - 1}
+
+    if isinstance(valor, dict):
+        return {chave: separar_quadros(item, quadros) for chave, item in valor.items()}
+
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(separar_quadros(item, quadros) for item in valor)
+
+    return valor
+
+def juntar_quadros(valor, quadros):
+
+    if isinstance(valor, dict):
+        if set(valor) == {'__quadro__'}:
+            return quadros[valor['__quadro__']]
+        return {chave: juntar_quadros(item, quadros) for chave, item in valor.items()}
+
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(juntar_quadros(item, quadros) for item in valor)
+
+    return valor
+
+def gravar_checkpoint(diretorio_checkpoint, etapa, saidas, impressao=None):
+
+    '''
+    Função para gravar as saídas de uma etapa (com a impressão das entradas e configurações da etapa).
+    O checkpoint anterior da etapa só é substituído depois que o novo foi gravado por completo.
+    '''
+
+    diretorio_etapa = os.path.join(diretorio_checkpoint, etapa['nome'])
+    diretorio_temporario = f'{diretorio_etapa}.{os.getpid()}.tmp'
+    shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    os.makedirs(diretorio_temporario)
+
+    quadros = []
+    estrutura = separar_quadros(saidas, quadros)
+
+    descricoes = [gravar_quadro(df, os.path.join(diretorio_temporario, f'quadro-{i}')) for i, df in enumerate(quadros)]
+
+    with open(os.path.join(diretorio_temporario, 'estrutura.pkl'), 'wb') as arquivo:
+        pickle.dump(estrutura, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    gravar_json(os.path.join(diretorio_temporario, 'manifesto.json'), {
+        'etapa': etapa['nome'],
+        'saidas': list(saidas),
+        'quadros': descricoes,
+        'impressao': impressao,
+        'gravado_em': time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+    shutil.rmtree(diretorio_etapa, ignore_errors=True)
+    os.replace(diretorio_temporario, diretorio_etapa)
+
+def carregar_checkpoint(diretorio_checkpoint, etapa, impressao=None):
+
+    '''
+    Parâmetros:
+    impressao: impressão atual da etapa (impressoes_etapas); None = sem conferir as entradas e configurações.
+
+    Retorna:
+    dict ou None: saídas gravadas da etapa, ou None quando não há checkpoint (ou ele não tem as saídas declaradas,
+                  ou foi gravado com outras entradas ou configurações).
+    '''
+
+    diretorio_etapa = os.path.join(diretorio_checkpoint, etapa['nome'])
+
+    try:
+        with open(os.path.join(diretorio_etapa, 'manifesto.json'), 'r', encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+        if manifesto['saidas'] != list(etapa['saidas']):
+            return None
+
+        ## checkpoint gravado com outras entradas ou configurações: misturaria resultados de execuções diferentes
+        if impressao is not None and (manifesto.get('impressao') or {}).get('hash') != impressao['hash']:
+            anteriores = (manifesto.get('impressao') or {}).get('componentes', {})
+            alterados = [nome for nome, valor in impressao['componentes'].items() if anteriores.get(nome) != valor]
+            alterados += [nome for nome in anteriores if nome not in impressao['componentes']]
+            print(f'AVISO: Checkpoint da etapa "{etapa["nome"]}" gravado com outras entradas ou configurações '
+                  f'({", ".join(alterados) or "sem impressão"}), ignorando o checkpoint.')
+            return None
+
+        quadros = [carregar_quadro(diretorio_etapa, descricao) for descricao in manifesto['quadros']]
+        with open(os.path.join(diretorio_etapa, 'estrutura.pkl'), 'rb') as arquivo:
+            estrutura = pickle.load(arquivo)
+    except (OSError, ValueError, KeyError, pickle.UnpicklingError, pa.ArrowInvalid):
+        return None
+
+    print(f'SISTEMA: Etapa "{etapa["nome"]}" carregada do checkpoint de {manifesto["gravado_em"]}.')
+
+    return juntar_quadros(estrutura, quadros)
+
+## ----- EXECUÇÃO -----
+
+def dependencias_etapas(etapas):
+
+    '''
+    Função para definir de quais etapas anteriores cada etapa depende.
+
+    Retorna:
+    tuple: (dados: {etapa: etapas que produzem as suas entradas},
+            ordem: {etapa: dados + etapas que leem ou produzem os valores que ela substitui, para não
+                    alterar um valor ainda em uso}).
+    '''
+
+    dados, ordem = {}, {}
+
+    for i, etapa in enumerate(etapas):
+        anteriores = etapas[:i]
+        dados[etapa['nome']] = set()
+
+        for entrada in etapa['entradas']:
+            produtores = [e['nome'] for e in anteriores if entrada in e['saidas']]
+            if not produtores:
+                raise ValueError(f'A entrada "{entrada}" da etapa "{etapa["nome"]}" não é produzida por nenhuma etapa anterior.')
+            dados[etapa['nome']].add(produtores[-1])
+
+        ordem[etapa['nome']] = dados[etapa['nome']] | {
+            e['nome'] for e in anteriores
+            if any(saida in e['entradas'] or saida in e['saidas'] for saida in etapa['saidas'])
+        }
+
+    return dados, ordem
+
+def fechamento(nomes, dependencias, parar=()):
+
+    '''
+    Retorna:
+    set: as etapas informadas e todas as etapas das quais dependem (direta ou indiretamente),
+         sem seguir as dependências das etapas em "parar".
+    '''
+
+    resultado, pendentes = set(), list(nomes)
+
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in resultado:
+            resultado.add(nome)
+            if nome not in parar:
+                pendentes.extend(dependencias[nome])
+
+    return resultado
+
+def executar_etapa(etapa, contexto, diretorio_checkpoint, impressao=None):
+
+    '''
+    Função executada nas threads: roda a etapa com as suas entradas e grava o checkpoint.
+
+    Retorna:
+    dict: saídas da etapa.
+    '''
+
+    inicio = time.perf_counter()
+    entradas = {entrada: contexto[entrada] for entrada in etapa['entradas']}
+
+    with medir(f"etapa.{etapa['nome']}", contar_linhas(entradas)) as registro:
+        resultado = etapa['funcao'](**entradas)
+
+        if not etapa['saidas']:
+            resultado = ()
+        elif len(etapa['saidas']) == 1:
+            resultado = (resultado,)
+        saidas = dict(zip(etapa['saidas'], resultado))
+        registro['linhas_saida'] = contar_linhas(saidas)
+
+    print(f'SISTEMA: Etapa "{etapa["nome"]}" concluída em {time.perf_counter() - inicio:.1f} s.')
+
+    if diretorio_checkpoint is not None and etapa.get('checkpoint', True) and saidas and not saidas.get(SAIDA_ENCERRAR):
+        try:
+            gravar_checkpoint(diretorio_checkpoint, etapa, saidas, impressao)
+        except (OSError, pickle.PicklingError, TypeError) as e:
+            print(f'AVISO: Erro ao gravar o checkpoint da etapa "{etapa["nome"]}". ({e})')
+
+    return saidas
+
+def executar_etapas(etapas, diretorio_checkpoint=None, etapa_inicial=None, etapa_final=None, threads=1, impressao=None):
+
+    '''
+    Função para executar as etapas respeitando as dependências entre elas.
+
+    Parâmetros:
+    etapas: lista de etapas (a ordem define de qual etapa vem cada valor).
+    diretorio_checkpoint: diretório dos checkpoints (None = sem checkpoints e sem retomada).
+    etapa_inicial: etapa a partir da qual a execução é refeita; as anteriores são carregadas do checkpoint
+                   (ou executadas, quando não há checkpoint e as suas saídas são necessárias).
+    etapa_final: última etapa executada (as etapas das quais ela não depende são ignoradas).
+    threads: quantidade de etapas executadas ao mesmo tempo.
+    impressao: {componente: valor} das entradas e configurações que alteram o resultado, gravada nos checkpoints
+               (os checkpoints gravados com outra impressão não são carregados); None = sem conferência.
+
+    Retorna:
+    dict: valores que continuam em memória ao final (saídas que nenhuma etapa utiliza).
+    '''
+
+    nomes = [etapa['nome'] for etapa in etapas]
+    for nome in filter(None, [etapa_inicial, etapa_final]):
+        if nome not in nomes:
+            raise ValueError(f'Etapa "{nome}" inexistente. Etapas: {", ".join(nomes)}.')
+
+    dados, ordem = dependencias_etapas(etapas)
+    impressoes = impressoes_etapas(etapas, dados, impressao) if impressao is not None else {}
+
+    ## com uma etapa final, apenas ela e as etapas das quais depende
+    if etapa_final:
+        necessarias = fechamento([etapa_final], dados)
+        etapas = [etapa for etapa in etapas if etapa['nome'] in necessarias]
+
+    posicao_inicial = nomes.index(etapa_inicial) if etapa_inicial else 0
+    contexto = {}
+    carregadas = set()
+
+    ## etapas anteriores à inicial: carregadas do checkpoint
+    if diretorio_checkpoint is not None:
+        for etapa in etapas:
+            if nomes.index(etapa['nome']) < posicao_inicial and etapa.get('checkpoint', True):
+                saidas = carregar_checkpoint(diretorio_checkpoint, etapa, impressoes.get(etapa['nome']))
+                if saidas is not None:
+                    contexto.update(saidas)
+                    carregadas.add(etapa['nome'])
+
+    ## executando a partir da etapa inicial, mais as anteriores não carregadas cujas saídas são utilizadas
+    a_executar = fechamento(
+        [etapa['nome'] for etapa in etapas if nomes.index(etapa['nome']) >= posicao_inicial], dados, carregadas
+    ) - carregadas
+
+    for etapa in etapas:
+        if etapa['nome'] in a_executar and nomes.index(etapa['nome']) < posicao_inicial:
+            print(f'AVISO: Etapa "{etapa["nome"]}" sem checkpoint válido disponível, executando novamente.')
+
+    pendentes = [etapa for etapa in etapas if etapa['nome'] in a_executar]
+    concluidas = set(nomes) - a_executar
+    em_execucao = {}
+    limite = max(1, threads)
+
+    consumidos = {entrada for etapa in etapas for entrada in etapa['entradas']}
+
+    def liberar_valores():
+        utilizados = {entrada for etapa in pendentes + list(em_execucao.values()) for entrada in etapa['entradas']}
+        for nome in [n for n in contexto if n in consumidos and n not in utilizados]:
+            del contexto[nome]
+
+    liberar_valores()
+
+    with ThreadPoolExecutor(max_workers=limite) as executor:
+        while pendentes or em_execucao:
+
+            ## iniciando (na ordem da lista) as etapas cujas dependências já terminaram
+            for etapa in list(pendentes):
+                if ordem[etapa['nome']] <= concluidas and len(em_execucao) < limite:
+                    pendentes.remove(etapa)
+                    tarefa = executor.submit(executar_etapa, etapa, dict(contexto), diretorio_checkpoint, impressoes.get(etapa['nome']))
+                    em_execucao[tarefa] = etapa
+
+            finalizadas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+
+            for tarefa in finalizadas:
+                etapa = em_execucao.pop(tarefa)
+                saidas = tarefa.result()
+                contexto.update(saidas)
+                concluidas.add(etapa['nome'])
+
+                if saidas.get(SAIDA_ENCERRAR):
+                    pendentes.clear()
+
+            liberar_valores()
+
+    return contexto
@@ -3,10 +3,13 @@
 import pandas as pd
 import os
 from datetime import datetime
+from cache_ingestao import ler_com_cache
+from esquemas import ler_csv_esquema, ler_excel_esquema
+from leitores_excel import ler_excel
 
 ## ----- FUNÇÃO PARA LER ARQUIVOS -----
 
-def ler_arquivo(caminho, colunas, sheet=None):
+def ler_arquivo(caminho, colunas, sheet=None, esquema=None):
 
     '''
     Função para ler/carregar um arquivo em CSV, XLS ou XLSX.
@@ -16,6 +19,8 @@ def ler_arquivo(caminho, colunas, sheet=None):
                         de vendas da Embarca (CSV ou Excel).
     colunas: definição das colunas que serão consideradas.
     sheet: definição de qual aba importar. Caso seja None, processará todas as abas presentes no dataframe.
+    esquema: esquema da fonte (esquemas.ESQUEMAS). Quando informado, os valores, identificadores e datas
+             já são lidos nos tipos finais.
     
     Retorna:
     pd.DataFrame: Um DataFrame consolidado com os dados processados.
@@ -24,14 +29,21 @@ def ler_arquivo(caminho, colunas, sheet=None):
     nome_arquivo = os.path.basename(caminho)
     print(f'SISTEMA: Processando o arquivo "{nome_arquivo}".')
 
-    if nome_arquivo.endswith('.csv'):
-        df = pd.read_csv(caminho, usecols=colunas, encoding='latin-1', sep=';')
+    ## a leitura passa pelo cache: arquivos que não mudaram são carregados sem novo parse
+    if esquema is not None and nome_arquivo.endswith('.csv'):
+        df = ler_com_cache(ler_csv_esquema, caminho, colunas=colunas, esquema=esquema)
+
+    elif esquema is not None and nome_arquivo.endswith(('.xlsx', '.xls')):
+        df = ler_com_cache(ler_excel_esquema, caminho, colunas=colunas, esquema=esquema, sheet=sheet)
+
+    elif nome_arquivo.endswith('.csv'):
+        df = ler_com_cache(pd.read_csv, caminho, usecols=colunas, encoding='latin-1', sep=';')
 
     elif nome_arquivo.endswith(('.xlsx', '.xls')):
         if sheet is not None:
-            df = pd.read_excel(caminho, usecols=colunas, sheet_name=sheet)
+            df = ler_com_cache(ler_excel, caminho, usecols=colunas, sheet_name=sheet)
         else:
-            df = pd.read_excel(caminho, usecols=colunas)
+            df = ler_com_cache(ler_excel, caminho, usecols=colunas)
 
     else:
         return None
@@ -0,0 +1,344 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from configuracoes import CACHE_DIRETORIO, ARQUIVO_REGRAS, CONSIDERAR_FERIADOS, FERIADOS_REGIONAIS, MODO_CENTAVOS, REGRAS_PROJECAO
+from configuracoes import MODO_INCREMENTAL
+from cache_ingestao import identificar_arquivo
+from ingestao import listar_arquivos, EXTENSOES_FONTES
+from totalbus import DEFINICAO_EMPRESAS
+from datas import mes_ordinal, periodos_mes
+
+## versão do estado gravado (alterar força uma execução completa)
+VERSAO_ESTADO = 3
+
+## colunas de empresa e transação de cada fonte, nos DataFrames lidos dos arquivos
+COLUNAS_CHAVE_FONTES = {
+    'totalbus': ('EMPRESA', 'ID TRANSACAO ORIGINAL'),
+    'embarca_vendas': ('Operadora', 'ID do Bilhete'),
+    'embarca_repasse': ('Operadora', 'ID do Bilhete')
+}
+
+## configurações que alteram os valores de todas as transações: quando mudam, a execução é completa
+## (misturar transações calculadas com configurações diferentes no mesmo relatório não é permitido)
+CONFIGURACOES_ESTADO = {
+    'CONSIDERAR_FERIADOS': CONSIDERAR_FERIADOS,
+    'FERIADOS_REGIONAIS': FERIADOS_REGIONAIS,
+    'MODO_CENTAVOS': MODO_CENTAVOS,
+    'REGRAS_PROJECAO': REGRAS_PROJECAO
+}
+
+## ordem das linhas da conciliação (Totalbus e depois Embarca; dentro de cada base, pelas colunas abaixo)
+COLUNAS_ORDEM_CONCILIACAO = ['Data da Compra', 'Nome da Empresa', 'ID Transacao', 'Bilhete', 'Status', 'Data de Lancamento',
+                             'Parcela Atual', 'Sequencial', 'Tipo']
+
+## textos que representam valores vazios depois do astype(str)
+VALORES_VAZIOS = ['nan', 'None', '<NA>', 'NaT']
+
+## ----- CHAVES DAS TRANSAÇÕES -----
+
+def normalizar_chaves(empresa, id_transacao):
+
+    '''
+    Função para montar as chaves (Nome da Empresa, ID Transacao) no mesmo formato para todas as fontes.
+    Os IDs lidos como float ("123.0") são comparados sem a parte decimal e os vazios viram ''.
+
+    Retorna:
+    pd.MultiIndex: chaves normalizadas, uma por linha.
+    '''
+
+    empresa = empresa.astype(str)
+    empresa = empresa.where(~empresa.isin(VALORES_VAZIOS), '')
+
+    id_transacao = id_transacao.astype(str).str.split('.').str[0]
+    id_transacao = id_transacao.where(~id_transacao.isin(VALORES_VAZIOS), '')
+
+    return pd.MultiIndex.from_arrays([empresa.to_numpy(), id_transacao.to_numpy()], names=['Nome da Empresa', 'ID Transacao'])
+
+def chaves_arquivos(arquivos):
+
+    '''
+    Função para levantar as transações tocadas por cada arquivo lido.
+
+    Parâmetros:
+    arquivos: dicionário {fonte: lista de DataFrames} retornado pela ingestão.
+
+    Retorna:
+    pd.DataFrame: colunas fonte, arquivo, Nome da Empresa e ID Transacao (sem repetições).
+    '''
+
+    lista_chaves = []
+
+    for fonte, lista in arquivos.items():
+        coluna_empresa, coluna_id = COLUNAS_CHAVE_FONTES[fonte]
+
+        for df in lista:
+            empresa = df[coluna_empresa]
+            if fonte == 'totalbus':
+                empresa = empresa.map(DEFINICAO_EMPRESAS)
+
+            chaves = normalizar_chaves(empresa, df[coluna_id]).to_frame(index=False)
+            chaves.insert(0, 'arquivo', df['Origem'].to_numpy())
+            chaves.insert(0, 'fonte', fonte)
+            lista_chaves.append(chaves)
+
+    if not lista_chaves:
+        return pd.DataFrame(columns=['fonte', 'arquivo', 'Nome da Empresa', 'ID Transacao'])
+
+    return pd.concat(lista_chaves, ignore_index=True).drop_duplicates(ignore_index=True)
+
+def filtrar_por_chaves(df, coluna_empresa, coluna_id, chaves):
+
+    '''
+    Função para manter apenas as linhas cujas chaves (empresa, transação) estão em "chaves".
+    '''
+
+    if df is None or df.empty:
+        return df
+
+    return df[normalizar_chaves(df[coluna_empresa], df[coluna_id]).isin(chaves)].copy()
+
+## ----- ESTADO DA ÚLTIMA EXECUÇÃO -----
+
+def inventariar_arquivos(fontes_diretorios):
+
+    '''
+    Retorna:
+    dict: {fonte: {nome do arquivo: hash do conteúdo}} dos arquivos presentes em cada diretório.
+    '''
+
+    inventario = {}
+
+    for fonte, diretorio in fontes_diretorios.items():
+        inventario[fonte] = {
+            os.path.basename(caminho): identificar_arquivo(caminho, CACHE_DIRETORIO)
+            for caminho in listar_arquivos(diretorio, EXTENSOES_FONTES[fonte])
+        }
+
+    return inventario
+
+def identificar_opcional(caminho):
+
+    '''
+    Retorna:
+    str ou None: hash do conteúdo do arquivo ou None quando ele não existe.
+    '''
+
+    return identificar_arquivo(caminho, CACHE_DIRETORIO) if os.path.exists(caminho) else None
+
+def impressao_entradas(fontes_diretorios, caminho_tx_conveniencia):
+
+    '''
+    Função para identificar as entradas e configurações que alteram o resultado da execução
+    (gravada nos checkpoints das etapas para não retomar uma execução a partir de saídas de outras entradas).
+
+    Retorna:
+    dict: {componente: valor} com os arquivos das fontes, a taxa de conveniência, as regras,
+          as configurações do estado incremental e o modo incremental.
+    '''
+
+    return {
+        'arquivos': inventariar_arquivos(fontes_diretorios),
+        'taxa_conveniencia': identificar_opcional(caminho_tx_conveniencia),
+        'regras': identificar_opcional(ARQUIVO_REGRAS),
+        **CONFIGURACOES_ESTADO,
+        'MODO_INCREMENTAL': MODO_INCREMENTAL
+    }
+
+def carregar_estado(diretorio_estado):
+
+    '''
+    Função para carregar o estado salvo na última execução.
+
+    Retorna:
+    dict ou None: estado (arquivos, chaves, conciliação e razão de saldos) ou None caso não exista ou seja incompatível.
+    '''
+
+    try:
+        with open(os.path.join(diretorio_estado, 'estado.json'), 'r', encoding='utf-8') as arquivo:
+            estado = json.load(arquivo)
+
+        if estado.get('versao') != VERSAO_ESTADO:
+            return None
+
+        estado['chaves'] = pd.read_pickle(os.path.join(diretorio_estado, 'chaves.pkl'))
+        estado['conciliacao'] = pd.read_pickle(os.path.join(diretorio_estado, 'conciliacao.pkl'))
+        estado['razao'] = pd.read_pickle(os.path.join(diretorio_estado, 'razao.pkl'))
+
+    except (OSError, ValueError, KeyError) as e:
+        print(f'SISTEMA: Estado da última execução indisponível, realizando a execução completa. ({e})')
+        return None
+
+    return estado
+
+def salvar_estado(diretorio_estado, execucao, df_agrupado, razao):
+
+    '''
+    Função para salvar o estado da execução: arquivos consumidos, chaves tocadas por cada arquivo,
+    a conciliação consolidada (com os saldos) e o razão de saldos por transação.
+    '''
+
+    print('SISTEMA: Salvando o estado da execução incremental...')
+    os.makedirs(diretorio_estado, exist_ok=True)
+
+    try:
+        for nome, df in [('chaves.pkl', execucao['chaves_arquivos']), ('conciliacao.pkl', df_agrupado), ('razao.pkl', razao)]:
+            caminho = os.path.join(diretorio_estado, nome)
+            df.to_pickle(f'{caminho}.tmp')
+            os.replace(f'{caminho}.tmp', caminho)
+
+        ## o estado.json é gravado por último: só é válido quando os demais arquivos estão completos
+        caminho = os.path.join(diretorio_estado, 'estado.json')
+        with open(f'{caminho}.tmp', 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'versao': VERSAO_ESTADO,
+                'taxa_conveniencia': execucao['hash_taxa'],
+                'regras': execucao['hash_regras'],
+                'configuracoes': CONFIGURACOES_ESTADO,
+                'arquivos': execucao['inventario']
+            }, arquivo, ensure_ascii=False, indent=2)
+        os.replace(f'{caminho}.tmp', caminho)
+
+    except Exception as e:
+        print(f'AVISO: Erro ao salvar o estado da execução incremental. ({e})')
+
+## ----- PLANEJAMENTO DA EXECUÇÃO -----
+
+def planejar_execucao(diretorio_estado, fontes_diretorios, arquivos, caminho_tx_conveniencia):
+
+    '''
+    Função para comparar os arquivos atuais com os da última execução e definir quais transações
+    precisam ser reprocessadas.
+
+    Parâmetros:
+    diretorio_estado: diretório do estado incremental.
+    fontes_diretorios: dicionário {fonte: diretório}.
+    arquivos: dicionário {fonte: lista de DataFrames} retornado pela ingestão.
+    caminho_tx_conveniencia: caminho da tabela de taxa de conveniência (alterações forçam execução completa).
+
+    Retorna:
+    dict: inventario, chaves_arquivos, hash_taxa, hash_regras, chaves (pd.MultiIndex das transações afetadas ou
+          None para execução completa), conciliacao e razao (DataFrames da última execução).
+    '''
+
+    execucao = {
+        'inventario': inventariar_arquivos(fontes_diretorios),
+        'chaves_arquivos': chaves_arquivos(arquivos),
+        'hash_taxa': identificar_opcional(caminho_tx_conveniencia),
+        'hash_regras': identificar_opcional(ARQUIVO_REGRAS),
+        'chaves': None,
+        'conciliacao': None,
+        'razao': None
+    }
+
+    estado = carregar_estado(diretorio_estado)
+
+    if estado is None:
+        print('SISTEMA: Nenhum estado anterior encontrado, realizando a execução completa.')
+        return execucao
+
+    if estado['taxa_conveniencia'] != execucao['hash_taxa']:
+        print('SISTEMA: A tabela de taxa de conveniência foi alterada, realizando a execução completa.')
+        return execucao
+
+    ## as regras das projeções valem para todas as transações: alterações também forçam a execução completa
+    if estado.get('regras') != execucao['hash_regras']:
+        print('SISTEMA: O arquivo de regras das projeções foi alterado, realizando a execução completa.')
+        return execucao
+
+    configuracoes_alteradas = [
+        nome for nome, valor in CONFIGURACOES_ESTADO.items() if estado.get('configuracoes', {}).get(nome) != valor
+    ]
+    if configuracoes_alteradas:
+        print(f'SISTEMA: Configuração(ões) alterada(s) desde a última execução ({", ".join(configuracoes_alteradas)}), realizando a execução completa.')
+        return execucao
+
+    ## identificando arquivos novos, alterados e removidos
+    alterados = set()
+
+    for fonte in set(execucao['inventario']) | set(estado['arquivos']):
+        atuais = execucao['inventario'].get(fonte, {})
+        anteriores = estado['arquivos'].get(fonte, {})
+
+        for nome in set(atuais) | set(anteriores):
+            if atuais.get(nome) != anteriores.get(nome):
+                alterados.add((fonte, nome))
+
+    if alterados:
+        print(f'SISTEMA: {len(alterados)} arquivo(s) alterado(s) desde a última execução.')
+
+    ## chaves tocadas pelos arquivos alterados, antes (estado) e agora (leitura atual)
+    def chaves_alteradas(df_chaves):
+        filtro = pd.MultiIndex.from_arrays([df_chaves['fonte'], df_chaves['arquivo']]).isin(list(alterados))
+        return pd.MultiIndex.from_frame(df_chaves.loc[filtro, ['Nome da Empresa', 'ID Transacao']])
+
+    chaves = chaves_alteradas(estado['chaves']).union(chaves_alteradas(execucao['chaves_arquivos']))
+
+    print(f'SISTEMA: {len(chaves)} transação(ões) serão reprocessadas.')
+
+    execucao['chaves'] = chaves
+    execucao['conciliacao'] = estado['conciliacao']
+    execucao['razao'] = estado['razao']
+
+    return execucao
+
+## ----- MESCLAGEM COM A ÚLTIMA EXECUÇÃO -----
+
+def periodos_afetados(df_anterior, df_novo, chaves):
+
+    '''
+    Função para levantar os meses (e pares empresa/mês do resumo) cujos relatórios precisam ser regravados.
+
+    Retorna:
+    tuple: (meses da data de lançamento, meses da data de projeção, pares (empresa, mês de lançamento)).
+    '''
+
+    df_anterior = df_anterior[normalizar_chaves(df_anterior['Nome da Empresa'], df_anterior['ID Transacao']).isin(chaves)]
+    df_afetado = pd.concat([df_anterior, df_novo], ignore_index=True)
+
+    periodo_lancamento = periodos_mes(mes_ordinal(df_afetado['Data de Lancamento']))
+    periodo_projecao = periodos_mes(mes_ordinal(df_afetado['Data Projecao']))
+
+    periodos_lancamento = set(periodo_lancamento.dropna())
+    periodos_projecao = set(periodo_projecao.dropna())
+    empresas_periodos = set(zip(df_afetado['Nome da Empresa'], periodo_lancamento))
+
+    return periodos_lancamento, periodos_projecao, empresas_periodos
+
+def chave_ordenacao(serie):
+
+    ## datas como inteiros, números como float e os demais valores pela ordem do texto
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return pd.factorize(serie.astype(str), sort=True)[0]
+
+def ordenar_conciliacao(df):
+
+    '''
+    Função para colocar a conciliação na ordem dos relatórios: Totalbus e depois Embarca, cada base ordenada
+    (de forma estável) por COLUNAS_ORDEM_CONCILIACAO. A ordem é aplicada na execução completa e depois da
+    mesclagem incremental, então a ordem das linhas (e das somas dos saldos) não depende do histórico de execuções.
+    '''
+
+    chaves = [chave_ordenacao(df[coluna]) for coluna in reversed(COLUNAS_ORDEM_CONCILIACAO)]
+    chaves.append((df['Base'] != 'Totalbus').to_numpy())
+
+    ## np.lexsort ordena pela última chave primeiro
+    return df.take(np.lexsort(chaves)).reset_index(drop=True)
+
+def mesclar_conciliacao(df_anterior, df_novo, chaves):
+
+    '''
+    Função para substituir, na conciliação da última execução, as transações reprocessadas
+    (mantendo a ordem da execução completa).
+    '''
+
+    mantidos = ~normalizar_chaves(df_anterior['Nome da Empresa'], df_anterior['ID Transacao']).isin(chaves)
+
+    return ordenar_conciliacao(pd.concat([df_anterior[mantidos], df_novo], ignore_index=True))
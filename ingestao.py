@@ -0,0 +1,118 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from funcoes import ler_arquivo
+from embarca_repasse import ler_arquivo_repasse
+from cache_ingestao import limpar_cache
+from esquemas import ESQUEMAS
+
+## ----- DEFINIÇÃO DAS FONTES -----
+
+## extensões aceitas e mensagem de erro (por arquivo) de cada fonte, iguais às da leitura sequencial
+EXTENSOES_FONTES = {
+    'totalbus': ('.csv', '.xls', '.xlsx'),
+    'embarca_vendas': ('.csv', '.xlsx', '.xls'),
+    'embarca_repasse': ('.xlsx', '.xls')
+}
+
+MENSAGENS_ERRO = {
+    'totalbus': 'SISTEMA: Erro ao processar o arquivo {arquivo}. ({erro})',
+    'embarca_vendas': 'SISTEMA: Erro ao processar o arquivo {arquivo}. ({erro})',
+    'embarca_repasse': 'AVISO: Erro ao processar os arquivos de repasse da Embarca. ({erro})'
+}
+
+## ----- FUNÇÕES DE LEITURA -----
+
+def listar_arquivos(diretorio, extensoes):
+
+    '''
+    Função para listar os arquivos de um diretório com as extensões informadas,
+    mantendo a mesma ordem do os.listdir.
+    '''
+
+    return [
+        os.path.join(diretorio, f) for f in os.listdir(diretorio) if f.endswith(extensoes)
+    ]
+
+def ler_arquivo_fonte(fonte, caminho, colunas):
+
+    '''
+    Função para ler um único arquivo de uma das fontes (executada dentro dos processos).
+
+    Retorna:
+    tuple: (lista de DataFrames lidos, erro). Apenas um dos dois é preenchido.
+    '''
+
+    try:
+        if fonte == 'totalbus':
+            df_temp = ler_arquivo(caminho, colunas, esquema=ESQUEMAS['totalbus'])
+            return ([df_temp] if df_temp is not None else []), None
+
+        if fonte == 'embarca_vendas':
+            df_temp = ler_arquivo(caminho, colunas, 'Base_Aprovados', ESQUEMAS['embarca_vendas'])
+            return ([df_temp] if df_temp is not None else []), None
+
+        df_aprov, df_canc = ler_arquivo_repasse(caminho, colunas)
+        return [df for df in (df_aprov, df_canc) if df is not None], None
+
+    except Exception as e:
+        return None, e
+
+## ----- AGENDADOR DE INGESTÃO -----
+
+def ingestao_paralela(fontes, numero_processos=None):
+
+    '''
+    Função para ler os arquivos de várias fontes (Totalbus, Embarca vendas e Embarca repasse)
+    ao mesmo tempo, distribuindo cada arquivo em um pool de processos.
+
+    Parâmetros:
+    fontes: dicionário {fonte: (diretório, colunas)}, com fonte em 'totalbus',
+            'embarca_vendas' ou 'embarca_repasse'.
+    numero_processos: quantidade de processos. Caso seja None ou 1, a leitura é sequencial.
+
+    Retorna:
+    dict: {fonte: lista de DataFrames}, na mesma ordem de arquivos da leitura sequencial.
+    '''
+
+    ## montando as tarefas de todas as fontes
+    tarefas = []
+
+    for fonte, (diretorio, colunas) in fontes.items():
+        for caminho in listar_arquivos(diretorio, EXTENSOES_FONTES[fonte]):
+            tarefas.append((fonte, caminho, colunas))
+
+    resultados = {}
+
+    if numero_processos is None or numero_processos <= 1 or len(tarefas) <= 1:
+        for tarefa in tarefas:
+            resultados[tarefa[:2]] = ler_arquivo_fonte(*tarefa)
+
+    else:
+        ## os maiores arquivos são enviados primeiro para equilibrar a carga entre os processos
+        tarefas_ordenadas = sorted(tarefas, key=lambda t: os.path.getsize(t[1]), reverse=True)
+
+        print(f'SISTEMA: Lendo {len(tarefas)} arquivos com {numero_processos} processos...')
+        with ProcessPoolExecutor(max_workers=numero_processos) as executor:
+            futuros = {tarefa[:2]: executor.submit(ler_arquivo_fonte, *tarefa) for tarefa in tarefas_ordenadas}
+            for chave, futuro in futuros.items():
+                try:
+                    resultados[chave] = futuro.result()
+                except Exception as e:
+                    resultados[chave] = (None, e)
+
+    ## consolidando os resultados por fonte, na ordem original dos arquivos
+    dataframes = {fonte: [] for fonte in fontes}
+
+    for fonte, caminho, _ in tarefas:
+        lista, erro = resultados[(fonte, caminho)]
+        if erro is not None:
+            print(MENSAGENS_ERRO[fonte].format(arquivo=os.path.basename(caminho), erro=erro))
+            continue
+        dataframes[fonte].extend(lista)
+
+    ## mantendo o cache de ingestão dentro do tamanho máximo
+    limpar_cache()
+
+    return dataframes
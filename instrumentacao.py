@@ -0,0 +1,248 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import sys
+import time
+import inspect
+import cProfile
+import platform
+import threading
+import functools
+import itertools
+from contextlib import contextmanager
+import pandas as pd
+import psutil
+from configuracoes import RELATORIO_EXECUCAO, DIRETORIO_EXECUCOES, PERFIL_ETAPAS
+from cache_ingestao import gravar_json
+
+## ----- MEDIÇÃO DAS ETAPAS -----
+
+## cada trecho medido (context manager "medir" ou decorador "instrumentar") registra:
+##   - tempo de relógio e tempo de CPU do processo (todas as threads e os processos filhos encerrados)
+##   - pico de memória residente (RSS) do processo durante o trecho, amostrado em uma thread
+##   - linhas de entrada e de saída e a vazão (linhas de entrada por segundo)
+## os registros da execução são gravados em um único JSON (NEXUS_RELATORIO_EXECUCAO) e, com
+## NEXUS_PERFIL_ETAPAS=1, cada trecho também grava o seu perfil (cProfile, .prof) no diretório da execução.
+## como o RSS e o CPU são do processo, trechos executados ao mesmo tempo (threads) se sobrepõem nas medições.
+
+## intervalo (segundos) entre as amostras de memória
+INTERVALO_AMOSTRAGEM = 0.05
+
+## registros da execução atual
+execucao_atual = {'inicio': None, 'identificador': None, 'etapas': []}
+trava_registros = threading.Lock()
+
+## o cProfile mede apenas a thread em que é ativado e não aceita dois perfis ativos ao mesmo tempo
+trava_perfil = threading.Lock()
+numeracao_perfis = itertools.count(1)
+
+def contar_linhas(valor):
+
+    '''
+    Retorna:
+    int: total de linhas dos DataFrames/Series do valor (também dentro de listas, tuplas e dicionários).
+    '''
+
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+
+    if isinstance(valor, (list, tuple)):
+        return sum(contar_linhas(item) for item in valor)
+
+    if isinstance(valor, dict):
+        return sum(contar_linhas(item) for item in valor.values())
+
+    return 0
+
+def mb(valor_bytes):
+
+    return round(valor_bytes / (1024 * 1024), 1)
+
+def tempo_cpu(processo):
+
+    tempos = processo.cpu_times()
+
+    ## inclui os processos filhos já encerrados (ex.: leitura paralela dos arquivos)
+    return tempos.user + tempos.system + tempos.children_user + tempos.children_system
+
+class AmostradorMemoria(threading.Thread):
+
+    '''
+    Thread que amostra o RSS do processo até ser encerrada, guardando o maior valor.
+    '''
+
+    def __init__(self, processo):
+        super().__init__(daemon=True)
+        self.processo = processo
+        self.pico = processo.memory_info().rss
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(INTERVALO_AMOSTRAGEM):
+            self.pico = max(self.pico, self.processo.memory_info().rss)
+
+    def encerrar(self):
+        self.parar.set()
+        self.join()
+        self.pico = max(self.pico, self.processo.memory_info().rss)
+        return self.pico
+
+@contextmanager
+def medir(nome, linhas_entrada=None):
+
+    '''
+    Context manager para medir um trecho da execução.
+
+    Parâmetros:
+    nome: nome do trecho no relatório da execução.
+    linhas_entrada: linhas recebidas pelo trecho (pode ser informado também no registro, dentro do bloco).
+
+    Retorna (no "as"):
+    dict: registro do trecho; o bloco pode preencher 'linhas_entrada' e 'linhas_saida'.
+    '''
+
+    registro = {'nome': nome, 'linhas_entrada': linhas_entrada, 'linhas_saida': None}
+
+    if not RELATORIO_EXECUCAO:
+        yield registro
+        return
+
+    processo = psutil.Process()
+    amostrador = AmostradorMemoria(processo)
+    rss_inicial = amostrador.pico
+    amostrador.start()
+
+    perfil = None
+    if PERFIL_ETAPAS and trava_perfil.acquire(blocking=False):
+        perfil = cProfile.Profile()
+        perfil.enable()
+
+    inicio_relogio = time.perf_counter()
+    inicio_cpu = tempo_cpu(processo)
+    registro['inicio_s'] = round(inicio_relogio - (execucao_atual['inicio'] or inicio_relogio), 3)
+
+    try:
+        yield registro
+    finally:
+        tempo_relogio = time.perf_counter() - inicio_relogio
+        registro['cpu_s'] = round(tempo_cpu(processo) - inicio_cpu, 3)
+        registro['tempo_s'] = round(tempo_relogio, 3)
+        registro['rss_inicial_mb'] = mb(rss_inicial)
+        registro['pico_rss_mb'] = mb(amostrador.encerrar())
+
+        linhas = registro['linhas_entrada'] or registro['linhas_saida']
+        registro['linhas_por_segundo'] = round(linhas / tempo_relogio) if linhas and tempo_relogio > 0 else None
+
+        if perfil is not None:
+            perfil.disable()
+            registro['perfil'] = salvar_perfil(perfil, nome)
+            trava_perfil.release()
+
+        with trava_registros:
+            execucao_atual['etapas'].append(registro)
+
+def instrumentar(nome, entrada=None, saida=None):
+
+    '''
+    Decorador para medir cada chamada de uma função.
+
+    Parâmetros:
+    nome: nome do trecho no relatório da execução.
+    entrada: parâmetro cujas linhas são as de entrada (None = todos os DataFrames recebidos).
+    saida: posição (tupla) ou chave (dicionário) do DataFrame de saída no retorno (None = todo o retorno).
+    '''
+
+    def decorador(funcao):
+
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def funcao_medida(*args, **kwargs):
+            if not RELATORIO_EXECUCAO:
+                return funcao(*args, **kwargs)
+
+            argumentos = assinatura.bind_partial(*args, **kwargs).arguments
+            linhas_entrada = contar_linhas(argumentos.get(entrada) if entrada else list(argumentos.values()))
+
+            with medir(nome, linhas_entrada) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro['linhas_saida'] = contar_linhas(resultado if saida is None else resultado[saida])
+
+            return resultado
+
+        return funcao_medida
+
+    return decorador
+
+## ----- RELATÓRIO DA EXECUÇÃO -----
+
+def diretorio_execucao():
+
+    return os.path.join(DIRETORIO_EXECUCOES, execucao_atual['identificador'] or 'sem_execucao')
+
+def salvar_perfil(perfil, nome):
+
+    '''
+    Retorna:
+    str ou None: arquivo .prof gravado (pstats/snakeviz), relativo ao diretório das execuções.
+    '''
+
+    try:
+        os.makedirs(diretorio_execucao(), exist_ok=True)
+        caminho = os.path.join(diretorio_execucao(), f'{next(numeracao_perfis):03d}_{nome}.prof')
+        perfil.dump_stats(caminho)
+        return os.path.relpath(caminho, DIRETORIO_EXECUCOES)
+    except OSError as e:
+        print(f'AVISO: Erro ao gravar o perfil de "{nome}". ({e})')
+        return None
+
+def iniciar_execucao():
+
+    execucao_atual['inicio'] = time.perf_counter()
+    execucao_atual['identificador'] = time.strftime('%Y%m%d_%H%M%S')
+    execucao_atual['etapas'] = []
+
+def salvar_relatorio_execucao(configuracoes=None):
+
+    '''
+    Função para gravar o relatório (JSON) da execução com as medições de todos os trechos.
+
+    Parâmetros:
+    configuracoes: informações adicionais da execução (ex.: etapas executadas).
+
+    Retorna:
+    str ou None: caminho do relatório gravado.
+    '''
+
+    if not RELATORIO_EXECUCAO or execucao_atual['inicio'] is None:
+        return None
+
+    processo = psutil.Process()
+
+    relatorio = {
+        'execucao': execucao_atual['identificador'],
+        'tempo_total_s': round(time.perf_counter() - execucao_atual['inicio'], 3),
+        'cpu_total_s': round(tempo_cpu(processo), 3),
+        'rss_final_mb': mb(processo.memory_info().rss),
+        'ambiente': {
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'configuracoes': {nome: valor for nome, valor in os.environ.items() if nome.startswith('NEXUS_')},
+        **(configuracoes or {}),
+        'etapas': sorted(execucao_atual['etapas'], key=lambda registro: registro.get('inicio_s', 0))
+    }
+
+    caminho = os.path.join(DIRETORIO_EXECUCOES, f"execucao_{execucao_atual['identificador']}.json")
+
+    try:
+        gravar_json(caminho, relatorio)
+    except OSError as e:
+        print(f'AVISO: Erro ao gravar o relatório da execução. ({e})')
+        return None
+
+    print(f'SISTEMA: Relatório da execução salvo em {caminho}')
+
+    return caminho
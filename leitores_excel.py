@@ -0,0 +1,178 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import importlib.util
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from configuracoes import LEITOR_EXCEL
+
+## ----- LEITORES DE EXCEL -----
+
+## leitores disponíveis (configuração NEXUS_LEITOR_EXCEL):
+##   'auto': calamine quando instalado, senão openpyxl em streaming
+##   'calamine': leitor nativo (Rust) do pacote python-calamine, pelo próprio pandas
+##   'openpyxl': openpyxl somente leitura, percorrendo as linhas e extraindo apenas as colunas pedidas
+##   'pandas': pd.read_excel com o engine padrão (comportamento anterior)
+## todos devolvem o mesmo resultado do pd.read_excel (tipos, vazios e abas)
+
+## códigos de erro do Excel (o pandas os converte em NaN)
+ERROS_EXCEL = {'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A', '#GETTING_DATA'}
+
+def calamine_disponivel():
+
+    return importlib.util.find_spec('python_calamine') is not None
+
+## ----- OPENPYXL EM STREAMING -----
+
+def converter_celula(valor):
+
+    '''
+    Função para converter o valor de uma célula da mesma forma que o pd.read_excel:
+    vazios viram '', números inteiros viram int e códigos de erro viram NaN.
+    '''
+
+    if valor is None:
+        return ''
+
+    if isinstance(valor, float):
+        inteiro = int(valor) if np.isfinite(valor) else None
+        return inteiro if inteiro == valor else valor
+
+    if isinstance(valor, str) and valor in ERROS_EXCEL:
+        return np.nan
+
+    return valor
+
+def ler_aba_streaming(aba, usecols=None, converters=None):
+
+    '''
+    Função para ler uma aba do openpyxl (somente leitura) linha a linha, mantendo apenas as colunas pedidas.
+
+    Retorna:
+    pd.DataFrame: aba lida, com a mesma inferência de tipos do pd.read_excel.
+    '''
+
+    linhas = aba.iter_rows(values_only=True)
+    indices = None
+    dados = []
+
+    for linha in linhas:
+
+        ## o cabeçalho é a primeira linha preenchida da aba
+        if indices is None:
+            cabecalho = [converter_celula(v) for v in linha]
+            while cabecalho and cabecalho[-1] == '':
+                cabecalho.pop()
+            if not cabecalho:
+                continue
+
+            if usecols is None:
+                indices = list(range(len(cabecalho)))
+            else:
+                faltantes = [c for c in usecols if c not in cabecalho]
+                if faltantes:
+                    raise ValueError(f'Usecols do not match columns, columns expected but not found: {faltantes}')
+                indices = [i for i, c in enumerate(cabecalho) if c in usecols]
+
+            dados.append([cabecalho[i] for i in indices])
+            continue
+
+        dados.append([converter_celula(linha[i]) if i < len(linha) else '' for i in indices])
+
+    if not dados:
+        return pd.DataFrame()
+
+    ## removendo as linhas vazias do final da aba
+    while len(dados) > 1 and all(v == '' for v in dados[-1]):
+        dados.pop()
+
+    return TextParser(dados, header=0, converters=converters).read()
+
+def ler_excel_openpyxl(caminho, usecols=None, sheet_name=0, converters=None):
+
+    from openpyxl import load_workbook
+
+    ## arquivos .xls não são lidos pelo openpyxl
+    if str(caminho).endswith('.xls'):
+        return pd.read_excel(caminho, usecols=usecols, sheet_name=sheet_name, converters=converters)
+
+    livro = load_workbook(caminho, read_only=True, data_only=True, keep_links=False)
+
+    try:
+        if sheet_name is None:
+            abas = list(livro.sheetnames)
+        elif isinstance(sheet_name, (list, tuple)):
+            abas = list(sheet_name)
+        else:
+            abas = [sheet_name]
+
+        resultado = {}
+        for aba in abas:
+            nome_aba = livro.sheetnames[aba] if isinstance(aba, int) else aba
+            if nome_aba not in livro.sheetnames:
+                raise ValueError(f"Worksheet named '{nome_aba}' not found")
+            resultado[aba] = ler_aba_streaming(livro[nome_aba], usecols, converters)
+
+    finally:
+        livro.close()
+
+    if sheet_name is None or isinstance(sheet_name, (list, tuple)):
+        return resultado
+
+    return resultado[sheet_name]
+
+## ----- CALAMINE E PANDAS -----
+
+def ler_excel_calamine(caminho, usecols=None, sheet_name=0, converters=None):
+
+    return pd.read_excel(caminho, usecols=usecols, sheet_name=sheet_name, converters=converters, engine='calamine')
+
+def ler_excel_pandas(caminho, usecols=None, sheet_name=0, converters=None):
+
+    return pd.read_excel(caminho, usecols=usecols, sheet_name=sheet_name, converters=converters)
+
+LEITORES_EXCEL = {
+    'calamine': ler_excel_calamine,
+    'openpyxl': ler_excel_openpyxl,
+    'pandas': ler_excel_pandas
+}
+
+def definir_leitor(nome=LEITOR_EXCEL):
+
+    '''
+    Retorna:
+    str: nome do leitor que será utilizado, conforme a configuração e os pacotes instalados.
+    '''
+
+    if nome == 'auto':
+        return 'calamine' if calamine_disponivel() else 'openpyxl'
+
+    if nome not in LEITORES_EXCEL:
+        print(f'AVISO: Leitor de Excel "{nome}" desconhecido. Utilizando o openpyxl.')
+        return 'openpyxl'
+
+    if nome == 'calamine' and not calamine_disponivel():
+        print('AVISO: O pacote python-calamine não está instalado. Utilizando o openpyxl.')
+        return 'openpyxl'
+
+    return nome
+
+## ----- LEITURA -----
+
+def ler_excel(caminho, usecols=None, sheet_name=0, converters=None, leitor=None):
+
+    '''
+    Função para ler uma planilha com o leitor configurado (mesmos parâmetros e retorno do pd.read_excel).
+
+    Parâmetros:
+    caminho: caminho do arquivo.
+    usecols: lista de colunas a manter (None = todas).
+    sheet_name: aba (nome ou posição), lista de abas ou None para todas.
+    converters: dicionário {coluna: função} aplicado célula a célula.
+    leitor: nome do leitor (None = configuração NEXUS_LEITOR_EXCEL).
+
+    Retorna:
+    pd.DataFrame ou dict de DataFrames (quando "sheet_name" é uma lista ou None).
+    '''
+
+    return LEITORES_EXCEL[definir_leitor(leitor or LEITOR_EXCEL)](caminho, usecols=usecols, sheet_name=sheet_name, converters=converters)
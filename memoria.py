@@ -0,0 +1,138 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import pandas as pd
+import numpy as np
+from configuracoes import COMPACTAR_MEMORIA
+
+## ----- POLÍTICAS DE TIPOS -----
+
+## cada módulo define a sua política (ex.: POLITICA_MEMORIA_TOTALBUS) com as chaves:
+##   'categorias': textos com poucos valores distintos (empresa, status, forma de pagamento...) -> category
+##   'textos': textos com muitos valores distintos (nomes, URLs, IDs) -> string[pyarrow]
+##   'inteiros': inteiros reduzidos para o menor tipo que comporta os valores (int8, int16...)
+##   'decimais': floats reduzidos para float32 apenas quando não há perda de precisão
+## colunas usadas como chave do merge_asof (empresa/ID nas fontes) não entram nas políticas, pois o
+## merge_asof exige o mesmo tipo dos dois lados
+
+## proporção máxima de valores distintos para converter uma coluna em category
+PROPORCAO_MAXIMA_CATEGORIA = 0.5
+
+## ----- MEDIÇÃO -----
+
+def uso_memoria(df):
+
+    '''
+    Retorna:
+    float: memória ocupada pelo DataFrame (incluindo o conteúdo dos textos), em MB.
+    '''
+
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+## ----- CONVERSÕES -----
+
+def converter_categoria(serie):
+
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+
+    if len(serie) == 0 or serie.nunique(dropna=False) / len(serie) > PROPORCAO_MAXIMA_CATEGORIA:
+        return serie
+
+    return serie.astype('category')
+
+def converter_texto(serie):
+
+    if isinstance(serie.dtype, pd.StringDtype):
+        return serie
+
+    return serie.astype('string[pyarrow]')
+
+def converter_inteiro(serie):
+
+    if not pd.api.types.is_integer_dtype(serie):
+        return serie
+
+    return pd.to_numeric(serie, downcast='integer')
+
+def converter_decimal(serie):
+
+    '''
+    Função para reduzir um float64 para float32 somente quando todos os valores são representados
+    sem perda (ex.: quantidades e valores zerados). Valores monetários com centavos continuam em float64.
+    '''
+
+    if serie.dtype != np.float64:
+        return serie
+
+    reduzida = serie.astype(np.float32)
+    if not np.array_equal(reduzida.to_numpy(np.float64), serie.to_numpy(), equal_nan=True):
+        return serie
+
+    return reduzida
+
+CONVERSORES_POLITICA = {
+    'categorias': converter_categoria,
+    'textos': converter_texto,
+    'inteiros': converter_inteiro,
+    'decimais': converter_decimal
+}
+
+## ----- COMPACTAÇÃO -----
+
+def aplicar_politica(df, politica):
+
+    for tipo, colunas in politica.items():
+        conversor = CONVERSORES_POLITICA[tipo]
+        for coluna in colunas:
+            if coluna in df.columns:
+                df[coluna] = conversor(df[coluna])
+
+    return df
+
+def compactar_memoria(df, politica, etapa):
+
+    '''
+    Função para reduzir a memória de um DataFrame conforme a política de tipos do módulo,
+    informando o uso de memória antes e depois da etapa.
+
+    Parâmetros:
+    df: DataFrame a ser compactado (alterado no próprio objeto).
+    politica: dicionário {tipo: lista de colunas} (ver POLÍTICAS DE TIPOS).
+    etapa: nome da etapa exibido no relatório de memória.
+
+    Retorna:
+    pd.DataFrame: o DataFrame compactado.
+    '''
+
+    if not COMPACTAR_MEMORIA or df is None or df.empty:
+        return df
+
+    memoria_antes = uso_memoria(df)
+    df = aplicar_politica(df, politica)
+    memoria_depois = uso_memoria(df)
+
+    relatorio_memoria(etapa, memoria_antes, memoria_depois)
+
+    return df
+
+def compactar_lista(lista, politica, etapa):
+
+    '''
+    Função para compactar uma lista de DataFrames (ex.: arquivos lidos na ingestão) com um único relatório.
+    '''
+
+    if not COMPACTAR_MEMORIA or not lista:
+        return lista
+
+    memoria_antes = sum(uso_memoria(df) for df in lista)
+    lista = [aplicar_politica(df, politica) for df in lista]
+    memoria_depois = sum(uso_memoria(df) for df in lista)
+
+    relatorio_memoria(etapa, memoria_antes, memoria_depois)
+
+    return lista
+
+def relatorio_memoria(etapa, memoria_antes, memoria_depois):
+
+    reducao = (1 - memoria_depois / memoria_antes) * 100 if memoria_antes else 0
+    print(f'SISTEMA: Memória "{etapa}": {memoria_antes:.1f} MB -> {memoria_depois:.1f} MB ({reducao:.0f}% menor)')
@@ -3,11 +3,28 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from totalbus import processamento_totalbus
-from embarca_vendas import processamento_embarca_vendas
-from embarca_repasse import processamento_repasses
-from funcoes import agrupamento_merge, agrupamento_concat
-from projecao import processando_projecao
+from multiprocessing import freeze_support
+from concurrent.futures import ThreadPoolExecutor
+from totalbus import processamento_totalbus, COLUNAS_TOTALBUS, POLITICA_MEMORIA_TOTALBUS
+from embarca_vendas import processamento_embarca_vendas, COLUNAS_EMBARCA_VENDAS, POLITICA_MEMORIA_EMBARCA_VENDAS
+from embarca_repasse import processamento_repasses, COLUNAS_EMBARCA_REPASSE, POLITICA_MEMORIA_EMBARCA_REPASSE
+from funcoes import agrupamento_concat
+from projecao import projetar_parcelas, materializar_projecao
+from ingestao import ingestao_paralela
+from configuracoes import NUMERO_PROCESSOS, MODO_INCREMENTAL, DIRETORIO_ESTADO, THREADS_RELATORIOS, SAIDA_PARQUET, MODO_CENTAVOS, CALCULO_SALDOS
+from configuracoes import CHECKPOINT_ETAPAS, DIRETORIO_CHECKPOINT, ETAPA_INICIAL, ETAPA_FINAL, THREADS_ETAPAS, PERFIL_ETAPAS
+from incremental import planejar_execucao, impressao_entradas, filtrar_por_chaves, periodos_afetados, mesclar_conciliacao, ordenar_conciliacao, salvar_estado
+from memoria import compactar_memoria, compactar_lista
+from chaves import COLUNA_CHAVE, atribuir_chave_transacao, codigos_grupo, soma_por_grupo
+from pareamento import indexar_pareamento, mesclar_mais_proximo
+from relatorios_parquet import salvar_parquet
+from razao_saldos import montar_razao, atualizar_razao, linhas_em_cobranca
+from resumo import salvar_resumo
+from vigencias import carregar_vigencias, consultar_vigencia
+from dinheiro import para_centavos, de_centavos
+from datas import interpretar_datas, fatorar_meses
+from etapas import executar_etapas, SAIDA_ENCERRAR
+from instrumentacao import medir, iniciar_execucao, salvar_relatorio_execucao
 import os
 
 ## ----- DEFININDO DIRETÓRIOS -----
@@ -29,364 +46,538 @@ caminho_relatorio_final_cobranca_data_venda_total = os.path.join(caminho_base, '
 caminho_relatorio_final_cobranca_data_projecao_total = os.path.join(caminho_base, 'Relatorio Final/Relatorios de Cobranca/Data de Projecao/Total')
 caminho_relatorio_final_cobranca_data_venda_periodo = os.path.join(caminho_base, 'Relatorio Final/Relatorios de Cobranca/Data da Venda/Periodo')
 caminho_relatorio_final_cobranca_data_projecao_periodo = os.path.join(caminho_base, 'Relatorio Final/Relatorios de Cobranca/Data de Projecao/Periodo')
+caminho_relatorio_final_parquet = os.path.join(caminho_base, 'Relatorio Final/Parquet')
 
-## ----- CARREGANDO TX DE CONVENIÊNCIA -----
+## diretórios das fontes (inventário da execução incremental e impressão dos checkpoints)
+FONTES_DIRETORIOS = {
+    'totalbus': caminho_totalbus,
+    'embarca_vendas': caminho_embarca_vendas,
+    'embarca_repasse': caminho_embarca_repasse
+}
 
-try:
-    df_taxa_conveniencia = pd.read_excel(caminho_tx_conveniencia)
-except Exception as e:
-    print(f'AVISO: Erro ao carregar a planilha de taxa de conveniência... ({e})')
+## ----- POLÍTICA DE MEMÓRIA DA CONCILIAÇÃO -----
 
-## ----- PROCESSAMENTO DAS VENDAS E CANCELAMENTO -----
+## tipos do df_agrupado (memoria.compactar_memoria); após a conciliação as colunas só são agrupadas,
+## filtradas e salvas, então empresa e ID também podem ser compactados
+POLITICA_MEMORIA_CONCILIACAO = {
+    'categorias': ['Origem', 'Base', 'Tipo', 'Nome da Empresa', 'Status', 'Metodo de Pagamento_V', 'Canal', 'Venda Localizada'],
+    'textos': ['ID Transacao', 'Nome do Passageiro'],
+    'inteiros': ['Parcelas', 'Parcela Atual', 'Parcela Referente', 'Sequencial'],
+    'decimais': ['Seguro_Parcela', 'Multa']
+}
 
-df_totalbus, diferencas = processamento_totalbus(caminho_totalbus)
-df_embarca_vendas, diferencas_embarca_v = processamento_embarca_vendas(caminho_embarca_vendas)
+## ----- CARREGANDO TX DE CONVENIÊNCIA -----
 
-## ----- APONTANDO DIFERENÇAS -----
+def carregar_taxa_conveniencia():
 
-if diferencas.shape[0] != 0:
-    print('\nSISTEMA: Há registros do TOTALBUS sem dados em algumas colunas:')
-    print(diferencas.to_string())
+    ## vigências do % da taxa de conveniência (vigencias.py)
+    return carregar_vigencias(caminho_tx_conveniencia, '% Tx Conv')
 
-if diferencas_embarca_v.shape[0] != 0:
-    print('\nSISTEMA: Há registros do EMBARCA VENDAS sem dados em algumas colunas:')
-    print(diferencas_embarca_v.to_string())
+## ----- LEITURA E PROCESSAMENTO DAS FONTES -----
 
-## ----- TRATANDO DADOS -----
+def ler_fontes():
 
-## tratando 'DATA HORA VENDA PARA CANC.' das vendas
+    ## lendo os arquivos das três fontes ao mesmo tempo
+    return ingestao_paralela({
+        'totalbus': (caminho_totalbus, COLUNAS_TOTALBUS),
+        'embarca_vendas': (caminho_embarca_vendas, COLUNAS_EMBARCA_VENDAS),
+        'embarca_repasse': (caminho_embarca_repasse, COLUNAS_EMBARCA_REPASSE)
+    }, NUMERO_PROCESSOS)
 
-temp_series = df_totalbus.apply(
-    lambda row: row['DATA HORA VENDA'] if row['STATUS BILHETE'] == 'V' else pd.NaT,
-    axis=1
-)
+def processar_totalbus(arquivos):
 
-df_totalbus['DATA HORA VENDA PARA CANC.'] = df_totalbus['DATA HORA VENDA PARA CANC.'].fillna(temp_series)
+    df_totalbus, diferencas, indice_vendas_totalbus = processamento_totalbus(caminho_totalbus, arquivos['totalbus'])
+    df_totalbus = compactar_memoria(df_totalbus, POLITICA_MEMORIA_TOTALBUS, 'Totalbus')
 
-## ----- AGRUPANDO TABELAS DO TOTALBUS COM A TAXA DE CONVENIÊNCIA -----
+    if diferencas.shape[0] != 0:
+        print('\nSISTEMA: Há registros do TOTALBUS sem dados em algumas colunas:')
+        print(diferencas.to_string())
 
-df_totalbus = agrupamento_merge(
-    df_totalbus,
-    df_taxa_conveniencia,
-    'DATA HORA VENDA PARA CANC.',
-    'Data',
-    'left',
-    'Data'
-)
+    return df_totalbus, indice_vendas_totalbus
 
-df_totalbus['% Tx Conv'] = df_totalbus['% Tx Conv'] / 100
-df_totalbus['VALOR MULTA'] = df_totalbus['VALOR MULTA'].fillna(0)
+def processar_embarca_vendas(arquivos):
 
-## ----- AGRUPANDO TABELAS DO TOTALBUS COM EMBARCA VENDAS -----
+    df_embarca_vendas, diferencas_embarca_v = processamento_embarca_vendas(caminho_embarca_vendas, arquivos['embarca_vendas'])
+    df_embarca_vendas = compactar_memoria(df_embarca_vendas, POLITICA_MEMORIA_EMBARCA_VENDAS, 'Embarca vendas')
 
-df_totalbus['DATA HORA VENDA PARA CANC.'] = pd.to_datetime(df_totalbus['DATA HORA VENDA PARA CANC.'], errors='coerce')
-df_totalbus['ID TRANSACAO ORIGINAL'] = df_totalbus['ID TRANSACAO ORIGINAL'].astype(str)
-df_embarca_vendas['Data da Compra'] = pd.to_datetime(df_embarca_vendas['Data da Compra'], errors='coerce')
-df_embarca_vendas['ID do Bilhete'] = df_embarca_vendas['ID do Bilhete'].astype(str)
+    if diferencas_embarca_v.shape[0] != 0:
+        print('\nSISTEMA: Há registros do EMBARCA VENDAS sem dados em algumas colunas:')
+        print(diferencas_embarca_v.to_string())
 
-df_totalbus['DATA HORA VENDA PARA CANC.'] = pd.to_datetime(df_totalbus['DATA HORA VENDA PARA CANC.'])
-df_embarca_vendas['Data da Compra'] = pd.to_datetime(df_embarca_vendas['Data da Compra'])
+    return df_embarca_vendas
 
-df_totalbus = df_totalbus.sort_values(by='DATA HORA VENDA PARA CANC.')
-df_embarca_vendas = df_embarca_vendas.sort_values(by='Data da Compra')
+def compactar_repasses(arquivos):
 
-tolerancia = pd.Timedelta('1 day')
+    return compactar_lista(arquivos['embarca_repasse'], POLITICA_MEMORIA_EMBARCA_REPASSE, 'Embarca repasse')
 
-df_embarca_vendas.rename(columns={'Data da Compra': 'Data da Venda'}, inplace=True)
+## ----- DEFININDO O ESCOPO DA EXECUÇÃO (COMPLETA OU INCREMENTAL) -----
 
-df_totalbus = pd.merge_asof(
-    df_totalbus,
-    df_embarca_vendas,
-    left_on='DATA HORA VENDA PARA CANC.',
-    right_on='Data da Venda',
-    left_by=['NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'],
-    right_by=['Operadora', 'ID do Bilhete'],
-    direction='nearest',
-    tolerance=tolerancia
-)
+def definir_escopo(arquivos, lista_repasses):
 
-df_totalbus.drop(columns=['Operadora', 'ID do Bilhete', 'Status'], inplace=True)
-df_totalbus['Data da Venda'] = df_totalbus['Data da Venda'].fillna(df_totalbus['DATA HORA VENDA PARA CANC.'])
+    '''
+    Retorna:
+    tuple: (plano da execução incremental ou None na execução completa, True quando não há nada a processar).
+    '''
 
-## ----- TRATANDO PARCELAS NÃO LOCALIZADAS -----
+    if not MODO_INCREMENTAL:
+        return None, False
 
-df_totalbus['parcelas'] = df_totalbus['parcelas'].fillna(1)
+    execucao = planejar_execucao(DIRETORIO_ESTADO, FONTES_DIRETORIOS, {**arquivos, 'embarca_repasse': lista_repasses}, caminho_tx_conveniencia)
 
-## ----- PROJETANDO AS PARCELAS -----
+    if execucao['chaves'] is not None and execucao['chaves'].empty:
+        print('SISTEMA: Nenhum arquivo foi alterado desde a última execução.')
+        return execucao, True
 
-df_projecao = processando_projecao(df_totalbus)
+    return execucao, False
 
-## ----- CARREGANDO REPASSES DA EMBARCA -----
+## ----- CONCILIAÇÃO DAS VENDAS -----
 
-df_embarca, diferencas_embarca_r = processamento_repasses(caminho_embarca_repasse, df_embarca_vendas, df_totalbus)
+def conciliar_vendas(df_totalbus, indice_vendas_totalbus, df_embarca_vendas, lista_repasses, taxa_conveniencia, execucao):
 
-## ----- APONTANDO DIFERENÇAS DO RELATÓRIO DE REPASSES DA EMBARCA -----
+    '''
+    Função para cruzar as vendas do Totalbus com as vendas da Embarca.
 
-if diferencas_embarca_r.shape[0] != 0:
-    diferencas_embarca_r = diferencas_embarca_r[['Operadora', 'ID do Bilhete', 'Forma de pagamento', 'Canal', 'Status', 'Data da Compra', 'Data do Cancelamento', 'parcelas pagas', 'Origem']]
-    print('\nSISTEMA: Há registros do TOTALBUS sem dados em algumas colunas:')
-    print(diferencas_embarca_r.to_string())
+    Parâmetros:
+    df_totalbus: DataFrame processado do Totalbus.
+    indice_vendas_totalbus: índice das vendas do Totalbus (totalbus.indexar_vendas).
+    df_embarca_vendas: DataFrame processado das vendas da Embarca.
+    lista_repasses: lista de DataFrames lidos dos repasses da Embarca.
+    taxa_conveniencia: vigências do % da taxa de conveniência (carregar_taxa_conveniencia).
+    execucao: plano da execução incremental (None = execução completa).
 
-## ----- RENOMEANDO E AGRUPANDO TOTALBUS E EMBARCA -----
+    Retorna:
+    tuple: (df_totalbus cruzado com as vendas da Embarca, indice_vendas_totalbus, df_embarca_vendas,
+            índice de pareamento das vendas da Embarca, lista_repasses), todos com a coluna de chave.
+    '''
 
-df_projecao_renomear = {
-    'NUMERO BILHETE': 'Bilhete',
-    'STATUS BILHETE': 'Status',
-    'ID TRANSACAO ORIGINAL': 'ID Transacao',
-    'NOME PASSAGEIRO': 'Nome do Passageiro',
-    'VALOR MULTA': 'Multa',
-    'DATA HORA VENDA PARA CANC.': 'Data da Compra',
-    'NOME_EMPRESA': 'Nome da Empresa',
-    '% Tx Conv': 'Taxa de Conv. (%)',
-    'Metodo de pagamento': 'Metodo de Pagamento',
-    'parcelas': 'Parcelas',
-    'PARCELA_ATUAL': 'Parcela Atual',
-    'Data de Lancamento': 'Data de Lancamento',
-    'Observacao': 'Observacao',
-    'DATA_PROJECAO': 'Data Projecao',
-    'CANAL_VENDA': 'Canal',
-    'PERCENTUAL_COMISSAO': 'Percentual de Comissao',
-    'TARIFA_PARCELA': 'Tarifa_Parcela',
-    'TAXA_CONV_PARCELA': 'Taxa de Conv._Parcela',
-    'TAXAS_PARCELA': 'Taxas_Parcela',
-    'COMISSAO_PARCELA': 'Comissao_Parcela',
-    'TOTAL_BILHETE_PARCELA': 'Total do Bilhete_Parcela',
-    'TOTAL_VENDA_PARCELA': 'Total da Venda_Parcela',
-    'Seguro_Parcela': 'Seguro_Parcela',
-     'TOTAL_REPASSE_PARCELA': 'Total do Repasse_Parcela'
-}
+    ## mantendo apenas as transações tocadas pelos arquivos alterados (execução incremental)
+    if execucao is not None and execucao['chaves'] is not None:
+        df_totalbus = filtrar_por_chaves(df_totalbus, 'NOME_EMPRESA', 'ID TRANSACAO ORIGINAL', execucao['chaves'])
+        df_embarca_vendas = filtrar_por_chaves(df_embarca_vendas, 'Operadora', 'ID do Bilhete', execucao['chaves'])
+        lista_repasses = [filtrar_por_chaves(df, 'Operadora', 'ID do Bilhete', execucao['chaves']) for df in lista_repasses]
 
-df_embarca_renomear = {
-    'Operadora': 'Nome da Empresa',
-    'ID do Bilhete': 'ID Transacao',
-    'Nº do Sistema': 'Bilhete',
-    'Forma de pagamento': 'Metodo de Pagamento',
-    'Canal': 'Canal',
-    'Nome do passageiro': 'Nome do Passageiro',
-    'Status': 'Status',
-    'Data da Compra': 'Data da Compra',
-    'Tarifa': 'Tarifa_Parcela',
-    'Taxas': 'Taxas_Parcela',
-    'Valor Total': 'Total do Bilhete_Parcela',
-    'Parcelas': 'Parcelas',
-    'Taxa de conveniência': 'Taxa de Conv._Parcela',
-    'Comissão': 'Comissao_Parcela',
-    'Multa': 'Multa',
-    'Repasse Seguro Parcela': 'Seguro_Parcela',
-    'Obs': 'Observacao',
-    'Parcela_Atual': 'Parcela Atual',
-    'Data de Lancamento': 'Data de Lancamento',
-    'Taxa de Conv. (%)': 'Taxa de Conv. (%)',
-    'Percentual de Comissao': 'Percentual de Comissao',
-    'Total da Venda': 'Total da Venda_Parcela',
-    'Repasse_liquido_inv': 'Total do Repasse_Parcela',
-    'Repasse_liquido_com_seguro_inv': 'Total do Repasse com Seguro_Parcela',
-    'Data_Projecao': 'Data Projecao'
-}
+    ## ----- CODIFICANDO AS CHAVES (EMPRESA, TRANSAÇÃO) DAS TRÊS FONTES -----
 
-df_projecao.rename(columns=df_projecao_renomear, inplace=True)
-df_embarca.rename(columns=df_embarca_renomear, inplace=True)
-
-df_projecao['Base'] = 'Totalbus'
-df_projecao['Metodo de Pagamento_V'] = df_projecao['Metodo de Pagamento']
-df_projecao['Sequencial'] = df_projecao['Parcela Atual']
-df_projecao['Parcela Referente'] = df_projecao['Parcela Atual']
-df_projecao['Venda Localizada'] = ''
-df_projecao['Data de Recebimento'] = ''
-df_projecao['Data BPE'] = df_projecao['Data da Compra']
-df_projecao['Total do Repasse com Seguro_Parcela'] = df_projecao['Total do Repasse_Parcela']
-df_projecao['Data BPE'] = df_projecao['Data BPE'].fillna(df_projecao['Data da Compra'])
-df_projecao['Tipo'] = 'Automatico'
-
-df_embarca['Base'] = 'Embarca'
-df_embarca['Data da Venda'] = df_embarca['Data da Compra']
-df_embarca['Data BPE'] = df_embarca['Data BPE'].fillna(df_embarca['Data da Compra'])
-
-df_agrupado = pd.concat(
-    [
-        df_projecao[['Origem', 'Base', 'Tipo', 'Nome da Empresa', 'Bilhete', 'ID Transacao', 'Status', 'Data da Compra', 'Data da Venda', 'Data BPE', 'Data de Lancamento', 'Nome do Passageiro',
-                     'Metodo de Pagamento_V', 'Parcelas', 'Parcela Atual', 'Parcela Referente', 'Sequencial', 'Data Projecao', 'Taxa de Conv. (%)', 'Canal', 'Percentual de Comissao',
-                     'Tarifa_Parcela', 'Taxas_Parcela', 'Total do Bilhete_Parcela', 'Taxa de Conv._Parcela', 'Total da Venda_Parcela',
-                     'Comissao_Parcela', 'Multa', 'Total do Repasse_Parcela', 'Seguro_Parcela', 'Total do Repasse com Seguro_Parcela', 'Observacao', 'Venda Localizada', 'Data de Recebimento']],
-        df_embarca[['Origem', 'Base', 'Tipo', 'Nome da Empresa', 'Bilhete', 'ID Transacao', 'Status', 'Data da Compra', 'Data da Venda', 'Data BPE', 'Data de Lancamento', 'Nome do Passageiro',
-                     'Metodo de Pagamento_V', 'Parcelas', 'Parcela Atual', 'Parcela Referente', 'Sequencial', 'Data Projecao', 'Taxa de Conv. (%)', 'Canal', 'Percentual de Comissao',
-                     'Tarifa_Parcela', 'Taxas_Parcela', 'Total do Bilhete_Parcela', 'Taxa de Conv._Parcela', 'Total da Venda_Parcela',
-                     'Comissao_Parcela', 'Multa', 'Total do Repasse_Parcela', 'Seguro_Parcela', 'Total do Repasse com Seguro_Parcela', 'Observacao', 'Venda Localizada', 'Data de Recebimento']]
-    ], ignore_index=True
-)
-
-saldo_por_id_data = df_agrupado.groupby(['Nome da Empresa', 'ID Transacao', 'Data Projecao'])['Total do Repasse_Parcela'].sum().reset_index()
-saldo_por_id_data.rename(columns={'Total do Repasse_Parcela': 'Saldo'}, inplace=True)
-saldo_total = df_agrupado.groupby(['Nome da Empresa', 'ID Transacao'])['Total do Repasse_Parcela'].sum().reset_index()
-saldo_total.rename(columns={'Total do Repasse_Parcela': 'Saldo_Total'}, inplace=True)
-df_agrupado = pd.merge(df_agrupado, saldo_por_id_data, how='left', on=['Nome da Empresa', 'ID Transacao', 'Data Projecao'])
-df_agrupado = pd.merge(df_agrupado, saldo_total, how='left', on=['Nome da Empresa', 'ID Transacao'])
+    ## os merge_asof do Totalbus, das vendas e dos repasses comparam o código inteiro da chave
+    atribuir_chave_transacao(
+        [(df_totalbus, 'NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'), (indice_vendas_totalbus['vendas'], 'NOME_EMPRESA', 'ID TRANSACAO ORIGINAL'),
+         (df_embarca_vendas, 'Operadora', 'ID do Bilhete')] +
+        [(df, 'Operadora', 'ID do Bilhete') for df in lista_repasses]
+    )
 
-## ----- SALVAMENTO DO DF_AGRUPADO DE FORMA FRACIONADA -----
+    ## ----- TRATANDO DADOS -----
 
-## definindo o nome geral dos arquivos
-nome_base_arquivo_venda = 'conciliacao_geral-v'
-nome_base_arquivo_proj = 'conciliacao_geral-p'
-nome_base_arquivo_recebimento = 'conciliacao_geral-r'
-nome_base_arquivo_cobranca_venda_total = 'conciliacao_geral-cobranca-v_total'
-nome_base_arquivo_cobranca_projecao_total = 'conciliacao_geral-cobranca-p_total'
-nome_base_arquivo_cobranca_venda_periodo = 'conciliacao_geral-cobranca-v_periodo'
-nome_base_arquivo_cobranca_projecao_periodo = 'conciliacao_geral-cobranca-p_periodo'
-
-## filtrando os dataframes com saldo != 0,00 para cobrar o cliente
-df_cobranca_total = df_agrupado[
-    (df_agrupado['Saldo'].abs() >= 0.01) &
-    (df_agrupado['Saldo_Total'].abs() >= 0.01)
-].copy()
-
-df_cobranca_periodo = df_agrupado[
-    (df_agrupado['Saldo'].abs() >= 0.01)
-].copy()
-
-## agrupando os DataFrames pela DATA PROJECAO e DATA DA COMPRA
-grupo_por_mes_projecao = df_agrupado.groupby(df_agrupado['Data Projecao'].dt.to_period('M'))
-grupo_por_mes_venda = df_agrupado.groupby(df_agrupado['Data de Lancamento'].dt.to_period('M'))
-grupo_por_mes_projecao_cobranca_total = df_cobranca_total.groupby(df_cobranca_total['Data Projecao'].dt.to_period('M'))
-grupo_por_mes_venda_cobranca_total = df_cobranca_total.groupby(df_cobranca_total['Data de Lancamento'].dt.to_period('M'))
-grupo_por_mes_projecao_cobranca_periodo = df_cobranca_periodo.groupby(df_cobranca_periodo['Data Projecao'].dt.to_period('M'))
-grupo_por_mes_venda_cobranca_periodo = df_cobranca_periodo.groupby(df_cobranca_periodo['Data de Lancamento'].dt.to_period('M'))
-
-## salvando pela data do lançamento
-for periodo, df_grupo in grupo_por_mes_venda:
-    ano_mes_str = periodo.strftime('%Y_%m')
-
-    nome_arquivo_completo = f'{nome_base_arquivo_venda}_{ano_mes_str}.csv'
-
-    caminho_arquivo_completo = os.path.join(caminho_relatorio_final_compra, nome_arquivo_completo)
-
-    ## salvando relatórios
-    try:
-        df_grupo.to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
-        print(f'SISTEMA: Salvo {len(df_grupo)} registros para {nome_arquivo_completo}')
-    except Exception as e:
-        print(f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}')
+    ## tratando 'DATA HORA VENDA PARA CANC.' das vendas
 
-## salvando o dataframe de cobranca pela data do lançamento com diferença no saldo total
-for periodo, df_grupo in grupo_por_mes_venda_cobranca_total:
-    ano_mes_str = periodo.strftime('%Y_%m')
+    df_totalbus['DATA HORA VENDA PARA CANC.'] = df_totalbus['DATA HORA VENDA PARA CANC.'].fillna(
+        df_totalbus['DATA HORA VENDA'].where(df_totalbus['STATUS BILHETE'] == 'V')
+    )
 
-    nome_arquivo_completo = f'{nome_base_arquivo_cobranca_venda_total}_{ano_mes_str}.csv'
+    ## ----- BUSCANDO A TAXA DE CONVENIÊNCIA VIGENTE NA DATA DA VENDA -----
 
-    caminho_arquivo_completo = os.path.join(caminho_relatorio_final_cobranca_data_venda_total, nome_arquivo_completo)
+    if taxa_conveniencia is None:
+        print('AVISO: Taxa de conveniência indisponível, os valores de taxa ficarão vazios.')
+        df_totalbus['% Tx Conv'] = np.nan
+    else:
+        df_totalbus['% Tx Conv'] = consultar_vigencia(taxa_conveniencia, df_totalbus['DATA HORA VENDA PARA CANC.']) / 100
 
-    ## salvando relatórios
-    try:
-        df_grupo.to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
-        print(f'SISTEMA: Salvo {len(df_grupo)} registros para {nome_arquivo_completo}')
-    except Exception as e:
-        print(f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}')
+    df_totalbus['VALOR MULTA'] = df_totalbus['VALOR MULTA'].fillna(0)
 
-## salvando o dataframe de cobranca pela data do lançamento com diferença apenas no saldo do período
-for periodo, df_grupo in grupo_por_mes_venda_cobranca_periodo:
-    ano_mes_str = periodo.strftime('%Y_%m')
+    ## ----- AGRUPANDO TABELAS DO TOTALBUS COM EMBARCA VENDAS -----
 
-    nome_arquivo_completo = f'{nome_base_arquivo_cobranca_venda_periodo}_{ano_mes_str}.csv'
+    ## as datas já chegam convertidas do processamento de cada fonte (interpretar_datas não as converte novamente)
+    df_totalbus['DATA HORA VENDA PARA CANC.'] = interpretar_datas(df_totalbus['DATA HORA VENDA PARA CANC.'])
+    df_totalbus['ID TRANSACAO ORIGINAL'] = df_totalbus['ID TRANSACAO ORIGINAL'].astype(str)
+    df_embarca_vendas['Data da Compra'] = interpretar_datas(df_embarca_vendas['Data da Compra'])
+    df_embarca_vendas['ID do Bilhete'] = df_embarca_vendas['ID do Bilhete'].astype(str)
 
-    caminho_arquivo_completo = os.path.join(caminho_relatorio_final_cobranca_data_venda_periodo, nome_arquivo_completo)
+    ## a ordem do Totalbus pela data define a ordem das linhas nos relatórios
+    df_totalbus = df_totalbus.sort_values(by='DATA HORA VENDA PARA CANC.')
 
-    ## salvando relatórios
-    try:
-        df_grupo.to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
-        print(f'SISTEMA: Salvo {len(df_grupo)} registros para {nome_arquivo_completo}')
-    except Exception as e:
-        print(f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}')
+    tolerancia = pd.Timedelta('1 day')
 
-## salvando o dataframe de cobranca pela data de projecao com diferença no saldo total
-for periodo, df_grupo in grupo_por_mes_projecao_cobranca_total:
-    ano_mes_str = periodo.strftime('%Y_%m')
+    df_embarca_vendas.rename(columns={'Data da Compra': 'Data da Venda'}, inplace=True)
 
-    nome_arquivo_completo = f'{nome_base_arquivo_cobranca_projecao_total}_{ano_mes_str}.csv'
+    ## indexando as vendas da Embarca uma única vez (o índice também é usado no cruzamento com os repasses)
+    indice_vendas = indexar_pareamento(df_embarca_vendas[COLUNA_CHAVE], df_embarca_vendas['Data da Venda'])
 
-    caminho_arquivo_completo = os.path.join(caminho_relatorio_final_cobranca_data_projecao_total, nome_arquivo_completo)
+    df_totalbus = mesclar_mais_proximo(
+        df_totalbus,
+        df_embarca_vendas,
+        'DATA HORA VENDA PARA CANC.',
+        'Data da Venda',
+        tolerancia,
+        indice=indice_vendas,
+        descricao='Totalbus x Embarca vendas'
+    )
 
-    ## salvando relatórios
-    try:
-        df_grupo.to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
-        print(f'SISTEMA: Salvo {len(df_grupo)} registros para {nome_arquivo_completo}')
-    except Exception as e:
-        print(f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}')
+    df_totalbus.drop(columns=['Operadora', 'ID do Bilhete', 'Status'], inplace=True)
+    df_totalbus['Data da Venda'] = df_totalbus['Data da Venda'].fillna(df_totalbus['DATA HORA VENDA PARA CANC.'])
 
-## salvando o dataframe de cobranca pela data de projecao com diferença apenas no saldo do período
-for periodo, df_grupo in grupo_por_mes_projecao_cobranca_periodo:
-    ano_mes_str = periodo.strftime('%Y_%m')
+    ## ----- TRATANDO PARCELAS NÃO LOCALIZADAS -----
 
-    nome_arquivo_completo = f'{nome_base_arquivo_cobranca_projecao_periodo}_{ano_mes_str}.csv'
+    df_totalbus['parcelas'] = df_totalbus['parcelas'].fillna(1)
 
-    caminho_arquivo_completo = os.path.join(caminho_relatorio_final_cobranca_data_projecao_periodo, nome_arquivo_completo)
+    return df_totalbus, indice_vendas_totalbus, df_embarca_vendas, indice_vendas, lista_repasses
 
-    ## salvando relatórios
-    try:
-        df_grupo.to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
-        print(f'SISTEMA: Salvo {len(df_grupo)} registros para {nome_arquivo_completo}')
-    except Exception as e:
-        print(f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}')
+## ----- REPASSES DA EMBARCA -----
 
-## salvando o dataframe de resumo de empresa + data projecao + valores + intrução de implantação
+def processar_repasses(df_embarca_vendas, indice_vendas_totalbus, lista_repasses, indice_vendas):
 
-## filtrando os do df agrupado e criando uma cópia
-df_resumo = df_agrupado[['Base', 'Nome da Empresa', 'Data de Lancamento', 'Parcela Atual', 'Data Projecao', 'Total do Bilhete_Parcela', 'Taxa de Conv._Parcela', 'Comissao_Parcela', 'Multa', 'Total do Repasse_Parcela']]
+    df_embarca, diferencas_embarca_r = processamento_repasses(caminho_embarca_repasse, df_embarca_vendas, indice_vendas_totalbus, lista_repasses, indice_vendas)
 
-df_resumo = df_resumo[df_resumo['Base'] == 'Totalbus']
+    ## ----- APONTANDO DIFERENÇAS DO RELATÓRIO DE REPASSES DA EMBARCA -----
 
-## zerando os valores de multa das parcelas que não são a primeira
-condicional = df_resumo['Parcela Atual'] != 1
-df_resumo.loc[condicional, 'Multa'] = 0
+    if diferencas_embarca_r.shape[0] != 0:
+        diferencas_embarca_r = diferencas_embarca_r[['Operadora', 'ID do Bilhete', 'Forma de pagamento', 'Canal', 'Status', 'Data da Compra', 'Data do Cancelamento', 'parcelas pagas', 'Origem']]
+        print('\nSISTEMA: Há registros do TOTALBUS sem dados em algumas colunas:')
+        print(diferencas_embarca_r.to_string())
 
-## ajustando a data para mes/ano
-df_resumo['Data de Lancamento'] = df_resumo['Data de Lancamento'].dt.to_period('M')
-df_resumo['Data Projecao'] = df_resumo['Data Projecao'].dt.to_period('M')
+    return df_embarca
 
-## agrupando os relatórios por empresa e data de lancamento
-df_agrupado_teste = df_resumo.groupby(['Nome da Empresa', 'Data de Lancamento'])
+## ----- RENOMEANDO E AGRUPANDO TOTALBUS E EMBARCA -----
 
-## renomeando colunas
-df_resumo.rename(columns={
-    'Data Projecao': 'Data de Vencimento',
-    'Total do Bilhete_Parcela': 'Total do Bilhete',
-    'Taxa de Conv._Parcela': 'Tx de Conv.',
-    'Comissao_Parcela': 'Comissao',
-    'Total do Repasse_Parcela': 'Repasse'
-}, inplace=True)
+def agrupar_conciliacao(projecao, df_embarca):
+
+    '''
+    Função para consolidar o Totalbus projetado com os repasses da Embarca.
+
+    Retorna:
+    pd.DataFrame: DataFrame consolidado (Totalbus projetado + Embarca), ainda sem os saldos.
+    '''
+
+    df_projecao_renomear = {
+        'NUMERO BILHETE': 'Bilhete',
+        'STATUS BILHETE': 'Status',
+        'ID TRANSACAO ORIGINAL': 'ID Transacao',
+        'NOME PASSAGEIRO': 'Nome do Passageiro',
+        'VALOR MULTA': 'Multa',
+        'DATA HORA VENDA PARA CANC.': 'Data da Compra',
+        'NOME_EMPRESA': 'Nome da Empresa',
+        '% Tx Conv': 'Taxa de Conv. (%)',
+        'Metodo de pagamento': 'Metodo de Pagamento',
+        'parcelas': 'Parcelas',
+        'PARCELA_ATUAL': 'Parcela Atual',
+        'Data de Lancamento': 'Data de Lancamento',
+        'Observacao': 'Observacao',
+        'DATA_PROJECAO': 'Data Projecao',
+        'CANAL_VENDA': 'Canal',
+        'PERCENTUAL_COMISSAO': 'Percentual de Comissao',
+        'TARIFA_PARCELA': 'Tarifa_Parcela',
+        'TAXA_CONV_PARCELA': 'Taxa de Conv._Parcela',
+        'TAXAS_PARCELA': 'Taxas_Parcela',
+        'COMISSAO_PARCELA': 'Comissao_Parcela',
+        'TOTAL_BILHETE_PARCELA': 'Total do Bilhete_Parcela',
+        'TOTAL_VENDA_PARCELA': 'Total da Venda_Parcela',
+        'Seguro_Parcela': 'Seguro_Parcela',
+         'TOTAL_REPASSE_PARCELA': 'Total do Repasse_Parcela'
+    }
+
+    df_embarca_renomear = {
+        'Operadora': 'Nome da Empresa',
+        'ID do Bilhete': 'ID Transacao',
+        'Nº do Sistema': 'Bilhete',
+        'Forma de pagamento': 'Metodo de Pagamento',
+        'Canal': 'Canal',
+        'Nome do passageiro': 'Nome do Passageiro',
+        'Status': 'Status',
+        'Data da Compra': 'Data da Compra',
+        'Tarifa': 'Tarifa_Parcela',
+        'Taxas': 'Taxas_Parcela',
+        'Valor Total': 'Total do Bilhete_Parcela',
+        'Parcelas': 'Parcelas',
+        'Taxa de conveniência': 'Taxa de Conv._Parcela',
+        'Comissão': 'Comissao_Parcela',
+        'Multa': 'Multa',
+        'Repasse Seguro Parcela': 'Seguro_Parcela',
+        'Obs': 'Observacao',
+        'Parcela_Atual': 'Parcela Atual',
+        'Data de Lancamento': 'Data de Lancamento',
+        'Taxa de Conv. (%)': 'Taxa de Conv. (%)',
+        'Percentual de Comissao': 'Percentual de Comissao',
+        'Total da Venda': 'Total da Venda_Parcela',
+        'Repasse_liquido_inv': 'Total do Repasse_Parcela',
+        'Repasse_liquido_com_seguro_inv': 'Total do Repasse com Seguro_Parcela',
+        'Data_Projecao': 'Data Projecao'
+    }
+
+    ## materializando as parcelas (bilhete x parcela) apenas com as colunas utilizadas na conciliação
+    df_projecao = materializar_projecao(projecao, list(df_projecao_renomear) + ['Origem', 'Data da Venda'])
+
+    df_projecao.rename(columns=df_projecao_renomear, inplace=True)
+    df_embarca.rename(columns=df_embarca_renomear, inplace=True)
+
+    df_projecao['Base'] = 'Totalbus'
+    df_projecao['Metodo de Pagamento_V'] = df_projecao['Metodo de Pagamento']
+    df_projecao['Sequencial'] = df_projecao['Parcela Atual']
+    df_projecao['Parcela Referente'] = df_projecao['Parcela Atual']
+    df_projecao['Venda Localizada'] = ''
+    df_projecao['Data de Recebimento'] = ''
+    df_projecao['Data BPE'] = df_projecao['Data da Compra']
+    df_projecao['Total do Repasse com Seguro_Parcela'] = df_projecao['Total do Repasse_Parcela']
+    df_projecao['Data BPE'] = df_projecao['Data BPE'].fillna(df_projecao['Data da Compra'])
+    df_projecao['Tipo'] = 'Automatico'
+
+    colunas_agrupado = ['Origem', 'Base', 'Tipo', 'Nome da Empresa', 'Bilhete', 'ID Transacao', 'Status', 'Data da Compra', 'Data da Venda', 'Data BPE', 'Data de Lancamento', 'Nome do Passageiro',
+                        'Metodo de Pagamento_V', 'Parcelas', 'Parcela Atual', 'Parcela Referente', 'Sequencial', 'Data Projecao', 'Taxa de Conv. (%)', 'Canal', 'Percentual de Comissao',
+                        'Tarifa_Parcela', 'Taxas_Parcela', 'Total do Bilhete_Parcela', 'Taxa de Conv._Parcela', 'Total da Venda_Parcela',
+                        'Comissao_Parcela', 'Multa', 'Total do Repasse_Parcela', 'Seguro_Parcela', 'Total do Repasse com Seguro_Parcela', 'Observacao', 'Venda Localizada', 'Data de Recebimento']
+
+    lista_agrupado = [df_projecao[colunas_agrupado]]
+
+    ## o relatório de repasses pode vir vazio (ex.: execução incremental sem repasses alterados)
+    if not df_embarca.empty:
+        df_embarca['Base'] = 'Embarca'
+        df_embarca['Data da Venda'] = df_embarca['Data da Compra']
+        df_embarca['Data BPE'] = df_embarca['Data BPE'].fillna(df_embarca['Data da Compra'])
+        lista_agrupado.append(df_embarca[colunas_agrupado])
+
+    ## ordem dos relatórios (a mesma da mesclagem incremental, incremental.ordenar_conciliacao)
+    df_agrupado = ordenar_conciliacao(pd.concat(lista_agrupado, ignore_index=True))
+
+    return compactar_memoria(df_agrupado, POLITICA_MEMORIA_CONCILIACAO, 'Conciliação')
+
+## ----- SALDOS POR TRANSAÇÃO -----
+
+def saldos_merge(df_agrupado):
+
+    '''
+    Função com o cálculo original dos saldos (groupby + merge), usada quando NEXUS_CALCULO_SALDOS=merge
+    (referência da verificação de equivalência).
+    '''
+
+    saldo_por_id_data = df_agrupado.groupby(['Nome da Empresa', 'ID Transacao', 'Data Projecao'], observed=True)['Total do Repasse_Parcela'].sum().reset_index()
+    saldo_por_id_data.rename(columns={'Total do Repasse_Parcela': 'Saldo'}, inplace=True)
+    saldo_total = df_agrupado.groupby(['Nome da Empresa', 'ID Transacao'], observed=True)['Total do Repasse_Parcela'].sum().reset_index()
+    saldo_total.rename(columns={'Total do Repasse_Parcela': 'Saldo_Total'}, inplace=True)
+    df_agrupado = pd.merge(df_agrupado, saldo_por_id_data, how='left', on=['Nome da Empresa', 'ID Transacao', 'Data Projecao'])
+    df_agrupado = pd.merge(df_agrupado, saldo_total, how='left', on=['Nome da Empresa', 'ID Transacao'])
+
+    return df_agrupado
+
+def calcular_saldos(df_agrupado):
+
+    if CALCULO_SALDOS == 'merge':
+        return saldos_merge(df_agrupado)
+
+    ## codificando (empresa, transação) uma vez e reaproveitando o código no saldo por data de projeção
+    codigo_transacao = codigos_grupo(df_agrupado, ['Nome da Empresa', 'ID Transacao'])
+    codigo_transacao_data = codigos_grupo(df_agrupado, ['Data Projecao'], codigo_transacao)
+
+    ## modo centavos: somas exatas em centavos inteiros
+    if MODO_CENTAVOS:
+        repasse_centavos = para_centavos(df_agrupado['Total do Repasse_Parcela'])
+        df_agrupado['Saldo'] = de_centavos(soma_por_grupo(repasse_centavos, codigo_transacao_data))
+        df_agrupado['Saldo_Total'] = de_centavos(soma_por_grupo(repasse_centavos, codigo_transacao))
+        return df_agrupado
+
+    df_agrupado['Saldo'] = soma_por_grupo(df_agrupado['Total do Repasse_Parcela'], codigo_transacao_data)
+    df_agrupado['Saldo_Total'] = soma_por_grupo(df_agrupado['Total do Repasse_Parcela'], codigo_transacao)
+
+    return df_agrupado
+
+def consolidar_saldos(df_agrupado, execucao):
+
+    '''
+    Função para calcular os saldos e o razão e, na execução incremental, mesclar com a última execução.
+
+    Retorna:
+    tuple: (df_agrupado, razao, meses de lançamento, meses de projeção e empresas + meses a regravar;
+            os três últimos são None na execução completa).
+    '''
+
+    df_agrupado = calcular_saldos(df_agrupado)
+    razao = montar_razao(df_agrupado)
 
-## looping em cada data frame
-for (empresa, periodo), grupo in df_agrupado_teste:
+    periodos_lancamento, periodos_projecao, empresas_periodos = None, None, None
 
-    ## definindo o nome do arquivo
-    nome_arquivo = f'{empresa}_{periodo}.csv'
+    if execucao is not None:
+        if execucao['chaves'] is not None:
+            periodos_lancamento, periodos_projecao, empresas_periodos = periodos_afetados(execucao['conciliacao'], df_agrupado, execucao['chaves'])
+            df_agrupado = mesclar_conciliacao(execucao['conciliacao'], df_agrupado, execucao['chaves'])
+            df_agrupado = compactar_memoria(df_agrupado, POLITICA_MEMORIA_CONCILIACAO, 'Conciliação (mesclada)')
+            razao = atualizar_razao(execucao['razao'], razao, execucao['chaves'])
 
-    ## definindo as colunas de valores para somar
-    colunas_soma = ['Total do Bilhete', 'Tx de Conv.', 'Comissao',
-       'Multa', 'Repasse']
+        salvar_estado(DIRETORIO_ESTADO, execucao, df_agrupado, razao)
 
-    ## agrupando por data projecao e somando os valores
-    df_somado = grupo.groupby('Data de Vencimento')[colunas_soma].sum().reset_index()
+    return df_agrupado, razao, periodos_lancamento, periodos_projecao, empresas_periodos
 
-    ## somando valores
-    total_faturamento = df_somado['Total do Bilhete'].sum() + df_somado['Multa'].sum()
-    total_taxa_conv = df_somado['Tx de Conv.'].sum()
-    total_comissao = df_somado['Comissao'].sum()
-    total_repasse = df_somado['Repasse'].sum()
+## ----- SALVAMENTO DO DF_AGRUPADO DE FORMA FRACIONADA -----
 
-    ## incluindo linhas
-    df_instrucao = pd.DataFrame([
-        {'Data de Vencimento': np.nan, 'Total do Bilhete': np.nan, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan},
-        {'Data de Vencimento': 'Implantação do faturamento (213/135):', 'Total do Bilhete': total_faturamento, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan},
-        {'Data de Vencimento': 'Implantação da taxa de conv. (213/205):', 'Total do Bilhete': total_taxa_conv, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan},
-        {'Data de Vencimento': 'Agrupar os dois títulos em um único (911107)', 'Total do Bilhete': np.nan, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan},
-        {'Data de Vencimento': 'Divisão: 01 parcela da comissão:', 'Total do Bilhete': total_comissao, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan},
-        { 'Data de Vencimento': 'Divisão: Demais parcelas serão compostas pelos valores de repasses por mês:', 'Total do Bilhete': total_repasse, 'Tx de Conv.': np.nan, 'Comissao': np.nan, 'Multa': np.nan, 'Repasse': np.nan}
-    ])
+def salvar_csv_mes(df, posicoes, caminho_arquivo_completo):
 
-    df_somado = pd.concat([df_somado, df_instrucao])
+    '''
+    Função executada nas threads de gravação: salva as linhas informadas (posições) em um CSV.
 
-    ## salvando os arquivos
-    print(f'SISTEMA: Salvando o arquivo "{nome_arquivo}"')
-    df_somado.to_csv(f'H:/Downloads/{nome_arquivo}', sep=';', decimal=',', encoding='latin-1', index=False, float_format='%.2f')
+    Retorna:
+    str: mensagem a ser exibida (registros salvos ou erro).
+    '''
 
-print(f'SISTEMA: Encerrando sistema Nexus!')
+    nome_arquivo_completo = os.path.basename(caminho_arquivo_completo)
 
+    try:
+        df.take(posicoes).to_csv(caminho_arquivo_completo, sep=';', decimal=',', index=False)
+        return f'SISTEMA: Salvo {len(posicoes)} registros para {nome_arquivo_completo}'
+    except Exception as e:
+        return f'AVISO: Erro ao salvar o arquivo {nome_arquivo_completo}: {e}'
+
+def remover_meses_vazios(nome_base_arquivo, diretorio, periodos, periodos_salvos):
+
+    '''
+    Função para remover os arquivos dos meses regravados (execução incremental) que ficaram sem registros.
+    '''
+
+    for periodo in set(periodos) - periodos_salvos:
+        if pd.isna(periodo):
+            continue
+        caminho_arquivo_completo = os.path.join(diretorio, f"{nome_base_arquivo}_{periodo.strftime('%Y_%m')}.csv")
+        if os.path.exists(caminho_arquivo_completo):
+            os.remove(caminho_arquivo_completo)
+            print(f'SISTEMA: Removido o arquivo {os.path.basename(caminho_arquivo_completo)} (mês sem registros)')
+
+def salvar_relatorios(df_agrupado, razao, periodos_lancamento=None, periodos_projecao=None):
+
+    '''
+    Função para salvar os relatórios de conciliação e de cobrança separados por mês.
+    Os meses de cada coluna de data são calculados uma única vez e os relatórios de cobrança usam
+    máscaras sobre o df_agrupado (sem cópias filtradas); os arquivos são gravados em paralelo (threads).
+
+    Parâmetros:
+    df_agrupado: DataFrame consolidado com as colunas de saldo.
+    razao: razão de saldos por transação (razao_saldos), consultado nos relatórios de cobrança.
+    periodos_lancamento: meses da data de lançamento a regravar (None = todos).
+    periodos_projecao: meses da data de projeção a regravar (None = todos).
+    Os arquivos dos meses informados que ficarem sem registros são removidos.
+    '''
+
+    ## definindo o nome geral dos arquivos
+    nome_base_arquivo_venda = 'conciliacao_geral-v'
+    nome_base_arquivo_cobranca_venda_total = 'conciliacao_geral-cobranca-v_total'
+    nome_base_arquivo_cobranca_projecao_total = 'conciliacao_geral-cobranca-p_total'
+    nome_base_arquivo_cobranca_venda_periodo = 'conciliacao_geral-cobranca-v_periodo'
+    nome_base_arquivo_cobranca_projecao_periodo = 'conciliacao_geral-cobranca-p_periodo'
+
+    ## consultando no razão as linhas com saldo != 0,00 para cobrar o cliente (apenas no período ou também no saldo total)
+    todas = np.ones(len(df_agrupado), dtype=bool)
+    cobranca_total, cobranca_periodo = linhas_em_cobranca(razao, df_agrupado)
+
+    ## coluna de data: (meses a regravar, [(linhas do relatório, nome base, diretório)])
+    relatorios = {
+        'Data de Lancamento': (periodos_lancamento, [
+            (todas, nome_base_arquivo_venda, caminho_relatorio_final_compra),
+            (cobranca_total, nome_base_arquivo_cobranca_venda_total, caminho_relatorio_final_cobranca_data_venda_total),
+            (cobranca_periodo, nome_base_arquivo_cobranca_venda_periodo, caminho_relatorio_final_cobranca_data_venda_periodo)
+        ]),
+        'Data Projecao': (periodos_projecao, [
+            (cobranca_total, nome_base_arquivo_cobranca_projecao_total, caminho_relatorio_final_cobranca_data_projecao_total),
+            (cobranca_periodo, nome_base_arquivo_cobranca_projecao_periodo, caminho_relatorio_final_cobranca_data_projecao_periodo)
+        ])
+    }
+
+    periodos_salvos = {}
+    tarefas = []
+    linhas_gravadas = 0
+
+    with medir('relatorios_csv', len(df_agrupado)) as registro, ThreadPoolExecutor(max_workers=THREADS_RELATORIOS) as executor:
+        for coluna_data, (periodos, variantes) in relatorios.items():
+
+            ## separando as linhas por mês uma única vez (ordenação estável: mantém a ordem do df_agrupado dentro do mês)
+            codigos_mes, meses = fatorar_meses(df_agrupado[coluna_data])
+            ordem = np.argsort(codigos_mes, kind='stable')
+            limites = np.searchsorted(codigos_mes[ordem], np.arange(len(meses) + 1))
+
+            for i, periodo in enumerate(meses):
+                if periodos is not None and periodo not in periodos:
+                    continue
+
+                posicoes_mes = ordem[limites[i]:limites[i + 1]]
+                ano_mes_str = periodo.strftime('%Y_%m')
+
+                for linhas, nome_base_arquivo, diretorio in variantes:
+                    posicoes = posicoes_mes[linhas[posicoes_mes]]
+                    if len(posicoes) == 0:
+                        continue
+
+                    caminho_arquivo_completo = os.path.join(diretorio, f'{nome_base_arquivo}_{ano_mes_str}.csv')
+                    tarefas.append(executor.submit(salvar_csv_mes, df_agrupado, posicoes, caminho_arquivo_completo))
+                    periodos_salvos.setdefault(nome_base_arquivo, set()).add(periodo)
+                    linhas_gravadas += len(posicoes)
+
+        for tarefa in tarefas:
+            print(tarefa.result())
+
+        registro['linhas_saida'] = linhas_gravadas
+
+    ## removendo os arquivos dos meses que ficaram sem registros
+    for periodos, variantes in relatorios.values():
+        if periodos is None:
+            continue
+        for _, nome_base_arquivo, diretorio in variantes:
+            remover_meses_vazios(nome_base_arquivo, diretorio, periodos, periodos_salvos.get(nome_base_arquivo, set()))
+
+    ## salvando a cópia em Parquet (particionada por empresa e mês) de cada relatório
+    if SAIDA_PARQUET:
+        for coluna_data, (periodos, variantes) in relatorios.items():
+            for linhas, nome_base_arquivo, _ in variantes:
+                with medir(f'relatorios_parquet.{nome_base_arquivo}', int(linhas.sum())):
+                    salvar_parquet(df_agrupado, linhas, coluna_data, os.path.join(caminho_relatorio_final_parquet, nome_base_arquivo), periodos)
+
+## ----- ETAPAS DO NEXUS -----
+
+## etapas da execução (etapas.py): entradas e saídas pelo nome; etapas independentes rodam ao mesmo tempo
+## (ex.: Totalbus e vendas da Embarca, projeção e repasses, relatórios e resumo) e a saída de cada uma fica
+## gravada para refazer a execução a partir de uma etapa (NEXUS_ETAPA_INICIAL, ex.: 'projecao' após mudar uma regra).
+## 'depende_de' lista as entradas e configurações (incremental.impressao_entradas) usadas pela etapa; as etapas sem
+## a chave dependem de todas. As etapas antes da projeção não usam regras nem calendário, então seguem válidas
+## após alterá-los (no modo incremental o escopo depende de tudo: ele compara com o estado da última execução)
+ETAPAS_NEXUS = [
+    {'nome': 'taxa_conveniencia', 'funcao': carregar_taxa_conveniencia, 'entradas': [], 'saidas': ['taxa_conveniencia'],
+     'depende_de': ['taxa_conveniencia']},
+    ## a leitura já tem o cache de ingestão, então não é gravada novamente
+    {'nome': 'ingestao', 'funcao': ler_fontes, 'entradas': [], 'saidas': ['arquivos'], 'checkpoint': False, 'depende_de': ['arquivos']},
+    {'nome': 'totalbus', 'funcao': processar_totalbus, 'entradas': ['arquivos'], 'saidas': ['df_totalbus', 'indice_vendas_totalbus'],
+     'depende_de': ['MODO_CENTAVOS']},
+    {'nome': 'embarca_vendas', 'funcao': processar_embarca_vendas, 'entradas': ['arquivos'], 'saidas': ['df_embarca_vendas'],
+     'depende_de': ['MODO_CENTAVOS']},
+    {'nome': 'embarca_repasse', 'funcao': compactar_repasses, 'entradas': ['arquivos'], 'saidas': ['lista_repasses'],
+     'depende_de': []},
+    {'nome': 'escopo', 'funcao': definir_escopo, 'entradas': ['arquivos', 'lista_repasses'], 'saidas': ['execucao', SAIDA_ENCERRAR],
+     'depende_de': None if MODO_INCREMENTAL else ['MODO_INCREMENTAL']},
+    {'nome': 'conciliacao_vendas', 'funcao': conciliar_vendas,
+     'entradas': ['df_totalbus', 'indice_vendas_totalbus', 'df_embarca_vendas', 'lista_repasses', 'taxa_conveniencia', 'execucao'],
+     'saidas': ['df_totalbus', 'indice_vendas_totalbus', 'df_embarca_vendas', 'indice_vendas', 'lista_repasses'],
+     'depende_de': ['MODO_CENTAVOS']},
+    {'nome': 'projecao', 'funcao': projetar_parcelas, 'entradas': ['df_totalbus'], 'saidas': ['projecao']},
+    {'nome': 'repasses', 'funcao': processar_repasses,
+     'entradas': ['df_embarca_vendas', 'indice_vendas_totalbus', 'lista_repasses', 'indice_vendas'], 'saidas': ['df_embarca']},
+    {'nome': 'agrupamento', 'funcao': agrupar_conciliacao, 'entradas': ['projecao', 'df_embarca'], 'saidas': ['df_agrupado']},
+    {'nome': 'saldos', 'funcao': consolidar_saldos, 'entradas': ['df_agrupado', 'execucao'],
+     'saidas': ['df_agrupado', 'razao', 'periodos_lancamento', 'periodos_projecao', 'empresas_periodos']},
+    {'nome': 'relatorios', 'funcao': salvar_relatorios,
+     'entradas': ['df_agrupado', 'razao', 'periodos_lancamento', 'periodos_projecao'], 'saidas': []},
+    {'nome': 'resumo', 'funcao': salvar_resumo, 'entradas': ['df_agrupado', 'empresas_periodos'], 'saidas': []}
+]
+
+## ----- EXECUÇÃO DO NEXUS -----
+
+def executar_nexus(etapa_inicial=ETAPA_INICIAL, etapa_final=ETAPA_FINAL):
+
+    iniciar_execucao()
+
+    ## com o perfil (cProfile) ligado as etapas rodam uma de cada vez, para todas terem o seu perfil
+    executar_etapas(
+        ETAPAS_NEXUS,
+        DIRETORIO_CHECKPOINT if CHECKPOINT_ETAPAS else None,
+        etapa_inicial or None,
+        etapa_final or None,
+        1 if PERFIL_ETAPAS else THREADS_ETAPAS,
+        impressao_entradas(FONTES_DIRETORIOS, caminho_tx_conveniencia) if CHECKPOINT_ETAPAS else None
+    )
+
+    salvar_relatorio_execucao({'etapa_inicial': etapa_inicial or None, 'etapa_final': etapa_final or None})
+
+    print(f'SISTEMA: Encerrando sistema Nexus!')
+
+if __name__ == '__main__':
+    freeze_support()
+    executar_nexus()
@@ -0,0 +1,179 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import pandas as pd
+import numpy as np
+from chaves import COLUNA_CHAVE
+from configuracoes import PAREAMENTO
+from instrumentacao import instrumentar
+
+## ----- PAREAMENTO POR CHAVE E DATA MAIS PRÓXIMA -----
+
+## substitui o pd.merge_asof(by=chave, direction='nearest', tolerance=...) dos três cruzamentos da conciliação:
+## o lado direito é indexado uma única vez (ordenado por chave e data) e cada consulta é resolvida com
+## searchsorted, sem ordenar/copiar os DataFrames. O resultado é o mesmo do merge_asof:
+##   - procura a última data <= e a primeira data >= da mesma chave, dentro da tolerância;
+##   - fica com a mais próxima e, no empate, com a anterior;
+##   - entre várias linhas da mesma chave e mesma data, usa a última (na ordem da data).
+## o pd.merge_asof original continua disponível (NEXUS_PAREAMENTO=merge_asof) como referência da verificação
+## de equivalência (equivalencia.py).
+
+def indexar_pareamento(chaves, datas):
+
+    '''
+    Função para montar o índice de pareamento do lado direito.
+
+    Parâmetros:
+    chaves: códigos inteiros da chave (chaves.COLUNA_CHAVE).
+    datas: Series de datas.
+
+    Retorna:
+    dict: ordem (posição original de cada linha indexada), chaves e datas ordenadas, datas únicas e
+          o código composto (chave, posição da data) usado nas consultas.
+    '''
+
+    chaves = np.asarray(chaves, dtype=np.int64)
+    datas = pd.to_datetime(pd.Series(datas).reset_index(drop=True))
+
+    ## ordenando pela data (o mesmo sort_values feito antes do merge_asof, desconsiderando as datas vazias)
+    ## e, de forma estável, pela chave: dentro de cada chave as linhas ficam na mesma ordem do merge_asof
+    ordem_data = datas.dropna().sort_values().index.to_numpy()
+    ordem = ordem_data[np.argsort(chaves[ordem_data], kind='stable')]
+
+    datas_ordenadas = datas.to_numpy('int64')[ordem]
+    datas_unicas, posicao_data = np.unique(datas_ordenadas, return_inverse=True)
+
+    return {
+        'ordem': ordem,
+        'chaves': chaves[ordem],
+        'datas': datas_ordenadas,
+        'datas_unicas': datas_unicas,
+        'composto': chaves[ordem] * (len(datas_unicas) + 1) + posicao_data,
+        'linhas': len(chaves)
+    }
+
+def consultar_pareamento(indice, chaves, datas, tolerancia):
+
+    '''
+    Função para localizar, para cada linha consultada, a linha do índice com a mesma chave e a data mais próxima.
+
+    Retorna:
+    np.ndarray: posição (no DataFrame indexado) da linha encontrada ou -1 quando não há correspondência.
+    '''
+
+    chaves = np.asarray(chaves, dtype=np.int64)
+    datas = pd.to_datetime(pd.Series(datas).reset_index(drop=True))
+    datas_validas = datas.notna().to_numpy()
+    valores = datas.to_numpy('int64')
+
+    resultado = np.full(len(chaves), -1, dtype=np.int64)
+    if len(indice['ordem']) == 0 or len(chaves) == 0:
+        return resultado
+
+    tolerancia = pd.Timedelta(tolerancia).value
+    base = chaves * (len(indice['datas_unicas']) + 1)
+    total = len(indice['composto'])
+
+    ## última data <= data consultada (anterior) e primeira data >= data consultada (posterior)
+    anterior = np.searchsorted(indice['composto'], base + np.searchsorted(indice['datas_unicas'], valores, 'right'), 'left') - 1
+    posterior = np.searchsorted(indice['composto'], base + np.searchsorted(indice['datas_unicas'], valores, 'left'), 'left')
+
+    anterior_seguro = np.clip(anterior, 0, total - 1)
+    posterior_seguro = np.clip(posterior, 0, total - 1)
+
+    diferenca_anterior = valores - indice['datas'][anterior_seguro]
+    diferenca_posterior = indice['datas'][posterior_seguro] - valores
+
+    tem_anterior = (anterior >= 0) & (indice['chaves'][anterior_seguro] == chaves) & (diferenca_anterior <= tolerancia) & datas_validas
+    tem_posterior = (posterior < total) & (indice['chaves'][posterior_seguro] == chaves) & (diferenca_posterior <= tolerancia) & datas_validas
+
+    usar_anterior = tem_anterior & (~tem_posterior | (diferenca_anterior <= diferenca_posterior))
+    usar_posterior = tem_posterior & ~usar_anterior
+
+    resultado[usar_anterior] = indice['ordem'][anterior_seguro[usar_anterior]]
+    resultado[usar_posterior] = indice['ordem'][posterior_seguro[usar_posterior]]
+
+    return resultado
+
+@instrumentar('pareamento', entrada='df_esquerda')
+def mesclar_mais_proximo(df_esquerda, df_direita, coluna_data_esquerda, coluna_data_direita, tolerancia,
+                         indice=None, coluna_chave=COLUNA_CHAVE, descricao=None):
+
+    '''
+    Função para trazer ao DataFrame da esquerda as colunas da linha da direita com a mesma chave
+    e a data mais próxima (dentro da tolerância), mantendo a ordem das linhas da esquerda.
+
+    Parâmetros:
+    df_esquerda / df_direita: DataFrames com a coluna da chave.
+    coluna_data_esquerda / coluna_data_direita: colunas de data comparadas.
+    tolerancia: diferença máxima entre as datas (ex.: pd.Timedelta('1 day')).
+    indice: índice já montado para o df_direita (indexar_pareamento). Caso seja None, é montado aqui.
+    coluna_chave: coluna com o código da chave nos dois DataFrames.
+    descricao: quando informada, exibe a quantidade de linhas sem correspondência.
+
+    Retorna:
+    pd.DataFrame: colunas da esquerda + colunas da direita (exceto a chave), com índice 0..n-1.
+    '''
+
+    if PAREAMENTO == 'merge_asof':
+        return mesclar_merge_asof(df_esquerda, df_direita, coluna_data_esquerda, coluna_data_direita, tolerancia, coluna_chave, descricao)
+
+    if indice is None:
+        indice = indexar_pareamento(df_direita[coluna_chave], df_direita[coluna_data_direita])
+
+    if indice['linhas'] != len(df_direita):
+        raise ValueError('O índice de pareamento não corresponde ao DataFrame da direita.')
+
+    posicoes = consultar_pareamento(indice, df_esquerda[coluna_chave], df_esquerda[coluna_data_esquerda], tolerancia)
+
+    if descricao is not None:
+        sem_correspondencia = int((posicoes < 0).sum())
+        print(f'SISTEMA: {descricao}: {len(posicoes) - sem_correspondencia} registros pareados, {sem_correspondencia} sem correspondência.')
+
+    ## posições -1 viram linhas vazias (NaN/NaT), como no merge_asof
+    df_pareado = df_direita.drop(columns=[coluna_chave]).reset_index(drop=True).reindex(posicoes).reset_index(drop=True)
+
+    return pd.concat([df_esquerda.reset_index(drop=True), df_pareado], axis=1)
+
+def mesclar_merge_asof(df_esquerda, df_direita, coluna_data_esquerda, coluna_data_direita, tolerancia,
+                       coluna_chave=COLUNA_CHAVE, descricao=None):
+
+    '''
+    Função para realizar o mesmo pareamento com o pd.merge_asof original (NEXUS_PAREAMENTO=merge_asof):
+    os dois lados são ordenados pela data a cada cruzamento. As datas vazias, que o merge_asof não aceita,
+    ficam sem correspondência (esquerda) ou fora do pareamento (direita).
+
+    Retorna:
+    pd.DataFrame: mesmo formato do mesclar_mais_proximo (ordem das linhas da esquerda, índice 0..n-1).
+    '''
+
+    df_esquerda = df_esquerda.reset_index(drop=True)
+    datas_esquerda = pd.to_datetime(df_esquerda[coluna_data_esquerda]).astype('datetime64[ns]')
+    com_data = datas_esquerda.notna()
+
+    df_direita = df_direita.assign(**{coluna_data_direita: pd.to_datetime(df_direita[coluna_data_direita]).astype('datetime64[ns]')})
+    df_direita = df_direita[df_direita[coluna_data_direita].notna()].sort_values(by=coluna_data_direita)
+    df_direita['_pareado'] = True
+
+    ## a esquerda é ordenada pela data (estável) e volta para a ordem original depois do merge_asof
+    ordem = datas_esquerda[com_data].sort_values(kind='stable').index
+
+    df_pareado = pd.merge_asof(
+        df_esquerda.loc[ordem].assign(**{coluna_data_esquerda: datas_esquerda[ordem]}),
+        df_direita,
+        left_on=coluna_data_esquerda,
+        right_on=coluna_data_direita,
+        by=coluna_chave,
+        direction='nearest',
+        tolerance=tolerancia
+    ).set_axis(ordem)
+
+    if not com_data.all():
+        df_pareado = pd.concat([df_pareado, df_esquerda[~com_data]])
+
+    df_pareado = df_pareado.sort_index().reset_index(drop=True)
+    pareados = df_pareado.pop('_pareado').notna()
+
+    if descricao is not None:
+        print(f'SISTEMA: {descricao}: {int(pareados.sum())} registros pareados, {int((~pareados).sum())} sem correspondência.')
+
+    return df_pareado
@@ -3,108 +3,106 @@
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+from chaves import codigos_grupo, contagem_por_grupo
+from calendario import proximo_dia_util
+from regras import tabela_decisao, avaliar_tabela, valores_por_regra, resultado_regras
+from configuracoes import MODO_CENTAVOS, REGRAS_PROJECAO, PROJECAO
+from dinheiro import para_centavos, de_centavos, arredondar_centavos, dividir_em_parcelas
+from valores_parcelas import COLUNAS_VALORES, calcular_valores
+from datas import interpretar_datas
+from instrumentacao import instrumentar
 
 ## ----- PROJEÇÕES -----
 
-def processando_projecao(df_totalbus):
-
-    print(f'SISTEMA: Iniciando processo de projeção das parcelas...')
-    df_projetado = df_totalbus.loc[df_totalbus.index.repeat(df_totalbus['parcelas'])].reset_index(drop=True)
-    df_projetado['PARCELA_ATUAL'] = df_projetado.groupby(['EMPRESA', 'DATA HORA VENDA', 'ID TRANSACAO ORIGINAL', 'STATUS BILHETE']).cumcount() + 1
-
-    ## tratando colunas
-    df_projetado['Metodo de pagamento'] = df_projetado['Metodo de pagamento'].fillna(df_projetado['FORMA PAGAMENTO 1'])
-    df_projetado['Data de Lancamento'] = df_projetado['DATA HORA VENDA']
-    df_projetado['Observacao'] = pd.NaT
-    df_projetado['Seguro_Parcela'] = 0
-
-    ## definindo como maiusculo
-
-    df_projetado['FORMA PAGAMENTO 1'] = df_projetado['FORMA PAGAMENTO 1'].astype(str).str.upper()
-    df_projetado['Metodo de pagamento'] = df_projetado['Metodo de pagamento'].astype(str).str.upper()
-    df_projetado['STATUS BILHETE'] = df_projetado['STATUS BILHETE'].astype(str).str.upper()
-
-    ## definindo condições, resultados e projeções das parcelas
-    df_projetado['DATA HORA VENDA'] = pd.to_datetime(df_projetado['DATA HORA VENDA'], errors='coerce')
-    df_projetado['DATA HORA VENDA PARA CANC.'] = pd.to_datetime(df_projetado['DATA HORA VENDA PARA CANC.'], errors='coerce')
-    df_projetado['Data da Venda'] = pd.to_datetime(df_projetado['Data da Venda'], errors='coerce')
+## a projeção é montada em duas tabelas, sem repetir todas as colunas do bilhete em cada parcela:
+##   - bilhetes: uma linha por bilhete do Totalbus, com os atributos e os valores por parcela
+##   - parcelas: uma linha por parcela, apenas com a posição do bilhete, a parcela atual, a data da
+##     projeção e o repasse da parcela (que inclui a multa na primeira parcela dos cancelados); no modo
+##     centavos, também os valores divididos por parcela (COLUNAS_DIVISAO_CENTAVOS)
+## as linhas completas (bilhete x parcela) são materializadas apenas no final (materializar_projecao),
+## somente com as colunas pedidas.
+## com NEXUS_PROJECAO=expandida (referência da verificação de equivalência) o bilhete é repetido por parcela
+## antes dos cálculos, como no código original: a tabela de bilhetes já tem uma linha por parcela
+
+## colunas que variam por parcela (as demais são do bilhete)
+COLUNAS_PARCELA = ['PARCELA_ATUAL', 'DATA_PROJECAO', 'TOTAL_REPASSE_PARCELA']
+
+## modo centavos: valores divididos por parcela em centavos inteiros (coluna da parcela: coluna do bilhete).
+## os demais valores da parcela são somas/diferenças destes, então todas as parcelas somam exatamente o bilhete
+COLUNAS_DIVISAO_CENTAVOS = {
+    'TARIFA_PARCELA': 'TARIFA',
+    'PEDAGIO_PARCELA': 'PEDAGIO',
+    'TAXA_EMB_PARCELA': 'TAXA_EMB',
+    'TAXA_CONV_PARCELA': 'TAXA_CONV',
+    'COMISSAO_PARCELA': 'COMISSAO',
+    'TOTAL_BILHETE_PARCELA': 'TOTAL DO BILHETE'
+}
+
+## ----- REGRAS FIXAS (REFERÊNCIA) -----
+
+## condições originais do código, usadas no lugar das tabelas de decisão quando NEXUS_REGRAS_PROJECAO=fixas
+## (referência da verificação de equivalência)
+
+def data_base_regras_fixas(df_bilhetes):
+
+    '''
+    Retorna:
+    tuple: (data base de cada bilhete, True quando a projeção avança 30 dias por parcela).
+    '''
+
+    pagamento_cartao = df_bilhetes['Metodo de pagamento'].isin(['CRÉDITO', 'CREDIT_CARD', 'VOUCHER'])
+    pagamento_pix = df_bilhetes['Metodo de pagamento'] == 'PIX'
+    cancelado = df_bilhetes['STATUS BILHETE'] == 'C'
+    vendido = df_bilhetes['STATUS BILHETE'] == 'V'
 
     condicoes_projecao_data = [
 
         ## se for pix cancelado no mês diferente ao da venda
-        (df_projetado['STATUS BILHETE'] == 'C') &
-        (df_projetado['Cancelamento_Mesmo_Mes'] == 0) &
-        (df_projetado['Metodo de pagamento'] == 'PIX'),
+        cancelado & (df_bilhetes['Cancelamento_Mesmo_Mes'] == 0) & pagamento_pix,
 
         ## se for cartao cancelado no mês diferente ao da venda
-        (df_projetado['STATUS BILHETE'] == 'C') &
-        (df_projetado['Cancelamento_Mesmo_Mes'] == 0) &
-        (
-            (df_projetado['Metodo de pagamento'] == 'CRÉDITO') |
-            (df_projetado['Me' \
-            'todo de pagamento'] == 'CREDIT_CARD') |
-            (df_projetado['Metodo de pagamento'] == 'VOUCHER')
-        ),
+        cancelado & (df_bilhetes['Cancelamento_Mesmo_Mes'] == 0) & pagamento_cartao,
 
         ## se for pix cancelado no mesmo mês da venda
-        (df_projetado['STATUS BILHETE'] == 'C') &
-        (df_projetado['Cancelamento_Mesmo_Mes'] == 1) &
-        (df_projetado['Metodo de pagamento'] == 'PIX'),
+        cancelado & (df_bilhetes['Cancelamento_Mesmo_Mes'] == 1) & pagamento_pix,
 
         ## se for cartão cancelado no mesmo mês da venda
-        (df_projetado['STATUS BILHETE'] == 'C') &
-        (df_projetado['Cancelamento_Mesmo_Mes'] == 1) &
-        (
-            (df_projetado['Metodo de pagamento'] == 'CRÉDITO') |
-            (df_projetado['Metodo de pagamento'] == 'CREDIT_CARD') |
-            (df_projetado['Metodo de pagamento'] == 'VOUCHER')
-        ),
+        cancelado & (df_bilhetes['Cancelamento_Mesmo_Mes'] == 1) & pagamento_cartao,
 
         ## se for venda pix
-        (df_projetado['STATUS BILHETE'] == 'V') &
-        (df_projetado['Metodo de pagamento'] == 'PIX'),
+        vendido & pagamento_pix,
 
         ## se for venda cartão
-        (df_projetado['STATUS BILHETE'] == 'V') &
-        (
-            (df_projetado['Metodo de pagamento'] == 'CREDIT_CARD') |
-            (df_projetado['Metodo de pagamento'] == 'CRÉDITO') |
-            (df_projetado['Metodo de pagamento'] == 'VOUCHER')
-        )
+        vendido & pagamento_cartao
     ]
 
-    resultado_projecao_data = [
-        df_projetado['DATA HORA VENDA'] + timedelta(days=1),
-        df_projetado['DATA HORA VENDA'] + (timedelta(days=30) * df_projetado['PARCELA_ATUAL']) + timedelta(days=1),
-        df_projetado['DATA HORA VENDA PARA CANC.'] + timedelta(days=1),
-        df_projetado['DATA HORA VENDA PARA CANC.'] + (timedelta(days=30) * df_projetado['PARCELA_ATUAL']) + timedelta(days=1),
-        df_projetado['DATA HORA VENDA PARA CANC.'] + timedelta(days=1),
-        df_projetado['DATA HORA VENDA PARA CANC.'] + (timedelta(days=30) * df_projetado['PARCELA_ATUAL']) + timedelta(days=1)
+    resultado_data_base = [
+        df_bilhetes['DATA HORA VENDA'],
+        df_bilhetes['DATA HORA VENDA'],
+        df_bilhetes['DATA HORA VENDA PARA CANC.'],
+        df_bilhetes['DATA HORA VENDA PARA CANC.'],
+        df_bilhetes['DATA HORA VENDA PARA CANC.'],
+        df_bilhetes['DATA HORA VENDA PARA CANC.']
     ]
 
-    df_projetado['DATA_PROJECAO'] = np.select(condicoes_projecao_data, resultado_projecao_data, pd.NaT)
-    df_projetado['DATA_PROJECAO'] = pd.to_datetime(df_projetado['DATA_PROJECAO'], errors='coerce')
+    resultado_mensal = [False, True, False, True, False, True]
 
-    ## ajustando data da projecao para dia de semana
-    condicoes_semana = [
-        df_projetado['DATA_PROJECAO'].dt.dayofweek == 5,
-        df_projetado['DATA_PROJECAO'].dt.dayofweek == 6
-    ]
+    data_base = pd.to_datetime(pd.Series(np.select(condicoes_projecao_data, resultado_data_base, pd.NaT)), errors='coerce')
+    projecao_mensal = np.select(condicoes_projecao_data, resultado_mensal, False)
 
-    resultado_semana = [
-        df_projetado['DATA_PROJECAO'] + timedelta(days=2),
-        df_projetado['DATA_PROJECAO'] + timedelta(days=1)
-    ]
+    return data_base, projecao_mensal
 
-    df_projetado['DATA_PROJECAO'] = np.select(condicoes_semana, resultado_semana, df_projetado['DATA_PROJECAO'])
-    df_projetado['DATA_PROJECAO'] = pd.to_datetime(df_projetado['DATA_PROJECAO'], errors='coerce')
+def comissao_regras_fixas(df_bilhetes):
 
+    '''
+    Retorna:
+    tuple: (canal de venda, percentual de comissão) de cada bilhete pela agência original.
+    '''
 
-    ## definindo comissao
     condicoes_comissao = [
-        df_projetado['AGENCIA ORIGINAL'] == '999-50',
-        df_projetado['AGENCIA ORIGINAL'] == '999-51',
-        df_projetado['AGENCIA ORIGINAL'] == '999-52'
+        df_bilhetes['AGENCIA ORIGINAL'] == '999-50',
+        df_bilhetes['AGENCIA ORIGINAL'] == '999-51',
+        df_bilhetes['AGENCIA ORIGINAL'] == '999-52'
     ]
 
     resultado_comissao_canal = [
@@ -119,37 +117,166 @@ def processando_projecao(df_totalbus):
         0.05
     ]
 
-    df_projetado['CANAL_VENDA'] = np.select(condicoes_comissao, resultado_comissao_canal, pd.NaT)
-    df_projetado['PERCENTUAL_COMISSAO'] = np.select(condicoes_comissao, resultado_comissao_percentual, 0)
-
-
-    ## definindo valores
-    df_projetado['TAXAS'] = df_projetado['PEDAGIO'] + df_projetado['TAXA_EMB']
-    df_projetado['TAXA_CONV'] = df_projetado['TOTAL DO BILHETE'] * df_projetado['% Tx Conv']
-    df_projetado['TOTAL_VENDA'] = df_projetado['TOTAL DO BILHETE'] + df_projetado['TAXA_CONV']
-    df_projetado['COMISSAO'] = df_projetado['TOTAL_VENDA'] * df_projetado['PERCENTUAL_COMISSAO']
-    df_projetado['TOTAL_REPASSE'] = df_projetado['TOTAL_VENDA'] - df_projetado['COMISSAO']
-    df_projetado['TARIFA_PARCELA'] = df_projetado['TARIFA'] / df_projetado['parcelas']
-    df_projetado['PEDAGIO_PARCELA'] = df_projetado['PEDAGIO'] / df_projetado['parcelas']
-    df_projetado['TAXA_EMB_PARCELA'] = df_projetado['TAXA_EMB'] / df_projetado['parcelas']
-    df_projetado['TAXA_CONV_PARCELA'] = df_projetado['TAXA_CONV'] / df_projetado['parcelas']
-    df_projetado['TAXAS_PARCELA'] = df_projetado['TAXAS'] / df_projetado['parcelas']
-    df_projetado['COMISSAO_PARCELA'] = df_projetado['COMISSAO'] / df_projetado['parcelas']
-    df_projetado['TOTAL_BILHETE_PARCELA'] = df_projetado['TOTAL DO BILHETE'] / df_projetado['parcelas']
-    df_projetado['TOTAL_VENDA_PARCELA'] = df_projetado['TOTAL_VENDA'] / df_projetado['parcelas']
-    df_projetado['TOTAL_REPASSE_PARCELA'] = df_projetado['TOTAL_REPASSE'] / df_projetado['parcelas']
-
-    ## considerando valor da multa nos repasses dos cancelados
-    condicao_multa = [
-        (df_projetado['STATUS BILHETE'] == 'C') &
-        (df_projetado['PARCELA_ATUAL'] == 1)
-    ]
+    return np.select(condicoes_comissao, resultado_comissao_canal, pd.NaT), np.select(condicoes_comissao, resultado_comissao_percentual, 0)
 
-    resultado_multa = [
-        df_projetado['TOTAL_REPASSE_PARCELA'] + df_projetado['VALOR MULTA']
-    ]
+def parcelas_compactas(df_totalbus):
+
+    '''
+    Retorna:
+    tuple: (bilhetes: uma linha por bilhete, parcelas: posição do bilhete e parcela atual,
+            número da parcela dentro do bilhete (0..parcelas-1)).
+    '''
+
+    df_bilhetes = df_totalbus.reset_index(drop=True)
+
+    ## gerando as parcelas: posição do bilhete repetida "parcelas" vezes
+    quantidade_parcelas = df_bilhetes['parcelas'].to_numpy().astype(np.int64)
+    posicao_bilhete = np.repeat(np.arange(len(df_bilhetes)), quantidade_parcelas)
+    inicio_bilhete = np.cumsum(quantidade_parcelas) - quantidade_parcelas
+    numero_parcela = np.arange(len(posicao_bilhete)) - inicio_bilhete[posicao_bilhete]
+
+    ## a parcela atual continua a contagem entre bilhetes com a mesma empresa, venda, transação e status
+    ## (equivalente ao cumcount sobre as linhas repetidas)
+    codigo_parcela = codigos_grupo(df_bilhetes, ['EMPRESA', 'DATA HORA VENDA', 'ID TRANSACAO ORIGINAL', 'STATUS BILHETE'])
+    parcelas_anteriores = pd.Series(quantidade_parcelas).groupby(codigo_parcela).cumsum().to_numpy() - quantidade_parcelas
+    parcelas_anteriores = np.where(codigo_parcela >= 0, parcelas_anteriores, np.nan)
+
+    df_parcelas = pd.DataFrame({'bilhete': posicao_bilhete})
+    df_parcelas['PARCELA_ATUAL'] = parcelas_anteriores[posicao_bilhete] + numero_parcela + 1
+
+    return df_bilhetes, df_parcelas, numero_parcela
+
+def parcelas_expandidas(df_totalbus):
+
+    '''
+    Função com a expansão original (uma linha completa por parcela), usada quando NEXUS_PROJECAO=expandida.
+
+    Retorna:
+    tuple: mesmo formato do parcelas_compactas, com um "bilhete" por parcela.
+    '''
+
+    indice_repetido = df_totalbus.index.repeat(df_totalbus['parcelas'])
+    df_bilhetes = df_totalbus.loc[indice_repetido].reset_index(drop=True)
+
+    df_parcelas = pd.DataFrame({'bilhete': np.arange(len(df_bilhetes))})
+    df_parcelas['PARCELA_ATUAL'] = df_bilhetes.groupby(['EMPRESA', 'DATA HORA VENDA', 'ID TRANSACAO ORIGINAL', 'STATUS BILHETE']).cumcount() + 1
+
+    ## número da parcela dentro do bilhete de origem (divisão em centavos)
+    numero_parcela = pd.Series(indice_repetido).groupby(indice_repetido).cumcount().to_numpy()
+
+    return df_bilhetes, df_parcelas, numero_parcela
+
+@instrumentar('projecao', entrada='df_totalbus', saida='parcelas')
+def projetar_parcelas(df_totalbus):
 
-    df_projetado['TOTAL_REPASSE_PARCELA'] = np.select(condicao_multa, resultado_multa, df_projetado['TOTAL_REPASSE_PARCELA'])
+    '''
+    Função para calcular a projeção das parcelas do Totalbus em formato compacto.
+
+    Parâmetros:
+    df_totalbus: DataFrame do Totalbus já pareado com as vendas da Embarca (coluna "parcelas" preenchida).
+
+    Retorna:
+    dict: bilhetes (DataFrame por bilhete), parcelas (DataFrame por parcela, com a coluna "bilhete"
+          indicando a posição do bilhete) e colunas (ordem das colunas da projeção completa).
+    '''
+
+    print(f'SISTEMA: Iniciando processo de projeção das parcelas...')
+
+    if PROJECAO == 'expandida':
+        df_bilhetes, df_parcelas, numero_parcela = parcelas_expandidas(df_totalbus)
+    else:
+        df_bilhetes, df_parcelas, numero_parcela = parcelas_compactas(df_totalbus)
+
+    quantidade_parcelas = df_bilhetes['parcelas'].to_numpy().astype(np.int64)
+    posicao_bilhete = df_parcelas['bilhete'].to_numpy()
+
+    ## tratando colunas
+    df_bilhetes['Metodo de pagamento'] = df_bilhetes['Metodo de pagamento'].fillna(df_bilhetes['FORMA PAGAMENTO 1'])
+    df_bilhetes['Data de Lancamento'] = df_bilhetes['DATA HORA VENDA']
+    df_bilhetes['Observacao'] = pd.NaT
+    df_bilhetes['Seguro_Parcela'] = 0
+
+    ## definindo como maiusculo
+
+    df_bilhetes['FORMA PAGAMENTO 1'] = df_bilhetes['FORMA PAGAMENTO 1'].astype(str).str.upper()
+    df_bilhetes['Metodo de pagamento'] = df_bilhetes['Metodo de pagamento'].astype(str).str.upper()
+    df_bilhetes['STATUS BILHETE'] = df_bilhetes['STATUS BILHETE'].astype(str).str.upper()
+
+    ## definindo condições, resultados e projeções das parcelas
+    for coluna in ['DATA HORA VENDA', 'DATA HORA VENDA PARA CANC.', 'Data da Venda']:
+        df_bilhetes[coluna] = interpretar_datas(df_bilhetes[coluna])
+
+    ## data base de cada bilhete e se a projeção avança 30 dias por parcela (cartão) ou não (pix),
+    ## conforme a tabela de decisão (status, cancelamento no mesmo mês e método de pagamento)
+    if REGRAS_PROJECAO == 'fixas':
+        data_base, projecao_mensal = data_base_regras_fixas(df_bilhetes)
+    else:
+        tabela_data = tabela_decisao('totalbus_data_projecao')
+        regra_data = avaliar_tabela(df_bilhetes, tabela_data)
+
+        data_base = interpretar_datas(valores_por_regra(df_bilhetes, tabela_data, regra_data, 'data'))
+        projecao_mensal = resultado_regras(tabela_data, regra_data, 'mensal', False).astype(bool)
+
+    data_projecao = data_base.take(posicao_bilhete).reset_index(drop=True) + timedelta(days=1)
+    dias_parcela = np.where(projecao_mensal[posicao_bilhete], df_parcelas['PARCELA_ATUAL'] * 30, 0)
+    data_projecao = data_projecao + pd.to_timedelta(dias_parcela, unit='D')
+
+    ## ajustando data da projecao para dia útil (fins de semana e feriados)
+    df_parcelas['DATA_PROJECAO'] = proximo_dia_util(data_projecao).to_numpy()
+
+
+    ## definindo comissao (canal e percentual pela agência original)
+    if REGRAS_PROJECAO == 'fixas':
+        df_bilhetes['CANAL_VENDA'], df_bilhetes['PERCENTUAL_COMISSAO'] = comissao_regras_fixas(df_bilhetes)
+    else:
+        tabela_comissao = tabela_decisao('totalbus_comissao')
+        regra_comissao = avaliar_tabela(df_bilhetes, tabela_comissao)
+
+        df_bilhetes['CANAL_VENDA'] = resultado_regras(tabela_comissao, regra_comissao, 'canal', pd.NaT)
+        df_bilhetes['PERCENTUAL_COMISSAO'] = resultado_regras(tabela_comissao, regra_comissao, 'percentual', 0)
+
+
+    ## definindo valores (bilhete e por parcela) em uma única passagem, sem colunas intermediárias
+    valores = calcular_valores(df_bilhetes)
+    for coluna, linha in zip(COLUNAS_VALORES, valores):
+        df_bilhetes[coluna] = linha
+
+    ## modo centavos: taxa de conveniência e comissão arredondadas para o centavo no bilhete e valores das
+    ## parcelas calculados em centavos (o resto da divisão vai, um centavo por parcela, para as primeiras)
+    if MODO_CENTAVOS:
+        df_bilhetes['TAXA_CONV'] = arredondar_centavos(df_bilhetes['TAXA_CONV'])
+        df_bilhetes['TOTAL_VENDA'] = arredondar_centavos(df_bilhetes['TOTAL DO BILHETE'] + df_bilhetes['TAXA_CONV'])
+        df_bilhetes['COMISSAO'] = arredondar_centavos(df_bilhetes['COMISSAO'])
+        df_bilhetes['TOTAL_REPASSE'] = arredondar_centavos(df_bilhetes['TOTAL_VENDA'] - df_bilhetes['COMISSAO'])
+
+        parcelas_bilhete = quantidade_parcelas[posicao_bilhete]
+        centavos = {
+            coluna_parcela: dividir_em_parcelas(para_centavos(df_bilhetes[coluna_bilhete].to_numpy()[posicao_bilhete]), parcelas_bilhete, numero_parcela)
+            for coluna_parcela, coluna_bilhete in COLUNAS_DIVISAO_CENTAVOS.items()
+        }
+        centavos['TAXAS_PARCELA'] = centavos['PEDAGIO_PARCELA'] + centavos['TAXA_EMB_PARCELA']
+        centavos['TOTAL_VENDA_PARCELA'] = centavos['TOTAL_BILHETE_PARCELA'] + centavos['TAXA_CONV_PARCELA']
+        centavos['TOTAL_REPASSE_PARCELA'] = centavos['TOTAL_VENDA_PARCELA'] - centavos['COMISSAO_PARCELA']
+
+        for coluna, valores_centavos in centavos.items():
+            df_parcelas[coluna] = de_centavos(valores_centavos).to_numpy()
+
+    ## considerando valor da multa nos repasses dos cancelados (somada apenas na primeira parcela)
+    if MODO_CENTAVOS:
+        repasse_parcela = df_parcelas['TOTAL_REPASSE_PARCELA'].to_numpy(dtype=np.float64, copy=True)
+    else:
+        repasse_parcela = valores[COLUNAS_VALORES.index('TOTAL_REPASSE_PARCELA')].take(posicao_bilhete)
+
+    parcelas_multa = np.flatnonzero(
+        (df_bilhetes['STATUS BILHETE'] == 'C').to_numpy()[posicao_bilhete] &
+        (df_parcelas['PARCELA_ATUAL'] == 1).to_numpy()
+    )
+    repasse_parcela[parcelas_multa] += df_bilhetes['VALOR MULTA'].to_numpy(dtype=np.float64)[posicao_bilhete[parcelas_multa]]
+
+    df_parcelas['TOTAL_REPASSE_PARCELA'] = repasse_parcela
+
+    if MODO_CENTAVOS:
+        df_parcelas['TOTAL_REPASSE_PARCELA'] = arredondar_centavos(df_parcelas['TOTAL_REPASSE_PARCELA']).to_numpy()
 
     ## definindo tipos das colunas
     tipo_colunas = {
@@ -160,7 +287,6 @@ def processando_projecao(df_totalbus):
         'TARIFA': float,
         'PEDAGIO': float,
         'TAXA_EMB': float,
-        'TAXAS': float,
         'TOTAL DO BILHETE': float,
         'FORMA PAGAMENTO 1': str,
         'AGENCIA ORIGINAL': str,
@@ -168,26 +294,58 @@ def processando_projecao(df_totalbus):
         'NOME PASSAGEIRO': str,
         'NOME_EMPRESA': str,
         '% Tx Conv': float,
-        'parcelas': int,
-        'PARCELA_ATUAL': int,
-        'TAXA_CONV': float,
-        'TOTAL_VENDA': float,
-        'COMISSAO': float,
-        'TOTAL_REPASSE': float,
-        'TARIFA_PARCELA': float,
-        'PEDAGIO_PARCELA': float,
-        'TAXA_EMB_PARCELA': float,
-        'TAXAS_PARCELA': float,
-        'TAXA_CONV_PARCELA': float,
-        'COMISSAO_PARCELA': float,
-        'TOTAL_BILHETE_PARCELA': float,
-        'TOTAL_VENDA_PARCELA': float,
-        'TOTAL_REPASSE_PARCELA': float
+        'parcelas': int
     }
 
-    df_projetado = df_projetado.astype(tipo_colunas)
+    df_bilhetes = df_bilhetes.astype(tipo_colunas)
+    df_parcelas = df_parcelas.astype({'PARCELA_ATUAL': int, 'TOTAL_REPASSE_PARCELA': float})
 
     ## excluindo colunas
-    df_projetado.drop(columns=['Cancelamento_Mesmo_Mes'], inplace=True)
+    df_bilhetes.drop(columns=['Cancelamento_Mesmo_Mes', 'TOTAL_REPASSE_PARCELA'], inplace=True)
+
+    ## ordem das colunas da projeção completa (mesma ordem de criação das colunas)
+    ## PARCELA_ATUAL logo depois da última coluna do Totalbus recebido (desconsiderando as excluídas)
+    colunas = list(df_bilhetes.columns)
+    ultima_coluna_totalbus = [coluna for coluna in df_totalbus.columns if coluna in colunas][-1]
+    colunas.insert(colunas.index(ultima_coluna_totalbus) + 1, 'PARCELA_ATUAL')
+    colunas.insert(colunas.index('CANAL_VENDA'), 'DATA_PROJECAO')
+    colunas.append('TOTAL_REPASSE_PARCELA')
+
+    ## valores calculados por parcela (modo centavos) deixam de ser colunas do bilhete
+    df_bilhetes = df_bilhetes.drop(columns=[c for c in df_parcelas.columns if c in df_bilhetes.columns])
+
+    return {'bilhetes': df_bilhetes, 'parcelas': df_parcelas, 'colunas': colunas}
+
+@instrumentar('materializacao_projecao')
+def materializar_projecao(projecao, colunas=None):
+
+    '''
+    Função para montar as linhas completas (uma por parcela) da projeção compacta.
+
+    Parâmetros:
+    projecao: resultado do projetar_parcelas.
+    colunas: colunas a materializar (None = todas). Colunas do bilhete que não forem pedidas não são copiadas.
+
+    Retorna:
+    pd.DataFrame: uma linha por parcela, com índice 0..n-1.
+    '''
+
+    colunas = projecao['colunas'] if colunas is None else [c for c in projecao['colunas'] if c in colunas]
+    colunas_parcela = [c for c in projecao['parcelas'].columns if c != 'bilhete']
+    colunas_bilhete = [c for c in colunas if c not in colunas_parcela]
+
+    df_projetado = projecao['bilhetes'][colunas_bilhete].take(projecao['parcelas']['bilhete']).reset_index(drop=True)
+
+    for coluna in colunas_parcela:
+        if coluna in colunas:
+            df_projetado[coluna] = projecao['parcelas'][coluna].to_numpy()
+
+    return df_projetado[colunas]
+
+def processando_projecao(df_totalbus):
+
+    '''
+    Função para projetar as parcelas do Totalbus com todas as colunas (uma linha por parcela).
+    '''
 
-    return df_projetado
+    return materializar_projecao(projetar_parcelas(df_totalbus))
@@ -0,0 +1,95 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import pandas as pd
+import numpy as np
+from incremental import normalizar_chaves
+from configuracoes import MODO_CENTAVOS, CALCULO_SALDOS
+from dinheiro import para_centavos
+
+## ----- RAZÃO DE SALDOS POR TRANSAÇÃO -----
+
+## uma linha por (Nome da Empresa, ID Transacao, Data Projecao) com:
+##   'Saldo': soma do 'Total do Repasse_Parcela' da transação na data de projeção
+##   'Saldo_Total': soma do 'Total do Repasse_Parcela' da transação em todas as datas
+## na execução completa o razão é montado a partir dos saldos já calculados (calcular_saldos, via transform);
+## na execução incremental é gravado no estado e apenas as transações reprocessadas são substituídas.
+## os filtros de cobrança (saldo != 0,00) são consultas ao razão (com NEXUS_CALCULO_SALDOS=merge, referência da
+## verificação de equivalência, são filtros nas colunas de saldo do df_agrupado, como no código original).
+
+COLUNAS_RAZAO = ['Nome da Empresa', 'ID Transacao', 'Data Projecao']
+COLUNAS_SALDO = ['Saldo', 'Saldo_Total']
+
+## diferença mínima (em reais) para a transação ser cobrada
+SALDO_MINIMO_COBRANCA = 0.01
+
+def montar_razao(df_agrupado):
+
+    '''
+    Função para montar o razão a partir do DataFrame consolidado com as colunas de saldo.
+
+    Retorna:
+    pd.DataFrame: colunas COLUNAS_RAZAO + COLUNAS_SALDO, uma linha por chave (sem chaves vazias).
+    '''
+
+    razao = df_agrupado[COLUNAS_RAZAO + COLUNAS_SALDO].drop_duplicates(subset=COLUNAS_RAZAO)
+
+    ## linhas com alguma chave vazia não têm saldo (assim como no groupby)
+    razao = razao[razao[COLUNAS_RAZAO].notna().all(axis=1)]
+
+    return razao.reset_index(drop=True)
+
+def atualizar_razao(razao_anterior, razao_novo, chaves):
+
+    '''
+    Função para substituir, no razão da última execução, os saldos das transações reprocessadas.
+
+    Parâmetros:
+    razao_anterior: razão salvo no estado incremental.
+    razao_novo: razão montado apenas com as transações reprocessadas.
+    chaves: pd.MultiIndex (Nome da Empresa, ID Transacao) das transações reprocessadas.
+    '''
+
+    mantidos = ~normalizar_chaves(razao_anterior['Nome da Empresa'], razao_anterior['ID Transacao']).isin(chaves)
+
+    return pd.concat([razao_anterior[mantidos], razao_novo], ignore_index=True)
+
+def saldo_diferente_de_zero(saldo):
+
+    '''
+    Retorna:
+    np.ndarray: máscara dos saldos diferentes de zero (no modo centavos, comparação exata em centavos).
+    '''
+
+    if MODO_CENTAVOS:
+        return (para_centavos(saldo) != 0).fillna(False).to_numpy(dtype=bool)
+
+    return (saldo.abs() >= SALDO_MINIMO_COBRANCA).to_numpy()
+
+def linhas_em_cobranca(razao, df_agrupado):
+
+    '''
+    Função para consultar no razão quais linhas do DataFrame consolidado estão em cobrança.
+
+    Retorna:
+    tuple: máscaras booleanas (cobrança total, cobrança do período) alinhadas às linhas do df_agrupado:
+           - período: saldo da transação na data de projeção diferente de zero;
+           - total: saldo no período e saldo total da transação diferentes de zero.
+    '''
+
+    if CALCULO_SALDOS == 'merge':
+        cobranca_periodo = saldo_diferente_de_zero(df_agrupado['Saldo'])
+        return cobranca_periodo & saldo_diferente_de_zero(df_agrupado['Saldo_Total']), cobranca_periodo
+
+    cobranca_periodo = saldo_diferente_de_zero(razao['Saldo'])
+    cobranca_total = cobranca_periodo & saldo_diferente_de_zero(razao['Saldo_Total'])
+
+    ## localizando a linha do razão de cada linha do df_agrupado (-1 quando a chave não está no razão)
+    posicoes = pd.MultiIndex.from_frame(razao[COLUNAS_RAZAO]).get_indexer(pd.MultiIndex.from_frame(df_agrupado[COLUNAS_RAZAO]))
+    localizadas = posicoes >= 0
+
+    mascara_total = np.zeros(len(df_agrupado), dtype=bool)
+    mascara_periodo = np.zeros(len(df_agrupado), dtype=bool)
+    mascara_total[localizadas] = cobranca_total[posicoes[localizadas]]
+    mascara_periodo[localizadas] = cobranca_periodo[posicoes[localizadas]]
+
+    return mascara_total, mascara_periodo
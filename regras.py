@@ -0,0 +1,150 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import json
+from functools import lru_cache
+from itertools import product
+import numpy as np
+import pandas as pd
+from configuracoes import ARQUIVO_REGRAS
+
+## ----- TABELAS DE DECISÃO -----
+
+## as regras de negócio das projeções (data base, parcelas, comissão) ficam no arquivo de regras
+## (NEXUS_ARQUIVO_REGRAS, padrão regras_projecao.json). Cada tabela tem:
+##   'entradas': {coluna: {classe: {'valores': [...]} | {'a_partir_de': data, 'antes_de': data}}}
+##               (nas datas, 'a_partir_de' e 'antes_de' podem ser usados sozinhos ou juntos, como vigência)
+##   'regras': [{'quando': {coluna: classe}, 'entao': {campo: valor}}], avaliadas em ordem (vale a primeira)
+## colunas ausentes no 'quando' aceitam qualquer valor. Linhas sem regra correspondente ficam com o padrão.
+##
+## cada coluna de entrada é codificada uma única vez em um código pequeno (a classe da linha), os códigos
+## são combinados em um índice único e a regra de cada combinação é consultada em uma tabela pré-compilada
+
+@lru_cache(maxsize=None)
+def carregar_regras(caminho=ARQUIVO_REGRAS):
+
+    '''
+    Retorna:
+    dict: tabelas de decisão do arquivo de regras.
+    '''
+
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+def tabela_decisao(nome, caminho=ARQUIVO_REGRAS):
+
+    try:
+        return carregar_regras(caminho)[nome]
+    except KeyError:
+        raise KeyError(f'Tabela de decisão "{nome}" não encontrada no arquivo de regras ({caminho}).')
+
+def codificar_entrada(serie, classes):
+
+    '''
+    Função para codificar uma coluna de entrada na classe de cada linha (posição da classe em "classes").
+    Valores que não pertencem a nenhuma classe (inclusive vazios) recebem len(classes).
+    '''
+
+    sem_classe = len(classes)
+    codigo = np.full(len(serie), sem_classe, dtype=np.int64)
+
+    ## classes por valor: a classe é definida por valor distinto e depois propagada às linhas
+    if all('valores' in definicao for definicao in classes.values()):
+        codigos_valor, valores = pd.factorize(serie)
+        classe_valor = np.full(len(valores) + 1, sem_classe, dtype=np.int64)
+
+        for i, definicao in reversed(list(enumerate(classes.values()))):
+            classe_valor[:-1][pd.Index(valores).isin(definicao['valores'])] = i
+
+        return classe_valor[codigos_valor]
+
+    ## classes por data: comparação direta com a data limite
+    datas = pd.to_datetime(serie, errors='coerce')
+    for i, definicao in reversed(list(enumerate(classes.values()))):
+        if 'a_partir_de' in definicao or 'antes_de' in definicao:
+            ## vigência: 'a_partir_de' e/ou 'antes_de' (as duas juntas definem um intervalo)
+            filtro = datas.notna()
+            if 'a_partir_de' in definicao:
+                filtro &= datas >= pd.Timestamp(definicao['a_partir_de'])
+            if 'antes_de' in definicao:
+                filtro &= datas < pd.Timestamp(definicao['antes_de'])
+        else:
+            filtro = serie.isin(definicao['valores'])
+        codigo[filtro.to_numpy()] = i
+
+    return codigo
+
+def compilar_tabela(tabela):
+
+    '''
+    Função para montar a tabela de consulta: para cada combinação de classes das entradas,
+    a posição da primeira regra que a atende (-1 quando nenhuma atende).
+    '''
+
+    entradas = tabela['entradas']
+    tamanhos = [len(classes) + 1 for classes in entradas.values()]
+    consulta = np.full(int(np.prod(tamanhos)), -1, dtype=np.int64)
+
+    for posicao_regra in reversed(range(len(tabela['regras']))):
+        quando = tabela['regras'][posicao_regra]['quando']
+
+        opcoes = []
+        for coluna, classes in entradas.items():
+            if coluna in quando:
+                opcoes.append([list(classes).index(quando[coluna])])
+            else:
+                opcoes.append(range(len(classes) + 1))
+
+        for combinacao in product(*opcoes):
+            consulta[np.ravel_multi_index(combinacao, tamanhos)] = posicao_regra
+
+    return consulta, tamanhos
+
+def avaliar_tabela(df, tabela):
+
+    '''
+    Função para localizar a regra de cada linha.
+
+    Retorna:
+    np.ndarray: posição da regra aplicada em cada linha (-1 quando nenhuma regra atende).
+    '''
+
+    consulta, tamanhos = compilar_tabela(tabela)
+    codigos = [codificar_entrada(df[coluna], classes) for coluna, classes in tabela['entradas'].items()]
+
+    return consulta[np.ravel_multi_index(codigos, tamanhos)]
+
+def resultado_regras(tabela, regra, campo, padrao=None):
+
+    '''
+    Retorna:
+    np.ndarray: valor do campo (do 'entao' da regra) de cada linha, ou o padrão nas linhas sem regra.
+    '''
+
+    valores = [r['entao'][campo] for r in tabela['regras']] + [padrao]
+
+    return np.array(valores, dtype=object if any(isinstance(v, str) or v is None or v is pd.NaT for v in valores) else None)[regra]
+
+def valores_por_regra(df, tabela, regra, campo):
+
+    '''
+    Função para buscar, em cada linha, o valor da coluna indicada no campo da sua regra
+    (ex.: a data base da projeção). Apenas a coluna da regra de cada linha é lida.
+
+    Retorna:
+    pd.Series: valores com índice posicional (0..n-1), vazios nas linhas sem regra ou sem coluna.
+    '''
+
+    partes = []
+
+    for posicao_regra in np.unique(regra[regra >= 0]):
+        coluna = tabela['regras'][posicao_regra]['entao'][campo]
+        if coluna is None:
+            continue
+
+        posicoes = np.flatnonzero(regra == posicao_regra)
+        partes.append(df[coluna].iloc[posicoes].set_axis(posicoes))
+
+    if not partes:
+        return pd.Series(np.nan, index=pd.RangeIndex(len(df)))
+
+    return pd.concat(partes).reindex(pd.RangeIndex(len(df)))
@@ -0,0 +1,113 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import glob
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from datas import MES_VAZIO, mes_ordinal, periodos_mes
+
+## ----- SAÍDA EM PARQUET -----
+
+## cópia colunar dos relatórios de conciliação (além dos CSVs mensais), particionada no formato hive:
+##   <diretório>/<relatório>/Nome da Empresa=<empresa>/Mes=<AAAA-MM>/parte-0.parquet
+## o mês é o da coluna de data do relatório (lançamento ou projeção). Os arquivos são gravados com
+## estatísticas por grupo de linhas, então filtros por empresa/mês/data leem apenas o necessário, ex.:
+##   pd.read_parquet(caminho, filters=[('Nome da Empresa', '==', 'VGL'), ('Mes', '==', '2025-01')])
+
+COLUNA_EMPRESA = 'Nome da Empresa'
+COLUNA_MES = 'Mes'
+
+## linhas por grupo de linhas dentro de cada arquivo (granularidade das estatísticas)
+LINHAS_POR_GRUPO = 64 * 1024
+
+ESQUEMA_PARTICAO = pa.schema([(COLUNA_EMPRESA, pa.string()), (COLUNA_MES, pa.string())])
+
+def diretorio_mes(periodo):
+
+    return f'{COLUNA_MES}={periodo.strftime("%Y-%m")}'
+
+def normalizar_colunas_mistas(df):
+
+    '''
+    Função para converter em texto as colunas object com tipos misturados (ex.: bilhetes lidos como número
+    em um arquivo e como texto em outro), que o Parquet não aceita em uma mesma coluna.
+    '''
+
+    mistas = [
+        coluna for coluna in df.columns
+        if df[coluna].dtype == object and pd.api.types.infer_dtype(df[coluna], skipna=True).startswith('mixed')
+    ]
+
+    if not mistas:
+        return df
+
+    return df.assign(**{coluna: df[coluna].astype('string') for coluna in mistas})
+
+def limpar_particoes(diretorio, periodos=None):
+
+    '''
+    Função para remover as partições que serão regravadas: o relatório inteiro (periodos=None)
+    ou apenas os meses informados, em todas as empresas.
+    '''
+
+    if periodos is None:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        return
+
+    for periodo in periodos:
+        if pd.isna(periodo):
+            continue
+        for caminho in glob.glob(os.path.join(glob.escape(diretorio), '*', diretorio_mes(periodo))):
+            shutil.rmtree(caminho, ignore_errors=True)
+
+def salvar_parquet(df, linhas, coluna_data, diretorio, periodos=None):
+
+    '''
+    Função para salvar as linhas de um relatório em Parquet, particionado por empresa e mês.
+
+    Parâmetros:
+    df: DataFrame consolidado (df_agrupado).
+    linhas: máscara booleana das linhas do relatório.
+    coluna_data: coluna de data que define o mês da partição.
+    diretorio: diretório do relatório.
+    periodos: meses (pd.Period) a regravar. Caso seja None, o relatório é regravado por completo.
+    '''
+
+    meses = mes_ordinal(df[coluna_data])
+    linhas = linhas & (meses != MES_VAZIO)
+    if periodos is not None:
+        linhas = linhas & np.isin(meses, [periodo.ordinal for periodo in periodos if pd.notna(periodo)])
+
+    limpar_particoes(diretorio, periodos)
+
+    if not linhas.any():
+        return
+
+    df_relatorio = df[linhas]
+    df_relatorio = df_relatorio.assign(**{
+        COLUNA_EMPRESA: df_relatorio[COLUNA_EMPRESA].astype(str),
+        COLUNA_MES: periodos_mes(meses[linhas]).strftime('%Y-%m')
+    })
+
+    ## ordenando pela data dentro da partição para as estatísticas (mín/máx) de cada grupo de linhas serem seletivas
+    df_relatorio = df_relatorio.sort_values(coluna_data, kind='stable')
+
+    tabela = pa.Table.from_pandas(normalizar_colunas_mistas(df_relatorio), preserve_index=False)
+    formato = ds.ParquetFileFormat()
+
+    ds.write_dataset(
+        tabela,
+        diretorio,
+        format=formato,
+        partitioning=ds.partitioning(ESQUEMA_PARTICAO, flavor='hive'),
+        basename_template='parte-{i}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=formato.make_write_options(compression='zstd', write_statistics=True),
+        min_rows_per_group=min(LINHAS_POR_GRUPO, len(tabela)),
+        max_rows_per_group=LINHAS_POR_GRUPO
+    )
+
+    print(f'SISTEMA: Salvo {len(tabela)} registros em Parquet para {os.path.basename(diretorio)}')
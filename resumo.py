@@ -0,0 +1,186 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import os
+import numpy as np
+import pandas as pd
+from configuracoes import DIRETORIO_RESUMO, RESUMO_PLANILHA, MODO_CENTAVOS, CALCULO_RESUMO
+from dinheiro import para_centavos, de_centavos
+from datas import mes_ordinal, periodos_mes
+from instrumentacao import instrumentar
+
+## ----- RESUMO DE VALORES -----
+
+## resumo por empresa + mês de lançamento: valores somados por mês de vencimento (projeção) das parcelas
+## do Totalbus, seguidos das instruções de implantação com os totais do período
+
+COLUNAS_RESUMO = {
+    'Total do Bilhete_Parcela': 'Total do Bilhete',
+    'Taxa de Conv._Parcela': 'Tx de Conv.',
+    'Comissao_Parcela': 'Comissao',
+    'Multa': 'Multa',
+    'Total do Repasse_Parcela': 'Repasse'
+}
+
+## (texto da instrução, total exibido na coluna "Total do Bilhete"); None = linha sem valor
+INSTRUCOES_IMPLANTACAO = [
+    (np.nan, None),
+    ('Implantação do faturamento (213/135):', 'faturamento'),
+    ('Implantação da taxa de conv. (213/205):', 'Tx de Conv.'),
+    ('Agrupar os dois títulos em um único (911107)', None),
+    ('Divisão: 01 parcela da comissão:', 'Comissao'),
+    ('Divisão: Demais parcelas serão compostas pelos valores de repasses por mês:', 'Repasse')
+]
+
+## nome do arquivo do resumo em planilha única (uma aba por empresa + mês de lançamento)
+NOME_PLANILHA_RESUMO = 'Resumo de Valores.xlsx'
+
+def calcular_resumo(df_agrupado):
+
+    '''
+    Função para calcular, em um único groupby, os valores de todas as empresas, meses de lançamento e
+    meses de vencimento.
+
+    Retorna:
+    tuple: (somas por empresa/lançamento/vencimento, pares empresa/lançamento existentes).
+    '''
+
+    df_resumo = df_agrupado.loc[df_agrupado['Base'] == 'Totalbus', ['Nome da Empresa', 'Data de Lancamento', 'Data Projecao', 'Parcela Atual'] + list(COLUNAS_RESUMO)]
+    df_resumo = df_resumo.rename(columns=COLUNAS_RESUMO)
+    colunas_soma = list(COLUNAS_RESUMO.values())
+
+    ## zerando os valores de multa das parcelas que não são a primeira
+    df_resumo['Multa'] = df_resumo['Multa'].where(df_resumo['Parcela Atual'] == 1, 0)
+
+    ## ajustando as datas para mes/ano
+    df_resumo['Data de Lancamento'] = periodos_mes(mes_ordinal(df_resumo['Data de Lancamento']))
+    df_resumo['Data de Vencimento'] = periodos_mes(mes_ordinal(df_resumo['Data Projecao']))
+
+    ## modo centavos: somas exatas em centavos inteiros
+    if MODO_CENTAVOS:
+        for coluna in colunas_soma:
+            df_resumo[coluna] = para_centavos(df_resumo[coluna])
+
+    ## somando por empresa + lançamento + vencimento (vencimento vazio mantém o grupo, mas não entra nas somas)
+    somas = df_resumo.groupby(['Nome da Empresa', 'Data de Lancamento', 'Data de Vencimento'], observed=True, dropna=False)[colunas_soma].sum()
+
+    if MODO_CENTAVOS:
+        somas = somas.apply(de_centavos)
+    somas = somas[somas.index.get_level_values('Nome da Empresa').notna() & somas.index.get_level_values('Data de Lancamento').notna()]
+
+    grupos = somas.index.droplevel('Data de Vencimento').unique()
+    somas = somas[somas.index.get_level_values('Data de Vencimento').notna()]
+
+    return somas, grupos
+
+def calcular_resumo_grupos(df_agrupado):
+
+    '''
+    Função para calcular o resumo como no cálculo original (NEXUS_CALCULO_RESUMO=grupos), com um groupby por
+    empresa + mês de lançamento e os meses convertidos com dt.to_period. Referência da verificação de equivalência.
+
+    Retorna:
+    tuple: mesmo formato do calcular_resumo.
+    '''
+
+    df_resumo = df_agrupado[df_agrupado['Base'] == 'Totalbus'][['Nome da Empresa', 'Data de Lancamento', 'Data Projecao', 'Parcela Atual'] + list(COLUNAS_RESUMO)]
+    df_resumo = df_resumo.rename(columns=COLUNAS_RESUMO)
+    colunas_soma = list(COLUNAS_RESUMO.values())
+
+    ## zerando os valores de multa das parcelas que não são a primeira
+    df_resumo.loc[df_resumo['Parcela Atual'] != 1, 'Multa'] = 0
+
+    ## ajustando as datas para mes/ano
+    df_resumo['Data de Lancamento'] = pd.to_datetime(df_resumo['Data de Lancamento']).dt.to_period('M')
+    df_resumo['Data de Vencimento'] = pd.to_datetime(df_resumo['Data Projecao']).dt.to_period('M')
+
+    lista_somas = []
+    grupos = []
+
+    ## looping em cada empresa + mês de lançamento e somando os valores por mês de vencimento
+    for (empresa, periodo), grupo in df_resumo.groupby(['Nome da Empresa', 'Data de Lancamento'], observed=True):
+
+        if MODO_CENTAVOS:
+            grupo = grupo.assign(**{coluna: para_centavos(grupo[coluna]) for coluna in colunas_soma})
+
+        df_somado = grupo.groupby('Data de Vencimento')[colunas_soma].sum()
+
+        if MODO_CENTAVOS:
+            df_somado = df_somado.apply(de_centavos)
+
+        grupos.append((empresa, periodo))
+        lista_somas.append(pd.concat({(empresa, periodo): df_somado}, names=['Nome da Empresa', 'Data de Lancamento']))
+
+    if not lista_somas:
+        indice_vazio = pd.MultiIndex.from_arrays([[], [], []], names=['Nome da Empresa', 'Data de Lancamento', 'Data de Vencimento'])
+        return pd.DataFrame(columns=colunas_soma, index=indice_vazio, dtype=float), grupos
+
+    return pd.concat(lista_somas), grupos
+
+def montar_instrucoes(df_somado):
+
+    '''
+    Função para montar as linhas de instrução de implantação com os totais de uma empresa + mês de lançamento.
+    Os totais somam as linhas por vencimento (mesma ordem de soma do relatório, sem diferença de centavos).
+    '''
+
+    if MODO_CENTAVOS:
+        totais = df_somado[list(COLUNAS_RESUMO.values())].apply(para_centavos).sum().pipe(de_centavos)
+    else:
+        totais = df_somado[list(COLUNAS_RESUMO.values())].sum()
+    totais['faturamento'] = totais['Total do Bilhete'] + totais['Multa']
+
+    return pd.DataFrame({
+        'Data de Vencimento': [texto for texto, _ in INSTRUCOES_IMPLANTACAO],
+        'Total do Bilhete': [totais[coluna] if coluna else np.nan for _, coluna in INSTRUCOES_IMPLANTACAO]
+    }).reindex(columns=['Data de Vencimento'] + list(COLUNAS_RESUMO.values()))
+
+@instrumentar('resumo', entrada='df_agrupado')
+def salvar_resumo(df_agrupado, empresas_periodos=None, diretorio=None, planilha=None):
+
+    '''
+    Função para salvar o resumo de empresa + data projecao + valores + intrução de implantação.
+
+    Parâmetros:
+    df_agrupado: DataFrame consolidado.
+    empresas_periodos: pares (empresa, mês de lançamento) a regravar (None = todos).
+    diretorio: diretório de saída (None = configuração NEXUS_DIRETORIO_RESUMO).
+    planilha: quando True, grava uma única planilha com uma aba por empresa + mês (None = NEXUS_RESUMO_PLANILHA).
+    '''
+
+    diretorio = DIRETORIO_RESUMO if diretorio is None else diretorio
+    planilha = RESUMO_PLANILHA if planilha is None else planilha
+
+    somas, grupos = calcular_resumo_grupos(df_agrupado) if CALCULO_RESUMO == 'grupos' else calcular_resumo(df_agrupado)
+    somas_por_grupo = dict(list(somas.groupby(level=['Nome da Empresa', 'Data de Lancamento'], observed=True)))
+
+    abas = {}
+
+    for empresa, periodo in grupos:
+
+        ## a planilha única é sempre regravada por completo
+        if not planilha and empresas_periodos is not None and (empresa, periodo) not in empresas_periodos:
+            continue
+
+        df_somado = somas_por_grupo.get((empresa, periodo), somas.iloc[:0]).droplevel(['Nome da Empresa', 'Data de Lancamento']).reset_index()
+        df_somado = pd.concat([df_somado, montar_instrucoes(df_somado)])
+
+        if planilha:
+            df_somado['Data de Vencimento'] = df_somado['Data de Vencimento'].astype(str).where(df_somado['Data de Vencimento'].notna())
+            abas[f'{empresa}_{periodo}'[:31]] = df_somado
+            continue
+
+        ## salvando os arquivos
+        nome_arquivo = f'{empresa}_{periodo}.csv'
+        print(f'SISTEMA: Salvando o arquivo "{nome_arquivo}"')
+        df_somado.to_csv(os.path.join(diretorio, nome_arquivo), sep=';', decimal=',', encoding='latin-1', index=False, float_format='%.2f')
+
+    if planilha and abas:
+        caminho_planilha = os.path.join(diretorio, NOME_PLANILHA_RESUMO)
+        print(f'SISTEMA: Salvando o arquivo "{NOME_PLANILHA_RESUMO}" ({len(abas)} abas)')
+
+        try:
+            with pd.ExcelWriter(caminho_planilha) as escritor:
+                for nome_aba, df_somado in abas.items():
+                    df_somado.to_excel(escritor, sheet_name=nome_aba, index=False)
+        except Exception as e:
+            print(f'AVISO: Erro ao salvar o arquivo {NOME_PLANILHA_RESUMO}: {e}')
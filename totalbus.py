@@ -4,10 +4,132 @@ import os
 from datetime import datetime
 import numpy as np
 from funcoes import ler_arquivo
+from esquemas import ESQUEMAS
+from configuracoes import MODO_CENTAVOS, CONSULTA_VENDAS
+from dinheiro import arredondar_centavos
+from datas import mesmo_mes
+from instrumentacao import instrumentar
+
+## ----- DEFININDO COLUNAS -----
+
+COLUNAS_TOTALBUS = ['EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'STATUS BILHETE', 'TARIFA', 'PEDAGIO', 'TAXA_EMB',
+                    'TOTAL DO BILHETE', 'FORMA PAGAMENTO 1', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL', 'NOME PASSAGEIRO',
+                    'VALOR MULTA', 'DATA HORA VIAGEM', 'DATA HORA VENDA PARA CANC.', 'AGENCIA EMISSORA']
+
+## definição do nome de cada empresa baseado em seu código
+DEFINICAO_EMPRESAS = {
+    1: 'Viação Garcia',
+    3: 'Princesa do Ivaí',
+    6: 'Brasil Sul',
+    17: 'Santo Anjo'
+}
+
+## política de tipos para compactar o DataFrame do Totalbus em memória (memoria.compactar_memoria)
+## NOME_EMPRESA e ID TRANSACAO ORIGINAL ficam de fora por serem chaves do merge_asof; NOME PASSAGEIRO
+## fica como texto comum pois o astype(str) da projeção transformaria os vazios do string[pyarrow] em '<NA>'
+POLITICA_MEMORIA_TOTALBUS = {
+    'categorias': ['Origem', 'STATUS BILHETE', 'FORMA PAGAMENTO 1', 'AGENCIA ORIGINAL', 'AGENCIA EMISSORA'],
+    'inteiros': ['EMPRESA', 'NUMERO BILHETE', 'Cancelamento_Mesmo_Mes']
+}
+
+## ----- ÍNDICE DAS VENDAS DO TOTALBUS -----
+
+## as vendas (STATUS BILHETE == 'V') são separadas e indexadas uma única vez no processamento do Totalbus
+## e o índice é compartilhado pelas consultas seguintes, sem novas cópias filtradas do df_totalbus:
+##   - bilhete (EMPRESA, NUMERO BILHETE, AGENCIA ORIGINAL): vendas dos cancelados (apontamento de inconsistências),
+##     consultado por hash nas chaves distintas (vazios são comparados como valor, como no merge);
+##   - transação (empresa, ID da transação): data BPE dos repasses da Embarca, pelo código da chave
+##     (chaves.COLUNA_CHAVE, atribuído na conciliação) e pela data mais próxima (pareamento)
+
+COLUNAS_VENDAS = ['EMPRESA', 'NOME_EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL']
+COLUNAS_BILHETE = ['EMPRESA', 'NUMERO BILHETE', 'AGENCIA ORIGINAL']
+
+def indexar_vendas(df_totalbus):
+
+    '''
+    Função para montar o índice das vendas do Totalbus.
+
+    Retorna:
+    dict: vendas (DataFrame das vendas com as COLUNAS_VENDAS e a 'Data BPE'), bilhetes distintos (MultiIndex),
+          posições das vendas de cada bilhete (ordem, início e quantidade) e o índice de pareamento
+          por transação (montado na primeira consulta, após a atribuição da chave).
+    '''
+
+    df_vendas = df_totalbus.loc[df_totalbus['STATUS BILHETE'] == 'V', COLUNAS_VENDAS + ['DATA HORA VENDA PARA CANC.']].reset_index(drop=True)
+
+    ## data BPE: data da venda para cancelamento ou, quando vazia, a própria data da venda
+    df_vendas['Data BPE'] = df_vendas.pop('DATA HORA VENDA PARA CANC.').fillna(df_vendas['DATA HORA VENDA'])
+    df_vendas['ID TRANSACAO ORIGINAL'] = df_vendas['ID TRANSACAO ORIGINAL'].astype(str)
+
+    bilhetes_vendas = pd.MultiIndex.from_frame(df_vendas[COLUNAS_BILHETE])
+    bilhetes = bilhetes_vendas.unique()
+    codigos_bilhete = bilhetes.get_indexer(bilhetes_vendas)
+    quantidade = np.bincount(codigos_bilhete, minlength=len(bilhetes))
+
+    return {
+        'vendas': df_vendas,
+        'bilhetes': bilhetes,
+        'ordem': np.argsort(codigos_bilhete, kind='stable'),
+        'inicio': np.cumsum(quantidade) - quantidade,
+        'quantidade': quantidade,
+        'pareamento': None
+    }
+
+def consultar_bilhetes(indice, df_consulta, colunas):
+
+    '''
+    Função para localizar todas as vendas de cada bilhete consultado (mesmo resultado do merge "left").
+
+    Parâmetros:
+    indice: índice das vendas (indexar_vendas).
+    df_consulta: DataFrame com os bilhetes consultados.
+    colunas: colunas do df_consulta correspondentes às COLUNAS_BILHETE.
+
+    Retorna:
+    tuple: (posição consultada, posição da venda ou -1), uma linha por venda encontrada, na ordem das
+           linhas consultadas e, dentro de cada uma, na ordem das vendas.
+    '''
+
+    if CONSULTA_VENDAS == 'merge':
+        return consultar_bilhetes_merge(indice, df_consulta, colunas)
+
+    bilhete = indice['bilhetes'].get_indexer(pd.MultiIndex.from_frame(df_consulta[colunas]))
+    encontrado = bilhete >= 0
+
+    ## bilhetes sem venda mantêm uma linha (venda -1)
+    repeticoes = np.ones(len(bilhete), dtype=np.int64)
+    repeticoes[encontrado] = indice['quantidade'][bilhete[encontrado]]
+    posicao_consulta = np.repeat(np.arange(len(bilhete)), repeticoes)
+
+    deslocamento = np.arange(len(posicao_consulta)) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    bilhete_linha = bilhete[posicao_consulta]
+    posicao_venda = np.full(len(posicao_consulta), -1, dtype=np.int64)
+
+    com_venda = bilhete_linha >= 0
+    posicao_venda[com_venda] = indice['ordem'][indice['inicio'][bilhete_linha[com_venda]] + deslocamento[com_venda]]
+
+    return posicao_consulta, posicao_venda
+
+def consultar_bilhetes_merge(indice, df_consulta, colunas):
+
+    '''
+    Função com a consulta original (pd.merge "left" com as vendas), usada quando NEXUS_CONSULTA_VENDAS=merge
+    (referência da verificação de equivalência).
+    '''
+
+    df_bilhetes = df_consulta[colunas].set_axis(COLUNAS_BILHETE, axis=1).reset_index(drop=True)
+    df_bilhetes['posicao_consulta'] = np.arange(len(df_bilhetes))
+
+    df_vendas = indice['vendas'][COLUNAS_BILHETE].copy()
+    df_vendas['posicao_venda'] = np.arange(len(df_vendas))
+
+    df_resultado = pd.merge(df_bilhetes, df_vendas, on=COLUNAS_BILHETE, how='left')
+
+    return df_resultado['posicao_consulta'].to_numpy(), df_resultado['posicao_venda'].fillna(-1).to_numpy(dtype=np.int64)
 
 ## ----- LOCALIZANDO INCONSISTÊNCIAS NO RELATÓRIO DO TOTALBUS -----
 
-def apontamento_incosistencias(df_totalbus):
+def apontamento_incosistencias(df_totalbus, indice_vendas):
 
     df_totalbus_diferencas_c = df_totalbus[
         (df_totalbus['STATUS BILHETE'] == 'C') &
@@ -17,15 +139,13 @@ def apontamento_incosistencias(df_totalbus):
         )
     ][['Origem', 'EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'STATUS BILHETE', 'TOTAL DO BILHETE', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL', 'DATA HORA VENDA PARA CANC.', 'AGENCIA EMISSORA']]
 
-    df_totalbus_vendas = df_totalbus[df_totalbus['STATUS BILHETE'] == 'V'][['EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL']].rename(columns={'EMPRESA': 'EMPRESA_v', 'NUMERO BILHETE': 'NUMERO BILHETE_v', 'DATA HORA VENDA': 'DATA HORA VENDA_v', 'AGENCIA ORIGINAL': 'AGENCIA ORIGINAL_v', 'ID TRANSACAO ORIGINAL': 'ID TRANSACAO ORIGINAL_v'})
+    ## localizando a venda de cada cancelado pelo bilhete (agência emissora do cancelado = agência original da venda)
+    posicao_cancelado, posicao_venda = consultar_bilhetes(indice_vendas, df_totalbus_diferencas_c, ['EMPRESA', 'NUMERO BILHETE', 'AGENCIA EMISSORA'])
+
+    df_vendas = indice_vendas['vendas'][['EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL']]
+    df_vendas = df_vendas.reindex(posicao_venda).reset_index(drop=True).add_suffix('_v')
 
-    df_apontamento = pd.merge(
-        df_totalbus_diferencas_c,
-        df_totalbus_vendas,
-        left_on=['EMPRESA', 'NUMERO BILHETE', 'AGENCIA EMISSORA'],
-        right_on=['EMPRESA_v', 'NUMERO BILHETE_v', 'AGENCIA ORIGINAL_v'],
-        how='left'
-    )
+    df_apontamento = pd.concat([df_totalbus_diferencas_c.iloc[posicao_cancelado].reset_index(drop=True), df_vendas], axis=1)
 
     df_apontamento['ID TRANSACAO ORIGINAL'] = df_apontamento['ID TRANSACAO ORIGINAL'].astype(str)
     df_apontamento['ID TRANSACAO ORIGINAL_v'] = df_apontamento['ID TRANSACAO ORIGINAL_v'].astype(str)
@@ -34,7 +154,8 @@ def apontamento_incosistencias(df_totalbus):
 
 ## ----- PROCESSAMENTO DAS VENDAS -----
 
-def processamento_totalbus(caminho_totalbus):
+@instrumentar('totalbus', entrada='lista_totalbus', saida=0)
+def processamento_totalbus(caminho_totalbus, lista_totalbus=None):
 
     '''
     Processa arquivos de vendas e cancelados do TOTALBUS de um diretório, concatenando-os
@@ -43,31 +164,31 @@ def processamento_totalbus(caminho_totalbus):
     Parâmetros:
     caminho_totalbus: O caminho do diretório contendo os arquivos
                                   de vendas da Embarca (CSV ou Excel).
+    lista_totalbus: lista de DataFrames já lidos (ingestão paralela). Caso seja None,
+                    os arquivos do diretório são lidos um a um.
     
     Retorna:
-    pd.DataFrame: Um DataFrame consolidado com os dados processados.
+    tuple: DataFrame consolidado com os dados processados, inconsistências apontadas e o índice das vendas (indexar_vendas).
     '''
 
-    ## definindo colunas
-    colunas = ['EMPRESA', 'NUMERO BILHETE', 'DATA HORA VENDA', 'STATUS BILHETE', 'TARIFA', 'PEDAGIO', 'TAXA_EMB',
-                        'TOTAL DO BILHETE', 'FORMA PAGAMENTO 1', 'AGENCIA ORIGINAL', 'ID TRANSACAO ORIGINAL', 'NOME PASSAGEIRO',
-                        'VALOR MULTA', 'DATA HORA VIAGEM', 'DATA HORA VENDA PARA CANC.', 'AGENCIA EMISSORA']
+    ## lendo os arquivos do diretório (caso ainda não tenham sido carregados pela ingestão paralela)
+    if lista_totalbus is None:
 
-    ## criando uma lista vazia para armazenamento
-    lista_totalbus = []
+        ## criando uma lista vazia para armazenamento
+        lista_totalbus = []
 
-    caminhos_arquivos = [
-        os.path.join(caminho_totalbus, f) for f in os.listdir(caminho_totalbus) if f.endswith(('.csv', '.xls', '.xlsx'))
-    ]
+        caminhos_arquivos = [
+            os.path.join(caminho_totalbus, f) for f in os.listdir(caminho_totalbus) if f.endswith(('.csv', '.xls', '.xlsx'))
+        ]
 
-    ## realizando o looping dentro do diretório
-    for caminho in caminhos_arquivos:
-        try:
-            df_temp = ler_arquivo(caminho, colunas)
-            if df_temp is not None:
-                lista_totalbus.append(df_temp)
-        except Exception as e:
-            print(f'SISTEMA: Erro ao processar o arquivo {os.path.basename(caminho)}. ({e})')
+        ## realizando o looping dentro do diretório
+        for caminho in caminhos_arquivos:
+            try:
+                df_temp = ler_arquivo(caminho, COLUNAS_TOTALBUS, esquema=ESQUEMAS['totalbus'])
+                if df_temp is not None:
+                    lista_totalbus.append(df_temp)
+            except Exception as e:
+                print(f'SISTEMA: Erro ao processar o arquivo {os.path.basename(caminho)}. ({e})')
 
     ## agrupando todos os arquivos em um único dataframe
     try:
@@ -83,32 +204,16 @@ def processamento_totalbus(caminho_totalbus):
         print(f'AVISO: Erro ao agrupar os arquivos de vendas do Totalbus. ({e})')
     
     ## definição do nome de cada empresa baseado em seu código
-    definicao_empresas = {
-        1: 'Viação Garcia',
-        3: 'Princesa do Ivaí',
-        6: 'Brasil Sul',
-        17: 'Santo Anjo'
-    }
-
-    df_totalbus['NOME_EMPRESA'] = df_totalbus['EMPRESA'].map(definicao_empresas)
+    df_totalbus['NOME_EMPRESA'] = df_totalbus['EMPRESA'].map(DEFINICAO_EMPRESAS)
 
-    ## definindo tipos de datas
+    ## definindo tipos de datas (as datas e valores já são lidos nos tipos finais pelo esquema do Totalbus)
     colunas_tipo_data = ['DATA HORA VENDA', 'DATA HORA VENDA PARA CANC.']
 
     for c in colunas_tipo_data:
-        df_totalbus[c] = pd.to_datetime(df_totalbus[c], errors='coerce', dayfirst=True).dt.floor('D')
-
-    ## definindo tipos de valores
-    colunas_tipo_valor = ['TARIFA', 'PEDAGIO', 'TAXA_EMB', 'VALOR MULTA']
-
-    for c in colunas_tipo_valor:
-        df_totalbus[c] = df_totalbus[c].astype(str).str.replace(',', '.', regex=False).astype(float)
+        df_totalbus[c] = df_totalbus[c].dt.floor('D')
 
     ## definindo se o cancelamento foi efetuado no mês da venda
-    df_totalbus['Cancelamento_Mesmo_Mes'] = (
-        df_totalbus['DATA HORA VENDA'].dt.to_period('M') ==
-        df_totalbus['DATA HORA VENDA PARA CANC.'].dt.to_period('M')
-    ).astype(int)
+    df_totalbus['Cancelamento_Mesmo_Mes'] = mesmo_mes(df_totalbus['DATA HORA VENDA'], df_totalbus['DATA HORA VENDA PARA CANC.']).astype(int)
 
     ## definindo valores negativos nos cancelamentos
     condicional_negativar = df_totalbus['STATUS BILHETE'] == 'C'
@@ -118,6 +223,14 @@ def processamento_totalbus(caminho_totalbus):
     for c in colunas_negativar:
         df_totalbus.loc[condicional_negativar, c] = -df_totalbus.loc[condicional_negativar, c]
 
-    diferencas = apontamento_incosistencias(df_totalbus)
+    ## modo centavos: valores do bilhete e da multa arredondados para o centavo
+    if MODO_CENTAVOS:
+        for c in colunas_negativar + ['VALOR MULTA']:
+            df_totalbus[c] = arredondar_centavos(df_totalbus[c])
+
+    ## indexando as vendas uma única vez (consultadas no apontamento e na data BPE dos repasses)
+    indice_vendas = indexar_vendas(df_totalbus)
+
+    diferencas = apontamento_incosistencias(df_totalbus, indice_vendas)
 
-    return df_totalbus, diferencas
\ No newline at end of file
+    return df_totalbus, diferencas, indice_vendas
\ No newline at end of file
@@ -0,0 +1,217 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import importlib.util
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from configuracoes import CALCULO_VALORES
+
+## ----- VALORES DO BILHETE E DAS PARCELAS -----
+
+## os valores da projeção (taxas, conveniência, venda, comissão, repasse e as divisões por parcela) são
+## calculados em uma única passagem sobre arrays contíguos, gravando direto em uma matriz pré-alocada
+## (uma linha por coluna de saída), sem uma Series intermediária por coluna.
+## motores disponíveis (configuração NEXUS_CALCULO_VALORES):
+##   'auto': numba quando instalado, senão numpy
+##   'numba': kernel compilado (JIT), um único laço pelos bilhetes
+##   'numpy': ufuncs com out= na matriz pré-alocada
+##   'pandas': operações coluna a coluna com Series (comportamento anterior)
+##   'colunas': cálculo original, coluna a coluna sobre as próprias colunas da projeção (com os seus tipos, sem
+##              a matriz float64 de entrada); referência da verificação de equivalência
+## todos fazem as mesmas operações, na mesma ordem, e devolvem os mesmos valores
+
+## colunas de entrada (nesta ordem) e de saída (nesta ordem)
+COLUNAS_ENTRADA = ['TARIFA', 'PEDAGIO', 'TAXA_EMB', 'TOTAL DO BILHETE', '% Tx Conv', 'PERCENTUAL_COMISSAO', 'parcelas']
+COLUNAS_VALORES = [
+    'TAXAS', 'TAXA_CONV', 'TOTAL_VENDA', 'COMISSAO', 'TOTAL_REPASSE',
+    'TARIFA_PARCELA', 'PEDAGIO_PARCELA', 'TAXA_EMB_PARCELA', 'TAXA_CONV_PARCELA', 'TAXAS_PARCELA',
+    'COMISSAO_PARCELA', 'TOTAL_BILHETE_PARCELA', 'TOTAL_VENDA_PARCELA', 'TOTAL_REPASSE_PARCELA'
+]
+
+def numba_disponivel():
+
+    return importlib.util.find_spec('numba') is not None
+
+def valores_numpy(entrada, saida):
+
+    '''
+    Função para calcular os valores com ufuncs gravando direto nas linhas da matriz de saída.
+
+    Parâmetros:
+    entrada: matriz float64 (len(COLUNAS_ENTRADA), n).
+    saida: matriz float64 (len(COLUNAS_VALORES), n), preenchida pela função.
+    '''
+
+    tarifa, pedagio, taxa_emb, total_bilhete, taxa_conveniencia, percentual_comissao, parcelas = entrada
+    taxas, taxa_conv, total_venda, comissao, total_repasse = saida[:5]
+
+    np.add(pedagio, taxa_emb, out=taxas)
+    np.multiply(total_bilhete, taxa_conveniencia, out=taxa_conv)
+    np.add(total_bilhete, taxa_conv, out=total_venda)
+    np.multiply(total_venda, percentual_comissao, out=comissao)
+    np.subtract(total_venda, comissao, out=total_repasse)
+
+    ## divisões por parcela (mesma ordem de COLUNAS_VALORES)
+    for destino, origem in zip(saida[5:], [tarifa, pedagio, taxa_emb, taxa_conv, taxas, comissao, total_bilhete, total_venda, total_repasse]):
+        np.divide(origem, parcelas, out=destino)
+
+@lru_cache(maxsize=None)
+def kernel_numba():
+
+    '''
+    Retorna:
+    função: kernel compilado pelo numba (compilação na primeira chamada, com cache em disco).
+    '''
+
+    from numba import njit
+
+    @njit(cache=True)
+    def valores_numba(entrada, saida):
+        for i in range(entrada.shape[1]):
+            total_bilhete = entrada[3, i]
+            parcelas = entrada[6, i]
+
+            taxas = entrada[1, i] + entrada[2, i]
+            taxa_conv = total_bilhete * entrada[4, i]
+            total_venda = total_bilhete + taxa_conv
+            comissao = total_venda * entrada[5, i]
+            total_repasse = total_venda - comissao
+
+            saida[0, i] = taxas
+            saida[1, i] = taxa_conv
+            saida[2, i] = total_venda
+            saida[3, i] = comissao
+            saida[4, i] = total_repasse
+            saida[5, i] = entrada[0, i] / parcelas
+            saida[6, i] = entrada[1, i] / parcelas
+            saida[7, i] = entrada[2, i] / parcelas
+            saida[8, i] = taxa_conv / parcelas
+            saida[9, i] = taxas / parcelas
+            saida[10, i] = comissao / parcelas
+            saida[11, i] = total_bilhete / parcelas
+            saida[12, i] = total_venda / parcelas
+            saida[13, i] = total_repasse / parcelas
+
+    return valores_numba
+
+def valores_numba(entrada, saida):
+
+    kernel_numba()(entrada, saida)
+
+def valores_pandas(entrada, saida):
+
+    '''
+    Função com o cálculo coluna a coluna (uma Series por coluna), mantida para comparação no benchmark.
+    '''
+
+    df = pd.DataFrame(dict(zip(COLUNAS_ENTRADA, entrada)))
+
+    df['TAXAS'] = df['PEDAGIO'] + df['TAXA_EMB']
+    df['TAXA_CONV'] = df['TOTAL DO BILHETE'] * df['% Tx Conv']
+    df['TOTAL_VENDA'] = df['TOTAL DO BILHETE'] + df['TAXA_CONV']
+    df['COMISSAO'] = df['TOTAL_VENDA'] * df['PERCENTUAL_COMISSAO']
+    df['TOTAL_REPASSE'] = df['TOTAL_VENDA'] - df['COMISSAO']
+    df['TARIFA_PARCELA'] = df['TARIFA'] / df['parcelas']
+    df['PEDAGIO_PARCELA'] = df['PEDAGIO'] / df['parcelas']
+    df['TAXA_EMB_PARCELA'] = df['TAXA_EMB'] / df['parcelas']
+    df['TAXA_CONV_PARCELA'] = df['TAXA_CONV'] / df['parcelas']
+    df['TAXAS_PARCELA'] = df['TAXAS'] / df['parcelas']
+    df['COMISSAO_PARCELA'] = df['COMISSAO'] / df['parcelas']
+    df['TOTAL_BILHETE_PARCELA'] = df['TOTAL DO BILHETE'] / df['parcelas']
+    df['TOTAL_VENDA_PARCELA'] = df['TOTAL_VENDA'] / df['parcelas']
+    df['TOTAL_REPASSE_PARCELA'] = df['TOTAL_REPASSE'] / df['parcelas']
+
+    saida[:] = df[COLUNAS_VALORES].to_numpy().T
+
+def valores_colunas(df):
+
+    '''
+    Função com o cálculo original, coluna a coluna sobre as colunas da projeção.
+
+    Retorna:
+    np.ndarray: matriz float64 (len(COLUNAS_VALORES), n).
+    '''
+
+    df = df[COLUNAS_ENTRADA].copy()
+
+    df['TAXAS'] = df['PEDAGIO'] + df['TAXA_EMB']
+    df['TAXA_CONV'] = df['TOTAL DO BILHETE'] * df['% Tx Conv']
+    df['TOTAL_VENDA'] = df['TOTAL DO BILHETE'] + df['TAXA_CONV']
+    df['COMISSAO'] = df['TOTAL_VENDA'] * df['PERCENTUAL_COMISSAO']
+    df['TOTAL_REPASSE'] = df['TOTAL_VENDA'] - df['COMISSAO']
+    df['TARIFA_PARCELA'] = df['TARIFA'] / df['parcelas']
+    df['PEDAGIO_PARCELA'] = df['PEDAGIO'] / df['parcelas']
+    df['TAXA_EMB_PARCELA'] = df['TAXA_EMB'] / df['parcelas']
+    df['TAXA_CONV_PARCELA'] = df['TAXA_CONV'] / df['parcelas']
+    df['TAXAS_PARCELA'] = df['TAXAS'] / df['parcelas']
+    df['COMISSAO_PARCELA'] = df['COMISSAO'] / df['parcelas']
+    df['TOTAL_BILHETE_PARCELA'] = df['TOTAL DO BILHETE'] / df['parcelas']
+    df['TOTAL_VENDA_PARCELA'] = df['TOTAL_VENDA'] / df['parcelas']
+    df['TOTAL_REPASSE_PARCELA'] = df['TOTAL_REPASSE'] / df['parcelas']
+
+    return np.vstack([df[coluna].to_numpy(dtype=np.float64, na_value=np.nan) for coluna in COLUNAS_VALORES])
+
+MOTORES_VALORES = {
+    'numba': valores_numba,
+    'numpy': valores_numpy,
+    'pandas': valores_pandas
+}
+
+def escolher_motor(motor=None):
+
+    motor = CALCULO_VALORES if motor is None else motor
+
+    if motor == 'auto':
+        return 'numba' if numba_disponivel() else 'numpy'
+
+    if motor == 'colunas':
+        return motor
+
+    if motor not in MOTORES_VALORES:
+        print(f'AVISO: Motor de cálculo "{motor}" inválido em NEXUS_CALCULO_VALORES. Utilizando numpy.')
+        return 'numpy'
+
+    if motor == 'numba' and not numba_disponivel():
+        print('AVISO: numba não instalado. Utilizando o motor numpy no cálculo dos valores.')
+        return 'numpy'
+
+    return motor
+
+def matriz_entrada(df):
+
+    '''
+    Retorna:
+    np.ndarray: matriz float64 (len(COLUNAS_ENTRADA), n) com as colunas de entrada do DataFrame.
+    '''
+
+    entrada = np.empty((len(COLUNAS_ENTRADA), len(df)), dtype=np.float64)
+
+    for linha, coluna in zip(entrada, COLUNAS_ENTRADA):
+        linha[:] = df[coluna].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return entrada
+
+def calcular_valores(df, motor=None):
+
+    '''
+    Função para calcular os valores do bilhete e por parcela.
+
+    Parâmetros:
+    df: DataFrame com as COLUNAS_ENTRADA (uma linha por bilhete).
+    motor: 'auto', 'numba', 'numpy', 'pandas' ou 'colunas' (None = configuração NEXUS_CALCULO_VALORES).
+
+    Retorna:
+    np.ndarray: matriz float64 (len(COLUNAS_VALORES), n), uma linha contígua por coluna de COLUNAS_VALORES.
+    '''
+
+    motor = escolher_motor(motor)
+
+    if motor == 'colunas':
+        return valores_colunas(df)
+
+    entrada = matriz_entrada(df)
+    saida = np.empty((len(COLUNAS_VALORES), len(df)), dtype=np.float64)
+
+    MOTORES_VALORES[motor](entrada, saida)
+
+    return saida
@@ -0,0 +1,88 @@
+## ----- IMPORTANDO BIBLIOTECAS -----
+
+import numpy as np
+import pandas as pd
+from cache_ingestao import ler_com_cache
+from leitores_excel import ler_excel
+
+## ----- TABELAS COM VIGÊNCIA -----
+
+## taxas (ex.: % da taxa de conveniência) consultadas pela data, em intervalos de vigência:
+##   - com a coluna 'Data Final' na planilha, cada taxa vale de 'Data' até 'Data Final' (inclusive);
+##   - sem ela, cada taxa vale de 'Data' até o dia anterior à próxima 'Data', e a última apenas no seu dia
+##     (assim a planilha diária de taxa de conveniência tem o mesmo resultado da comparação por data exata)
+## a consulta é um searchsorted pelo dia (ordinal) no início dos intervalos, sem merge de DataFrames.
+## a planilha lida fica no cache de ingestão (Arrow IPC), então as próximas execuções não leem o xlsx
+
+def montar_vigencias(df, coluna_valor, coluna_data='Data', coluna_data_final='Data Final'):
+
+    '''
+    Função para montar a tabela de intervalos de vigência a partir da planilha de taxas.
+
+    Retorna:
+    dict: inicio e fim (dias, datetime64[D] como inteiros) e valor de cada intervalo, ordenados pelo início.
+    '''
+
+    df = df.dropna(subset=[coluna_data]).sort_values(coluna_data, kind='stable')
+
+    inicio = pd.to_datetime(df[coluna_data]).to_numpy('datetime64[D]').astype(np.int64)
+
+    if coluna_data_final in df.columns:
+        fim = pd.to_datetime(df[coluna_data_final]).to_numpy('datetime64[D]')
+        ## sem data final: vigente até o dia anterior ao próximo início (ou apenas no próprio dia, no último)
+        fim = np.where(np.isnat(fim), np.append(inicio[1:] - 1, inicio[-1:]), fim.astype(np.int64))
+    else:
+        fim = np.append(inicio[1:] - 1, inicio[-1:])
+
+    if (fim[:-1] >= inicio[1:]).any():
+        print(f'AVISO: A tabela de "{coluna_valor}" possui vigências sobrepostas. Prevalece a de início mais recente.')
+
+    return {
+        'inicio': inicio,
+        'fim': fim,
+        'valor': df[coluna_valor].to_numpy(dtype=float)
+    }
+
+def consultar_vigencia(vigencias, datas):
+
+    '''
+    Função para buscar o valor vigente em cada data.
+
+    Parâmetros:
+    vigencias: tabela montada pelo montar_vigencias.
+    datas: Series de datas.
+
+    Retorna:
+    np.ndarray: valor vigente em cada data (NaN quando a data está fora de todas as vigências ou vazia).
+    '''
+
+    dias = pd.to_datetime(datas).to_numpy('datetime64[D]')
+    validas = ~np.isnat(dias)
+    dias = dias.astype(np.int64)
+
+    resultado = np.full(len(dias), np.nan)
+    if len(vigencias['inicio']) == 0:
+        return resultado
+
+    posicao = np.searchsorted(vigencias['inicio'], dias, 'right') - 1
+    posicao_segura = np.clip(posicao, 0, None)
+    vigente = validas & (posicao >= 0) & (dias <= vigencias['fim'][posicao_segura])
+
+    resultado[vigente] = vigencias['valor'][posicao_segura[vigente]]
+
+    return resultado
+
+def carregar_vigencias(caminho, coluna_valor):
+
+    '''
+    Função para ler uma planilha de taxas (pelo cache de ingestão) e montar as vigências.
+
+    Retorna:
+    dict ou None: vigências (montar_vigencias) ou None quando a planilha não pôde ser lida.
+    '''
+
+    try:
+        return montar_vigencias(ler_com_cache(ler_excel, caminho), coluna_valor)
+    except Exception as e:
+        print(f'AVISO: Erro ao carregar a planilha de {coluna_valor}... ({e})')
+        return None